@@ -0,0 +1,75 @@
+"""Recall@k and latency of the VECTOR_INDEX_TYPE options against the flat baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ann --n 200000 --queries 500 --k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import bench_settings, emit, latency_summary, synthetic_vectors, timed
+from services import index_factory
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run_config(index_type, vectors, queries, truth, k, settings_overrides, knobs):
+    settings = bench_settings(VECTOR_INDEX_TYPE=index_type, **settings_overrides)
+    index, build_s = timed(index_factory.rebuild_index, vectors, settings)
+    results = []
+    for knob in knobs:
+        params = index_factory.search_parameters(index, **knob)
+        latencies, found = [], []
+        for q in queries:
+            start = time.perf_counter()
+            _, ids = index.search(q.reshape(1, -1), k, params=params)
+            latencies.append(time.perf_counter() - start)
+            found.append(ids[0])
+        results.append({
+            "index_type": index_type,
+            "build_s": round(build_s, 3),
+            **knob,
+            f"recall@{k}": round(recall_at_k(np.array(found), truth), 4),
+            **latency_summary(latencies),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    args = parser.parse_args()
+
+    # Queries come from the same distribution as the corpus but are held out
+    data = synthetic_vectors(args.n + args.queries, args.dim)
+    vectors, queries = data[:args.n], data[args.n:]
+    overrides = {
+        "VECTOR_IVF_NLIST": args.nlist,
+        "VECTOR_PQ_M": args.pq_m,
+        "VECTOR_HNSW_M": args.hnsw_m,
+    }
+
+    flat = index_factory.rebuild_index(vectors, bench_settings(VECTOR_INDEX_TYPE="flat"))
+    _, truth = flat.search(queries, args.k)
+
+    ivf_knobs = [{"nprobe": p} for p in (1, 4, 16, 64)]
+    hnsw_knobs = [{"ef_search": ef} for ef in (16, 64, 256)]
+    results = run_config("flat", vectors, queries, truth, args.k, overrides, [{}])
+    results += run_config("ivf_flat", vectors, queries, truth, args.k, overrides, ivf_knobs)
+    results += run_config("hnsw", vectors, queries, truth, args.k, overrides, hnsw_knobs)
+    results += run_config("ivf_pq", vectors, queries, truth, args.k, overrides, ivf_knobs)
+    emit("ann", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
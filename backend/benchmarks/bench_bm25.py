@@ -0,0 +1,86 @@
+"""Index size, build time and query latency of the BM25 sparse index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bm25 --chunks 1000000 --queries 500
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import emit, latency_summary, timed
+from services.sparse_index import SparseIndex
+
+
+def synthetic_chunks(n: int, words_per_chunk: int = 80, vocab: int = 50_000, seed: int = 0):
+    """Zipf-distributed words, plus a part-number style identifier in every chunk."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocab)])
+    for start in range(0, n, 10_000):
+        count = min(10_000, n - start)
+        ids = np.minimum(rng.zipf(1.2, size=(count, words_per_chunk)) - 1, vocab - 1)
+        for offset, row in enumerate(ids):
+            yield " ".join(words[row]) + f" PN-{start + offset:07d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--words-per-chunk", type=int, default=80)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=50)
+    args = parser.parse_args()
+
+    index = SparseIndex()
+    start = time.perf_counter()
+    batch = []
+    for chunk in synthetic_chunks(args.chunks, args.words_per_chunk):
+        batch.append(chunk)
+        if len(batch) == 10_000:
+            index.add(len(index), index.analyze(batch))
+            batch = []
+    if batch:
+        index.add(len(index), index.analyze(batch))
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sparse.index")
+        _, save_s = timed(index.save, path)
+        file_bytes = os.path.getsize(path)
+        _, load_s = timed(SparseIndex.load, path)
+
+    rng = np.random.default_rng(1)
+    query_sets = {
+        "identifier": [f"PN-{i:07d}" for i in rng.integers(0, args.chunks, args.queries)],
+        "common_terms": [" ".join(f"w{i}" for i in rng.integers(0, 20, 3)) for _ in range(args.queries)],
+        "mixed": [
+            f"w{rng.integers(0, 1000)} w{rng.integers(1000, 50_000)} PN-{rng.integers(0, args.chunks):07d}"
+            for _ in range(args.queries)
+        ],
+    }
+    results = []
+    for name, queries in query_sets.items():
+        latencies = [timed(index.search, q, args.k)[1] for q in queries]
+        results.append({"queries": name, **latency_summary(latencies)})
+
+    emit(
+        "bm25",
+        vars(args),
+        [
+            {
+                "build_s": round(build_s, 3),
+                "save_s": round(save_s, 3),
+                "load_s": round(load_s, 3),
+                "file_mb": round(file_bytes / 2**20, 2),
+                "memory_mb": round(index.nbytes() / 2**20, 2),
+                "terms": index.vocabulary_size,
+            },
+            *results,
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
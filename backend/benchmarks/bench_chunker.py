@@ -0,0 +1,94 @@
+"""Chunking throughput of services/chunker.py against the previous word-list chunker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunker --mb 20 --chunk-size 512 --overlap 64
+"""
+import argparse
+import tracemalloc
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from benchmarks.common import emit, timed
+from services.chunker import Chunker
+
+
+def legacy_chunk_segments(segments: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """The chunker VectorStore used before services/chunker.py, kept as the baseline."""
+    current_chunk = []
+    current_size = 0
+
+    for segment in segments:
+        for word in segment.split():
+            word_len = len(word) + 1  # +1 for space
+            if current_size + word_len > chunk_size and current_chunk:
+                yield " ".join(current_chunk)
+                current_chunk = [word]
+                current_size = word_len
+            else:
+                current_chunk.append(word)
+                current_size += word_len
+
+    if current_chunk:
+        yield " ".join(current_chunk)
+
+
+def synthetic_pages(mb: float, page_chars: int = 3000, seed: int = 0):
+    """Prose-like pages: sentences of Zipf-distributed words, paragraphs every few sentences."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word{i}" for i in range(20_000)])
+    pages, total = [], 0
+    while total < mb * 2**20:
+        sentences = []
+        size = 0
+        while size < page_chars:
+            n = int(rng.integers(6, 25))
+            sentence = " ".join(words[np.minimum(rng.zipf(1.3, n), len(words)) - 1]).capitalize() + "."
+            sentences.append(sentence + ("\n\n" if rng.random() < 0.2 else " "))
+            size += len(sentence) + 1
+        page = "".join(sentences)
+        pages.append(page)
+        total += len(page)
+    return pages
+
+
+def measure(name, fn, pages):
+    chunks, seconds = timed(lambda: list(fn(iter(pages))))
+    # Allocation tracing slows the run down, so it is measured separately
+    tracemalloc.start()
+    for _ in fn(iter(pages)):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mb = sum(map(len, pages)) / 2**20
+    return {
+        "chunker": name,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(mb / seconds, 2),
+        "chunks": len(chunks),
+        "mean_chunk_chars": round(float(np.mean([len(c) for c in chunks])), 1),
+        "peak_alloc_mb": round(peak / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=20)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.mb)
+    results = [measure("legacy", lambda p: legacy_chunk_segments(p, args.chunk_size), pages)]
+    for boundary in ("word", "sentence", "paragraph"):
+        for overlap in (0, args.overlap):
+            chunker = Chunker(args.chunk_size, overlap=overlap, boundary=boundary)
+            result = measure(f"chunker[{boundary}, overlap={overlap}]", chunker.chunk_segments, pages)
+            results.append(result)
+    chunker = Chunker(args.chunk_size // 4, overlap=args.overlap // 4, unit="tokens")
+    results.append(measure("chunker[sentence, tokens]", chunker.chunk_segments, pages))
+    emit("chunker", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""NER throughput in docs/s: the full spaCy pipeline one document at a time
+(the previous DocumentProcessor._extract_entities) against services/ner.py.
+
+NEREngine runs the NER-only pipeline through nlp.pipe for each batch size
+given.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ner --docs 500 --words 400 --batch-sizes 16,64,256
+"""
+import argparse
+import os
+
+from benchmarks.common import emit, timed
+from benchmarks.corpus import synthetic_corpus
+from services.ner import NEREngine, load_ner_pipeline
+from services.nlp import load_nlp
+
+
+def full_pipeline_baseline(nlp, texts):
+    found = []
+    for text in texts:
+        entities = {}
+        for ent in nlp(text).ents:
+            entities.setdefault(ent.label_, []).append(ent.text)
+        found.append(entities)
+    return found
+
+
+def distinct(entities_per_doc) -> int:
+    return sum(len(set(values)) for entities in entities_per_doc for values in entities.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--model", default="en_core_web_sm")
+    parser.add_argument("--exclude", default="tagger,parser,attribute_ruler,lemmatizer,senter")
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    args = parser.parse_args()
+    # NEREngine reads its defaults from Settings, which requires these
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("NEO4J_PASSWORD", "benchmark")
+
+    texts = [doc["text"] for doc in synthetic_corpus(args.docs, args.words)]
+    full = load_nlp(args.model)
+    lean = load_ner_pipeline(args.model, tuple(args.exclude.split(",")))
+    # Warm both pipelines so model initialisation is not timed
+    full(texts[0])
+    lean(texts[0])
+
+    found, elapsed = timed(full_pipeline_baseline, full, texts)
+    results = [{
+        "mode": "full_pipeline",
+        "components": list(full.pipe_names),
+        "docs_per_s": round(len(texts) / elapsed, 1),
+        "entities": distinct(found),
+    }]
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        engine = NEREngine(nlp=lean, batch_size=batch_size, max_chars=100_000)
+        found, elapsed = timed(engine.extract_many, texts)
+        results.append({
+            "mode": "ner_engine",
+            "components": list(lean.pipe_names),
+            "batch_size": batch_size,
+            "docs_per_s": round(len(texts) / elapsed, 1),
+            "entities": distinct(found),
+        })
+    emit("ner", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Microbenchmarks of the ingestion and retrieval stages on the synthetic corpus.
+
+Stages: chunking (Chunker.chunk_text), VectorStore.add_document and search,
+DocumentProcessor._extract_entities and the graph's add_entities. The store
+lives in a temporary directory; `--embedder hashing` swaps the
+sentence-transformer for a hashed bag-of-words model to isolate store
+overhead, and `--graph memory` uses the in-process graph stand-in instead
+of Neo4j.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --docs 200 --words 1500 --queries 200 --graph memory
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import HashingEmbedder, emit, latency_summary, timed
+from benchmarks.corpus import synthetic_corpus, synthetic_questions
+
+STAGES = ["chunk", "add_document", "search", "extract_entities", "add_entities"]
+
+
+def stage_result(stage: str, latencies, items: int, unit: str, **extra):
+    total = sum(latencies)
+    return {
+        "stage": stage,
+        "calls": len(latencies),
+        f"{unit}_per_s": round(items / total, 1) if total else None,
+        **latency_summary(latencies),
+        **extra,
+    }
+
+
+def bench_chunk(corpus, args):
+    from services.chunker import Chunker
+
+    chunker = Chunker(args.chunk_size, args.overlap)
+    latencies, chunks = [], 0
+    for doc in corpus:
+        result, elapsed = timed(chunker.chunk_text, doc["text"])
+        latencies.append(elapsed)
+        chunks += len(result)
+    mb = sum(len(doc["text"]) for doc in corpus) / 2**20
+    return stage_result("chunk", latencies, chunks, "chunks", mb_per_s=round(mb / sum(latencies), 1))
+
+
+def bench_store(corpus, questions, args, stages):
+    from services.vector_store import VectorStore
+
+    model = HashingEmbedder() if args.embedder == "hashing" else None
+    store = VectorStore(model=model)
+    results = []
+    latencies = []
+    for doc in corpus:
+        _, elapsed = timed(store.add_document, doc["text"], metadata={"name": doc["name"]})
+        latencies.append(elapsed)
+    if "add_document" in stages:
+        results.append(stage_result("add_document", latencies, len(corpus), "docs", chunks=store.index.ntotal))
+    if "search" in stages:
+        latencies = [timed(store.search, question, args.k)[1] for question in questions]
+        results.append(stage_result("search", latencies, len(questions), "queries"))
+    store.close()
+    return results
+
+
+def build_graph(args):
+    if args.graph == "memory":
+        from services.memory_graph import InMemoryGraph
+        return InMemoryGraph(latency_s=args.graph_latency_ms / 1000)
+    from services.knowledge_graph import KnowledgeGraph
+    return KnowledgeGraph()
+
+
+def bench_entities(corpus, args, stages):
+    from services.document_processor import DocumentProcessor
+
+    graph = build_graph(args)
+    # The processor only needs its NLP model here; the store is never touched
+    processor = DocumentProcessor(kg=graph, vector_store=object())
+    results, extracted, latencies = [], [], []
+    for doc in corpus:
+        entities, elapsed = timed(processor._extract_entities, doc["text"])
+        extracted.append(entities)
+        latencies.append(elapsed)
+    if "extract_entities" in stages:
+        found = sum(len(values) for entities in extracted for values in entities.values())
+        results.append(stage_result("extract_entities", latencies, len(corpus), "docs", entities=found))
+    if "add_entities" in stages:
+        latencies = [timed(graph.add_entities, entities)[1] for entities in extracted]
+        found = sum(len(set(values)) for entities in extracted for values in entities.values())
+        results.append(stage_result("add_entities", latencies, found, "entities", graph=args.graph))
+    graph.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--words", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--embedder", default="model", choices=["model", "hashing"])
+    parser.add_argument("--graph", default="memory", choices=["memory", "neo4j"])
+    parser.add_argument("--graph-latency-ms", type=float, default=0.0)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ",".join(STAGES))
+    args = parser.parse_args()
+    stages = set(args.stages.split(","))
+
+    corpus = synthetic_corpus(args.docs, args.words)
+    questions = synthetic_questions(corpus, args.queries)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings() is read by every service; keep the store out of the real data dir
+        os.environ["VECTOR_DB_PATH"] = tmp
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        os.environ.setdefault("NEO4J_PASSWORD", "benchmark")
+        if "chunk" in stages:
+            results.append(bench_chunk(corpus, args))
+        if stages & {"add_document", "search"}:
+            results += bench_store(corpus, questions, args, stages)
+        if stages & {"extract_entities", "add_entities"}:
+            results += bench_entities(corpus, args, stages)
+    emit("pipeline", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Memory per million chunks, recall@k and latency of the VECTOR_QUANTIZATION modes.
+
+Each quantized mode is measured on its own and with exact re-scoring of
+rerank-factor * k candidates against the float32 vectors in vectors.f32.
+
+Usage (from backend/):
+    python -m benchmarks.bench_quantization --n 200000 --queries 500 --k 10 --index-type flat
+"""
+import argparse
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import recall_at_k
+from benchmarks.common import bench_settings, emit, latency_summary, synthetic_vectors, timed
+from services import index_factory
+from services.vector_file import VectorFile
+
+
+def run_mode(quantization, vectors, queries, truth, raw, args):
+    settings = bench_settings(
+        VECTOR_INDEX_TYPE=args.index_type,
+        VECTOR_QUANTIZATION=quantization,
+        VECTOR_IVF_NLIST=args.nlist,
+        VECTOR_PQ_M=args.pq_m,
+    )
+    index, build_s = timed(index_factory.rebuild_index, vectors, settings)
+    index_bytes = len(faiss.serialize_index(index))
+    params = index_factory.search_parameters(index, nprobe=args.nprobe, ef_search=args.ef_search)
+
+    factors = [0] if quantization == "none" else [0, args.rerank_factor]
+    results = []
+    for factor in factors:
+        latencies, found = [], []
+        for q in queries:
+            q = q.reshape(1, -1)
+            start = time.perf_counter()
+            _, ids = index.search(q, args.k * max(factor, 1), params=params)
+            if factor:
+                _, ids = raw.rescore(q, ids, args.k, index_factory.index_metric(index))
+            latencies.append(time.perf_counter() - start)
+            found.append(ids[0])
+        results.append({
+            "quantization": quantization,
+            "rerank_factor": factor,
+            "build_s": round(build_s, 3),
+            "index_mb_per_million": round(index_bytes / len(vectors) * 1e6 / 2**20, 1),
+            f"recall@{args.k}": round(recall_at_k(np.array(found), truth), 4),
+            **latency_summary(latencies),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat", choices=index_factory.INDEX_TYPES)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.n + args.queries, args.dim)
+    vectors, queries = data[:args.n], data[args.n:]
+    flat = index_factory.rebuild_index(vectors, bench_settings(VECTOR_INDEX_TYPE="flat"))
+    _, truth = flat.search(queries, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = VectorFile(tmp, args.dim)
+        raw.append(vectors)
+        results = []
+        for quantization in index_factory.QUANTIZATIONS:
+            results += run_mode(quantization, vectors, queries, truth, raw, args)
+        # The float32 copy lives on disk and is paged in on demand, not held per worker
+        results.append({"vectors_f32_mb_per_million": round(raw.nbytes() / args.n * 1e6 / 2**20, 1)})
+        raw.close()
+    emit("quantization", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
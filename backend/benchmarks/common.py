@@ -0,0 +1,80 @@
+import json
+import subprocess
+import sys
+import time
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+from core.config import Settings
+
+
+def bench_settings(**overrides) -> Settings:
+    """Settings with defaults for everything, without reading .env or secrets."""
+    return Settings.model_construct(OPENAI_API_KEY="", NEO4J_PASSWORD="", **overrides)
+
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered Gaussian vectors, closer to real embeddings than uniform noise,
+    L2-normalized like the embeddings a cosine VectorStore indexes."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.8 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def latency_summary(latencies_s: List[float]) -> Dict[str, float]:
+    ms = np.asarray(latencies_s) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def emit(benchmark: str, params: Dict, results: List[Dict]) -> None:
+    """Print one JSON document so runs can be diffed across commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    json.dump(
+        {
+            "benchmark": benchmark,
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": params,
+            "results": results,
+        },
+        sys.stdout,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+
+
+class HashingEmbedder:
+    """SentenceTransformer stand-in: hashed bag-of-words vectors, no model download.
+
+    Used with --embedder hashing to measure VectorStore overhead without
+    model inference dominating the numbers.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        return vectors
@@ -0,0 +1,100 @@
+"""Synthetic corpus for benchmarks and load tests: entity-rich documents plus questions.
+
+Documents mix templated sentences about organisations, people, cities and
+part numbers (so NER, the knowledge graph and BM25 identifier matching have
+work to do) with Zipf-distributed filler words. The same seed always yields
+the same corpus.
+
+Usage (from backend/), writing .txt files for manual uploads:
+    python -m benchmarks.corpus --docs 200 --words 2000 --out /tmp/corpus
+"""
+import argparse
+import os
+from typing import Dict, List
+
+import numpy as np
+
+_ORG_PREFIXES = ["Acme", "Northwind", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay", "Cyberdyne"]
+_ORG_SUFFIXES = ["Corporation", "Labs", "Industries", "Systems", "Holdings", "Logistics"]
+_FIRST_NAMES = ["Jane", "John", "Maria", "Wei", "Aisha", "Carlos", "Priya", "Tom", "Olga", "Kenji"]
+_LAST_NAMES = ["Smith", "Garcia", "Chen", "Okafor", "Muller", "Rossi", "Tanaka", "Novak", "Silva", "Khan"]
+_CITIES = ["Berlin", "Lagos", "Toronto", "Mumbai", "Sydney", "Madrid", "Seoul", "Chicago", "Nairobi", "Lima"]
+_MONTHS = ["January", "March", "May", "July", "September", "November"]
+
+_SENTENCES = [
+    "{org} opened a new office in {city} led by {person} in {month} {year}.",
+    "{person} said revenue from part {part} grew {pct}% in the last quarter.",
+    "{org} signed a supply agreement with {other} covering part {part}.",
+    "The {city} plant of {org} replaced gasket {part} after an audit by {person}.",
+]
+_QUESTIONS = [
+    "Who leads the {org} office in {city}?",
+    "What happened to part {part}?",
+    "Which company supplies {other}?",
+    "What did {person} say about revenue?",
+]
+
+
+def _entities(rng: np.random.Generator) -> Dict[str, str]:
+    return {
+        "org": f"{rng.choice(_ORG_PREFIXES)} {rng.choice(_ORG_SUFFIXES)}",
+        "other": f"{rng.choice(_ORG_PREFIXES)} {rng.choice(_ORG_SUFFIXES)}",
+        "person": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+        "city": str(rng.choice(_CITIES)),
+        "month": str(rng.choice(_MONTHS)),
+        "year": str(rng.integers(2015, 2025)),
+        "part": f"XK-{rng.integers(0, 100_000):05d}",
+        "pct": str(rng.integers(1, 60)),
+    }
+
+
+def synthetic_corpus(docs: int, words_per_doc: int = 1000, seed: int = 0) -> List[Dict]:
+    """Documents as {"name", "text", "facts"}; `facts` are the entity fills used, for questions."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term{i}" for i in range(20_000)])
+    corpus = []
+    for doc in range(docs):
+        facts, sentences, words = [], [], 0
+        while words < words_per_doc:
+            if rng.random() < 0.3:
+                fill = _entities(rng)
+                facts.append(fill)
+                sentence = str(rng.choice(_SENTENCES)).format(**fill)
+            else:
+                ids = np.minimum(rng.zipf(1.3, int(rng.integers(8, 25))), len(vocabulary)) - 1
+                sentence = " ".join(vocabulary[ids]).capitalize() + "."
+            sentences.append(sentence + ("\n\n" if rng.random() < 0.15 else " "))
+            words += sentence.count(" ") + 1
+        corpus.append({"name": f"doc_{doc:05d}.txt", "text": "".join(sentences), "facts": facts})
+    return corpus
+
+
+def synthetic_questions(corpus: List[Dict], n: int, seed: int = 1) -> List[str]:
+    """Questions about facts that occur in the corpus."""
+    rng = np.random.default_rng(seed)
+    facts = [fact for doc in corpus for fact in doc["facts"]]
+    if not facts:
+        return []
+    return [
+        str(rng.choice(_QUESTIONS)).format(**facts[int(rng.integers(0, len(facts)))])
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--words", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for doc in synthetic_corpus(args.docs, args.words, args.seed):
+        with open(os.path.join(args.out, doc["name"]), "w", encoding="utf-8") as f:
+            f.write(doc["text"])
+    print(f"Wrote {args.docs} documents to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""/api/query/ask latency with and without concurrent uploads against a running server.
+
+Start the API first (python main.py), then from backend/:
+    python -m benchmarks.load_ask_during_upload --url http://localhost:8000 --duration 20
+
+The upload phase posts a large synthetic text file in a loop; if p99 of /ask
+stays close to the idle phase, ingestion is not blocking the event loop.
+
+Every upload carries a fresh nonce, so none is skipped as "unchanged", and
+every question is numbered, so none is answered from the answer cache. Run
+the server with ANSWER_CACHE_ENABLED=false all the same: the semantic cache
+may still match numbered variants of one question (the result reports
+whether the cache was on).
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import emit, latency_summary
+
+QUESTIONS = [
+    "Who is the CEO of the company?",
+    "Where is the company headquartered?",
+    "Which products are mentioned?",
+    "Who founded the company?",
+]
+
+
+def synthetic_document(words: int) -> bytes:
+    sentence = "Acme Corporation opened a new office in Berlin led by Jane Smith in March 2024. "
+    return (sentence * (words // 15 + 1)).encode("utf-8")
+
+
+def unique_document(document: bytes) -> bytes:
+    """`document` with a nonce, so its content hash has never been stored."""
+    return f"Upload {uuid.uuid4().hex}.\n".encode("utf-8") + document
+
+
+async def ask_loop(client: httpx.AsyncClient, stop_at: float, latencies: list, errors: list):
+    i = 0
+    run = uuid.uuid4().hex[:8]
+    while time.perf_counter() < stop_at:
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (request {run}-{i})"
+        i += 1
+        start = time.perf_counter()
+        response = await client.post("/api/query/ask", json={"question": question})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def upload_loop(
+    client: httpx.AsyncClient, stop_at: float, document: bytes, uploads: list, statuses: Counter
+):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        # Same name, new content: each upload replaces the previous one
+        response = await client.post(
+            "/api/documents/upload",
+            files={"files": ("load_test.txt", unique_document(document), "text/plain")},
+        )
+        uploads.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            statuses[f"http_{response.status_code}"] += 1
+            continue
+        for result in response.json().get("results", []):
+            statuses[result.get("status", "unknown")] += 1
+
+
+async def run_phase(url: str, duration: float, concurrency: int, document: bytes = None):
+    latencies, errors, uploads, statuses = [], [], [], Counter()
+    stop_at = time.perf_counter() + duration
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        tasks = [ask_loop(client, stop_at, latencies, errors) for _ in range(concurrency)]
+        if document is not None:
+            tasks.append(upload_loop(client, stop_at, document, uploads, statuses))
+        await asyncio.gather(*tasks)
+    return {
+        "phase": "during_upload" if document is not None else "idle",
+        "requests": len(latencies),
+        "errors": len(errors),
+        "uploads": len(uploads),
+        "upload_statuses": dict(statuses),
+        **latency_summary(latencies),
+    }
+
+
+async def answer_cache_enabled(url: str) -> bool:
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        response = await client.get("/api/query/stats")
+        response.raise_for_status()
+        return response.json().get("answer_cache") is not None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upload-words", type=int, default=200_000)
+    args = parser.parse_args()
+
+    cache_enabled = await answer_cache_enabled(args.url)
+    if cache_enabled:
+        print("Warning: the server's answer cache is on; start it with ANSWER_CACHE_ENABLED=false", file=sys.stderr)
+    results = [await run_phase(args.url, args.duration, args.concurrency)]
+    document = synthetic_document(args.upload_words)
+    results.append(await run_phase(args.url, args.duration, args.concurrency, document))
+    emit("ask_during_upload", {**vars(args), "answer_cache_enabled": cache_enabled}, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
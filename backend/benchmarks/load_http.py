@@ -0,0 +1,168 @@
+"""HTTP load test of /api/documents/upload and /api/query/ask on the synthetic corpus.
+
+Phase one uploads the corpus with `--upload-concurrency` clients, `--batch`
+files per request; phase two runs `--ask-concurrency` closed-loop clients
+asking questions about facts in that corpus for `--duration` seconds.
+
+Against a running server (real OpenAI and Neo4j):
+    python -m benchmarks.load_http --url http://localhost:8000 --docs 100
+
+Self-contained (from backend/): `--spawn` starts uvicorn in a temporary data
+directory with GRAPH_BACKEND=memory and LLM_BACKEND=fake, so no network or
+database is needed and the LLM's latency is whatever the flags say:
+    python -m benchmarks.load_http --spawn --llm-first-token-ms 300 --llm-token-ms 15
+"""
+import argparse
+import asyncio
+import collections
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.corpus import synthetic_corpus, synthetic_questions
+
+
+@contextmanager
+def spawned_server(args):
+    """uvicorn with the local stand-ins, in a throwaway data directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "VECTOR_DB_PATH": tmp,
+            "GRAPH_BACKEND": "memory",
+            "FAKE_GRAPH_LATENCY_MS": str(args.graph_latency_ms),
+            "LLM_BACKEND": "fake",
+            "FAKE_LLM_FIRST_TOKEN_MS": str(args.llm_first_token_ms),
+            "FAKE_LLM_TOKEN_MS": str(args.llm_token_ms),
+            "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+        }
+        env.setdefault("OPENAI_API_KEY", "benchmark")
+        env.setdefault("NEO4J_PASSWORD", "benchmark")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(url, server, args.startup_timeout)
+            yield url
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/api/resources", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} not ready after {timeout}s")
+
+
+async def upload_phase(client: httpx.AsyncClient, corpus, args):
+    batches = collections.deque(corpus[i:i + args.batch] for i in range(0, len(corpus), args.batch))
+    latencies, errors = [], collections.Counter()
+
+    async def worker():
+        while batches:
+            batch = batches.popleft()
+            files = [("files", (doc["name"], doc["text"].encode("utf-8"), "text/plain")) for doc in batch]
+            started = time.perf_counter()
+            response = await client.post("/api/documents/upload", files=files)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.upload_concurrency)))
+    elapsed = time.perf_counter() - started
+    mb = sum(len(doc["text"]) for doc in corpus) / 2**20
+    return {
+        "phase": "upload",
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "docs_per_s": round(len(corpus) / elapsed, 2),
+        "mb_per_s": round(mb / elapsed, 3),
+        **latency_summary(latencies),
+    }
+
+
+async def ask_phase(client: httpx.AsyncClient, questions, args):
+    latencies, errors, cache = [], collections.Counter(), collections.Counter()
+    stop_at = time.perf_counter() + args.duration
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < stop_at:
+            question = questions[i % len(questions)]
+            i += args.ask_concurrency
+            started = time.perf_counter()
+            response = await client.post("/api/query/ask", json={"question": question})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+            else:
+                cache[response.json().get("cache", "miss")] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.ask_concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "phase": "ask",
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "cache": dict(cache),
+        "rps": round(len(latencies) / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+async def run(url: str, args):
+    corpus = synthetic_corpus(args.docs, args.words, args.seed)
+    questions = synthetic_questions(corpus, args.questions, args.seed + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        return [await upload_phase(client, corpus, args), await ask_phase(client, questions, args)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a server with the local stand-ins")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=5, help="files per upload request")
+    parser.add_argument("--upload-concurrency", type=int, default=2)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--ask-concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=15.0)
+    parser.add_argument("--graph-latency-ms", type=float, default=2.0)
+    parser.add_argument("--answer-cache", action="store_true", help="keep the answer cache on when spawning")
+    args = parser.parse_args()
+
+    if args.spawn:
+        with spawned_server(args) as url:
+            results = asyncio.run(run(url, args))
+    else:
+        results = asyncio.run(run(args.url, args))
+    emit("http_load", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
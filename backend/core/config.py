@@ -4,6 +4,10 @@ from typing import Optional
 class Settings(BaseSettings):
     # OpenAI Configuration
     OPENAI_API_KEY: str
+    # openai | fake (services/fake_llm.py: canned answer, simulated latency, no network)
+    LLM_BACKEND: str = "openai"
+    FAKE_LLM_FIRST_TOKEN_MS: float = 0.0
+    FAKE_LLM_TOKEN_MS: float = 0.0
     
     # Google Drive Configuration
     GOOGLE_CLIENT_ID: Optional[str] = None
@@ -13,12 +17,133 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "bolt://localhost:7687"
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str
+    # Entities per UNWIND ... MERGE transaction
+    KG_WRITE_BATCH_SIZE: int = 1000
+    # Keep an in-process token index of entity values to pre-filter graph lookups
+    KG_LOCAL_ENTITY_INDEX: bool = True
+    KG_LINK_LIMIT: int = 25
+    # neo4j | memory (services/memory_graph.py: in-process, nothing persisted), the
+    # latter with FAKE_GRAPH_LATENCY_MS per call standing in for the network round trip
+    GRAPH_BACKEND: str = "neo4j"
+    FAKE_GRAPH_LATENCY_MS: float = 0.0
     
     # Vector DB Configuration
     VECTOR_DB_PATH: str = "vector_store"
+    # Compact the write-ahead log into faiss.index once it grows past this size
+    VECTOR_WAL_COMPACT_BYTES: int = 64 * 1024 * 1024
+    VECTOR_WAL_FSYNC: bool = False
+    # Index type: flat | ivf_flat | hnsw | ivf_pq (see services/index_factory.py)
+    VECTOR_INDEX_TYPE: str = "flat"
+    VECTOR_IVF_NLIST: int = 1024
+    VECTOR_PQ_M: int = 48
+    VECTOR_HNSW_M: int = 32
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 200
+    # Vector encoding inside the index: none (float32) | fp16 | int8 | pq (VECTOR_PQ_M
+    # codes). float32 vectors are always kept in the memory-mapped vectors.f32, and
+    # lossy encodings re-score VECTOR_RERANK_FACTOR * k candidates exactly (0: off)
+    VECTOR_QUANTIZATION: str = "none"
+    VECTOR_RERANK_FACTOR: int = 4
+    # Default per-query search knobs, overridable on each search() call
+    VECTOR_NPROBE: int = 16
+    VECTOR_EF_SEARCH: int = 64
+    # Similarity: cosine (embeddings normalized at encode time, inner-product index,
+    # score = cosine similarity) | l2 (raw embeddings, score = 1 / (1 + distance)).
+    # A store keeps the metric it was built with until scripts/migrate_vector_metric.py
+    VECTOR_METRIC: str = "cosine"
+    # Chunks scoring below this never reach the prompt; None keeps every hit.
+    # Overridable per query (min_score)
+    VECTOR_MIN_SCORE: Optional[float] = None
+    # Multi-worker deployments (services/generations.py): standalone | writer | reader.
+    # The single writer ingests and publishes an index generation at most every
+    # GENERATION_MIN_INTERVAL_S (or ten times as long as the last publish took,
+    # as each writes the whole index), keeping the newest GENERATION_KEEP; reader workers
+    # serve queries from the current generation, memory-mapped, polling for a new one
+    VECTOR_STORE_ROLE: str = "standalone"
+    GENERATION_MIN_INTERVAL_S: float = 1.0
+    GENERATION_POLL_S: float = 1.0
+    GENERATION_KEEP: int = 3
     
+    # Chunking (services/chunker.py): size and overlap in CHUNK_UNIT (chars | tokens);
+    # chunks end at the best CHUNK_BOUNDARY (paragraph | sentence | word | none) break
+    CHUNK_SIZE: int = 512
+    CHUNK_OVERLAP: int = 64
+    CHUNK_UNIT: str = "chars"
+    CHUNK_BOUNDARY: str = "sentence"
+
+    # Hybrid retrieval: BM25 over the same chunks (sparse.index next to faiss.index),
+    # fused with the dense ranking by reciprocal rank fusion (services/sparse_index.py)
+    HYBRID_SEARCH: bool = True
+    HYBRID_CANDIDATES: int = 50
+    RRF_K: int = 60
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+
     # Model Configuration
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Coalesce concurrent query encodes into batches (services/embedding_scheduler.py)
+    EMBED_BATCH_ENABLED: bool = True
+    EMBED_BATCH_MAX_SIZE: int = 32
+    EMBED_BATCH_MAX_WAIT_MS: float = 5.0
+    # Embedding cache: in-memory LRU entries, plus SQLite tier under VECTOR_DB_PATH
+    # holding up to EMBED_CACHE_DISK_SIZE embeddings (about 1.5 KB each at 384 dims)
+    EMBED_CACHE_SIZE: int = 20000
+    EMBED_CACHE_DISK: bool = True
+    EMBED_CACHE_DISK_SIZE: int = 200_000
+
+    # Extraction: files of at least STREAM_MIN_BYTES are ingested as a stream of
+    # segments, STREAM_WINDOW_SEGMENTS at a time (services/extraction.py)
+    STREAM_MIN_BYTES: int = 8 * 1024 * 1024
+    STREAM_WINDOW_SEGMENTS: int = 16
+    SEGMENT_MAX_CHARS: int = 100_000
+    EXCEL_ROWS_PER_SEGMENT: int = 1000
+    # Ingestion NER (services/ner.py): pipeline components that are never loaded,
+    # nlp.pipe batching and the longest piece of text handed to spaCy at once
+    NER_MODEL: str = "en_core_web_sm"
+    NER_EXCLUDE: str = "tagger,parser,attribute_ruler,lemmatizer,senter"
+    NER_BATCH_SIZE: int = 64
+    NER_MAX_CHARS: int = 100_000
+
+    # Build shared resources on first use instead of at startup (core/resources.py)
+    RESOURCES_LAZY: bool = False
+
+    # Worker pools per pipeline stage (services/executors.py). PDF parsing is
+    # pure Python and holds the GIL, so the parse stage runs in (spawned)
+    # processes; set PARSE_USE_PROCESSES=false to keep it on threads where
+    # worker processes are unwelcome (their startup and memory cost). Query-time
+    # entity linking has its own small pool, so questions never queue behind
+    # the NER of an upload
+    PARSE_WORKERS: int = 4
+    PARSE_USE_PROCESSES: bool = True
+    NER_WORKERS: int = 2
+    EMBED_WORKERS: int = 1
+    GRAPH_WORKERS: int = 4
+    SEARCH_WORKERS: int = 4
+    LINK_WORKERS: int = 2
+
+    # Query Configuration
+    # Upper bound on concurrent LLM calls for /api/query/ask-batch
+    LLM_MAX_CONCURRENCY: int = 8
+    ASK_BATCH_MAX_QUESTIONS: int = 1000
+    # Per-leg retrieval timeouts; a leg that exceeds its timeout is dropped
+    # from the context and the answer is flagged as degraded (0 disables)
+    KG_TIMEOUT_S: float = 2.0
+    VECTOR_TIMEOUT_S: float = 5.0
+    # Candidates retrieved per question; the context builder (services/context_builder.py)
+    # dedupes and MMR-ranks them, then keeps what fits in CONTEXT_MAX_TOKENS
+    RETRIEVAL_K: int = 8
+    CONTEXT_MAX_TOKENS: int = 3000
+    CONTEXT_MAX_KG_FACTS: int = 25
+    CONTEXT_MMR_LAMBDA: float = 0.7
+    CONTEXT_DEDUPE_THRESHOLD: float = 0.95
+    # Answer cache for /api/query/ask (services/answer_cache.py)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1024
+    ANSWER_CACHE_TTL_S: float = 3600.0
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    # Stage timings, counters and index size on GET /metrics (core/metrics.py); when
+    # off, spans are a no-op. The timing header adds a per-request Server-Timing breakdown
+    METRICS_ENABLED: bool = True
+    METRICS_TIMING_HEADER: bool = False
     
     class Config:
         env_file = ".env"
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""Process-local metrics: stage spans, counters, histograms and Prometheus text output.
+
+Spans time one stage of a request (`with metrics.span("vector_search"):`)
+into the `rag_stage_seconds` histogram and, when the timing header is on,
+into the current request's breakdown, which TimingMiddleware sends as a
+`Server-Timing` header. Until `configure()` enables them every call is a
+flag check and spans are a shared no-op context manager.
+
+Metrics live per process; with several workers each exposes its own.
+"""
+import bisect
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = False
+_timing_header = False
+# Per-request stage durations (seconds); set by TimingMiddleware for the request's context
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("metrics_timings", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Declared counters, gauges and histograms with their samples per label set.
+
+    Collectors registered with `add_collector` are called at render time for
+    values owned elsewhere (index size, cache hit counts).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, help: str):
+        self._declare(name, "counter", help)
+
+    def gauge(self, name: str, help: str):
+        self._declare(name, "gauge", help)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._declare(name, "histogram", help)
+        self._buckets[name] = tuple(sorted(buckets))
+
+    def _declare(self, name: str, kind: str, help: str):
+        self._types[name] = kind
+        self._help[name] = help
+        if kind == "histogram":
+            self._histograms.setdefault(name, {})
+        else:
+            self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[name][_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._histograms[name].get(key)
+            if series is None:
+                # Per-bucket counts (made cumulative on render), then sum and count
+                series = self._histograms[name][key] = [[0] * len(buckets), 0.0, 0]
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def add_collector(self, collect: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collect)
+
+    def remove_collector(self, collect: Callable[[], Iterable[Sample]]):
+        if collect in self._collectors:
+            self._collectors.remove(collect)
+
+    def value(self, name: str, **labels) -> Optional[float]:
+        """Current value of a counter or gauge series, or a histogram's count."""
+        key = _labels(labels)
+        with self._lock:
+            if name in self._histograms:
+                series = self._histograms[name].get(key)
+                return series[2] if series else None
+            return self._values.get(name, {}).get(key)
+
+    def reset(self):
+        with self._lock:
+            for series in self._values.values():
+                series.clear()
+            for series in self._histograms.values():
+                series.clear()
+            self._collectors.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        collected: Dict[str, Dict[Labels, float]] = {}
+        for collect in self._collectors:
+            try:
+                for name, labels, value in collect():
+                    collected.setdefault(name, {})[_labels(labels)] = value
+            except Exception as e:
+                print(f"Warning: metrics collector failed: {e}")
+
+        lines = []
+        with self._lock:
+            for name, kind in self._types.items():
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    lines.extend(self._render_histogram(name))
+                    continue
+                series = {**self._values[name], **collected.get(name, {})}
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histogram(self, name: str) -> List[str]:
+        lines = []
+        buckets = self._buckets[name] + (float("inf"),)
+        for labels, (counts, total, count) in sorted(self._histograms[name].items()):
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts + [count - sum(counts)]):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.histogram("rag_stage_seconds", "Duration of one pipeline stage")
+REGISTRY.histogram("rag_http_request_seconds", "HTTP request duration by route")
+REGISTRY.counter("rag_answers_total", "Answers served, by answer cache result")
+REGISTRY.counter("rag_documents_ingested_total", "Uploaded documents, by ingestion status")
+REGISTRY.counter("rag_chunks_ingested_total", "Chunks embedded and added to the vector store")
+REGISTRY.counter("rag_entities_written_total", "Entity rows merged into the knowledge graph")
+REGISTRY.counter("rag_embedding_cache_lookups_total", "Embedding cache lookups, by result")
+REGISTRY.gauge("rag_index_vectors", "Vectors in the FAISS index, including deleted ones not yet vacuumed")
+REGISTRY.gauge("rag_index_documents", "Live documents in the vector store")
+REGISTRY.gauge("rag_index_vectors_bytes", "Size of the float32 vector file")
+REGISTRY.gauge("rag_answer_cache_entries", "Answers held in the answer cache")
+REGISTRY.gauge("rag_index_generation", "Published index generation served (reader) or last published (writer)")
+
+
+def configure(enabled: bool, timing_header: bool = False):
+    """Turn recording on or off (METRICS_ENABLED / METRICS_TIMING_HEADER)."""
+    global _enabled, _timing_header
+    _enabled = enabled
+    _timing_header = enabled and timing_header
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        REGISTRY.observe("rag_stage_seconds", elapsed, stage=self.name)
+        timings = _timings.get()
+        if timings is not None:
+            # Stages run more than once per request (streamed windows) add up
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+def span(name: str):
+    """Context manager timing one stage; a shared no-op when metrics are off."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def traced(name: str, awaitable: Awaitable[T]) -> Awaitable[T]:
+    """`awaitable` timed as span(name), for legs passed to asyncio.gather;
+    returned as is when metrics are off."""
+    if not _enabled:
+        return awaitable
+    return _traced(name, awaitable)
+
+
+async def _traced(name: str, awaitable: Awaitable[T]) -> T:
+    with _Span(name):
+        return await awaitable
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    if _enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    if _enabled:
+        REGISTRY.observe(name, value, **labels)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={1000 * seconds:.2f}" for name, seconds in timings.items())
+
+
+class TimingMiddleware:
+    """ASGI middleware recording request latency per route and, with the
+    timing header on, returning the request's stage breakdown as
+    `Server-Timing`. Streaming responses send their headers before the
+    answer is generated, so their breakdown only covers retrieval.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = {} if _timing_header else None
+        token = _timings.set(timings)
+
+        async def send_with_timing(message):
+            if timings is not None and message["type"] == "http.response.start":
+                timings["total"] = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            REGISTRY.observe(
+                "rag_http_request_seconds",
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=_route_template(scope),
+            )
+
+
+def _route_template(scope) -> str:
+    """The request path with path parameters put back as placeholders
+    (/api/documents/{doc_id}), so the label set stays bounded."""
+    if "route" not in scope:
+        return "unmatched"
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        "{" + names[segment] + "}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
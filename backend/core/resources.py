@@ -0,0 +1,197 @@
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from core.config import Settings
+
+
+class ResourceRegistry:
+    """Process-wide registry of heavy shared resources.
+
+    Each resource is built once by its factory, which receives the registry
+    so it can depend on other resources. Eager resources are built by
+    `load_eager()` at startup, lazy ones on first `get()`.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ResourceRegistry"], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], Any]]] = {}
+        self._lazy: Dict[str, bool] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._load_order: List[str] = []
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[["ResourceRegistry"], Any],
+        lazy: bool = False,
+        close: Optional[Callable[[Any], Any]] = None,
+    ):
+        self._factories[name] = factory
+        self._closers[name] = close
+        self._lazy[name] = lazy
+
+    def get(self, name: str) -> Any:
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown resource '{name}'")
+                loaded_before = sum(self._load_times.values())
+                start = time.perf_counter()
+                instance = self._factories[name](self)
+                elapsed = time.perf_counter() - start
+                # Dependencies first loaded by this factory are reported separately
+                dependencies = sum(self._load_times.values()) - loaded_before
+                self._instances[name] = instance
+                self._load_times[name] = elapsed - dependencies
+                self._load_order.append(name)
+            return self._instances[name]
+
+    def load_eager(self):
+        for name, lazy in self._lazy.items():
+            if not lazy:
+                self.get(name)
+
+    def loaded(self, name: str) -> Optional[Any]:
+        """The resource if it was already built, without building it."""
+        return self._instances.get(name)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Load state and load time (seconds, excluding dependencies) per resource."""
+        return {
+            name: {
+                "loaded": name in self._instances,
+                "lazy": self._lazy[name],
+                "load_time_s": round(self._load_times[name], 4) if name in self._load_times else None,
+            }
+            for name in self._factories
+        }
+
+    async def aclose(self):
+        """Close loaded resources in reverse load order."""
+        for name in reversed(self._load_order):
+            close = self._closers.get(name)
+            if close is None:
+                continue
+            try:
+                result = close(self._instances[name])
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Warning: failed to close resource '{name}': {e}")
+        self._instances.clear()
+        self._load_order.clear()
+
+
+def build_resources(settings: Optional[Settings] = None) -> ResourceRegistry:
+    """Registry with the shared model, spaCy pipeline, stores and services."""
+    settings = settings or Settings()
+    lazy = settings.RESOURCES_LAZY
+    registry = ResourceRegistry()
+
+    def embedding_model(r):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(settings.EMBEDDING_MODEL)
+
+    def nlp(r):
+        from services.nlp import load_nlp
+        return load_nlp()
+
+    def ner(r):
+        # NER-only pipeline for ingestion; "nlp" keeps the tagger for entity linking
+        from services.ner import NEREngine
+        return NEREngine()
+
+    def tokenizer(r):
+        # The context builder's token counter; its first load reads the BPE file
+        from services.context_builder import load_token_counter
+        return load_token_counter()
+
+    def stage_executors(r):
+        from services.executors import get_stage_executors
+        return get_stage_executors()
+
+    def vector_store(r):
+        from services.vector_store import VectorStore
+        return VectorStore(model=r.get("embedding_model"))
+
+    def knowledge_graph(r):
+        if settings.GRAPH_BACKEND == "memory":
+            from services.memory_graph import InMemoryGraph
+            return InMemoryGraph()
+        if settings.GRAPH_BACKEND != "neo4j":
+            raise ValueError(f"Unknown GRAPH_BACKEND '{settings.GRAPH_BACKEND}', expected 'neo4j' or 'memory'")
+        from services.knowledge_graph import KnowledgeGraph
+        return KnowledgeGraph()
+
+    def document_processor(r):
+        from services.document_processor import DocumentProcessor
+        return DocumentProcessor(
+            kg=r.get("knowledge_graph"), vector_store=r.get("vector_store"), ner=r.get("ner")
+        )
+
+    def rag_pipeline(r):
+        from services.rag_pipeline import RAGPipeline
+        r.get("tokenizer")
+        return RAGPipeline(
+            kg=r.get("knowledge_graph"), vector_store=r.get("vector_store"), nlp=r.get("nlp")
+        )
+
+    def drive_service(r):
+        from services.google_drive import GoogleDriveService
+        return GoogleDriveService()
+
+    async def close_graph(kg):
+        kg.close()
+        await kg.aclose()
+
+    registry.register("embedding_model", embedding_model, lazy=lazy)
+    registry.register("nlp", nlp, lazy=lazy)
+    registry.register("ner", ner, lazy=lazy)
+    registry.register("tokenizer", tokenizer, lazy=lazy)
+    registry.register("stage_executors", stage_executors, lazy=lazy, close=lambda e: e.shutdown(wait=False))
+    registry.register("vector_store", vector_store, lazy=lazy, close=lambda vs: vs.close())
+    registry.register("knowledge_graph", knowledge_graph, lazy=lazy, close=close_graph)
+    registry.register("document_processor", document_processor, lazy=lazy)
+    registry.register("rag_pipeline", rag_pipeline, lazy=lazy)
+    # Optional integration; only imported when the endpoint is used
+    registry.register("drive_service", drive_service, lazy=True)
+    return registry
+
+
+def resource(name: str) -> Callable[[Request], Any]:
+    """FastAPI dependency returning a resource from the app's registry."""
+    def dependency(request: Request) -> Any:
+        return request.app.state.resources.get(name)
+    return dependency
+
+
+def resource_metrics(registry: ResourceRegistry) -> List[Tuple[str, Dict[str, str], float]]:
+    """Index size and cache samples for core.metrics, from already loaded resources only."""
+    samples = []
+    vector_store = registry.loaded("vector_store")
+    if vector_store is not None:
+        docs = list(vector_store.registry.docs.values())
+        samples += [
+            ("rag_index_vectors", {}, vector_store.index.ntotal),
+            ("rag_index_documents", {}, sum(not doc["deleted"] for doc in docs)),
+            ("rag_index_vectors_bytes", {}, vector_store.raw_vectors.nbytes()),
+        ]
+        if vector_store.generation is not None:
+            samples.append(("rag_index_generation", {}, vector_store.generation))
+        cache = vector_store.embedding_cache.stats()
+        samples += [
+            ("rag_embedding_cache_lookups_total", {"result": result}, cache[key])
+            for result, key in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))
+        ]
+    pipeline = registry.loaded("rag_pipeline")
+    if pipeline is not None and pipeline.answer_cache is not None:
+        samples.append(("rag_answer_cache_entries", {}, pipeline.answer_cache.stats()["entries"]))
+    return samples
@@ -1,19 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import asyncio
+import functools
 import uvicorn
 import os
 
 from routers import document_router, query_router
+from core import metrics
 from core.config import Settings
+from core.resources import build_resources, resource_metrics
 
 load_dotenv()
 settings = Settings()
+metrics.configure(settings.METRICS_ENABLED, settings.METRICS_TIMING_HEADER)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy resources (model, spaCy, FAISS, Neo4j drivers) are built once per
+    # worker and shared by every router
+    resources = build_resources(settings)
+    await asyncio.to_thread(resources.load_eager)
+    app.state.resources = resources
+    collector = functools.partial(resource_metrics, resources)
+    metrics.REGISTRY.add_collector(collector)
+    yield
+    metrics.REGISTRY.remove_collector(collector)
+    await resources.aclose()
+
 
 app = FastAPI(
     title="Domain-Agnostic RAG System",
     description="AI-powered document processing and question answering system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -22,10 +45,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Outermost, so its timings cover the whole request
+app.add_middleware(metrics.TimingMiddleware)
 
 app.include_router(document_router.router, prefix="/api/documents", tags=["documents"])
 app.include_router(query_router.router, prefix="/api/query", tags=["query"])
 
+
+@app.get("/api/resources", tags=["system"])
+async def resource_status():
+    """Load state and load time of each shared resource"""
+    return app.state.resources.report()
+
+
+@app.get("/metrics", tags=["system"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latencies, ingestion counters, index size and cache hits in Prometheus text format"""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
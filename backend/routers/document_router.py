@@ -1,28 +1,47 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
+from typing import List, Optional
+from core.config import Settings
+from core.resources import resource
 from services.document_processor import DocumentProcessor
-from services.google_drive import GoogleDriveService
+from services.executors import get_stage_executors
+from services.vector_store import VectorStore
 
 router = APIRouter()
-doc_processor = DocumentProcessor()
-drive_service = GoogleDriveService()
+settings = Settings()
 
-@router.post("/upload")
-async def upload_files(files: List[UploadFile] = File(...)):
-    """Upload and process multiple files"""
-    results = []
-    for file in files:
-        try:
-            # Process the file based on its type
-            result = await doc_processor.process_file(file)
-            results.append(result)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
+def writer_only():
+    """Reject writes on reader workers before any file is processed"""
+    if settings.VECTOR_STORE_ROLE == "reader":
+        raise HTTPException(
+            status_code=409,
+            detail="This worker serves a read-only index; send writes to the writer process",
+        )
+
+@router.post("/upload", dependencies=[Depends(writer_only)])
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    domain: Optional[str] = Form(None),
+    doc_processor: DocumentProcessor = Depends(resource("document_processor")),
+):
+    """Upload and process multiple files; re-uploading a file name replaces that document"""
+    try:
+        # Parse, NER and embed all files together; commit once per request
+        results = await doc_processor.process_files(files, domain=domain)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"message": "Files processed successfully", "results": results}
 
-@router.post("/google-drive")
-async def process_google_drive(folder_id: str):
+@router.post("/google-drive", dependencies=[Depends(writer_only)])
+async def process_google_drive(
+    folder_id: str,
+    request: Request,
+    doc_processor: DocumentProcessor = Depends(resource("document_processor")),
+):
     """Process files from Google Drive folder"""
+    try:
+        drive_service = request.app.state.resources.get("drive_service")
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Google Drive integration is not installed")
     try:
         files = await drive_service.get_files(folder_id)
         results = []
@@ -31,4 +50,22 @@ async def process_google_drive(folder_id: str):
             results.append(result)
         return {"message": "Drive files processed successfully", "results": results}
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/")
+async def list_documents(vector_store: VectorStore = Depends(resource("vector_store"))):
+    """Indexed documents with their metadata and chunk counts"""
+    return {"documents": vector_store.list_documents(), "index_generation": vector_store.generation}
+
+@router.delete("/{doc_id}", dependencies=[Depends(writer_only)])
+async def delete_document(doc_id: int, vector_store: VectorStore = Depends(resource("vector_store"))):
+    """Remove a document from search; its chunks are reclaimed by /vacuum"""
+    deleted = await get_stage_executors().run("embed", vector_store.delete_document, doc_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+    return {"message": "Document deleted", "doc_id": doc_id}
+
+@router.post("/vacuum", dependencies=[Depends(writer_only)])
+async def vacuum(vector_store: VectorStore = Depends(resource("vector_store"))):
+    """Rebuild the index without the chunks of deleted documents"""
+    return await get_stage_executors().run("embed", vector_store.vacuum)
@@ -1,25 +1,111 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, List, Optional
+from core.config import Settings
+from core.resources import resource
+from services.document_registry import FILTER_KEYS
 from services.rag_pipeline import RAGPipeline
 
 router = APIRouter()
-rag_pipeline = RAGPipeline()
+settings = Settings()
+get_rag_pipeline = resource("rag_pipeline")
+
+def _known_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Rejected here with a 422; past this point an unknown key would only degrade retrieval
+    unknown = sorted(set(filters or {}) - set(FILTER_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown filter(s) {unknown}, expected {list(FILTER_KEYS)}")
+    return filters
 
 class Query(BaseModel):
     question: str
     domain: str = None
     role: str = None
+    # Document metadata filters, e.g. {"domain": "finance", "file_type": ["pdf", "docx"]}
+    filters: Optional[Dict[str, Any]] = None
+    # Drop chunks below this dense score (cosine similarity); defaults to VECTOR_MIN_SCORE
+    min_score: Optional[float] = None
+
+    _check_filters = field_validator("filters")(_known_filters)
+
+class BatchQuery(BaseModel):
+    questions: List[str]
+    domain: str = None
+    role: str = None
+    filters: Optional[Dict[str, Any]] = None
+    min_score: Optional[float] = None
+
+    _check_filters = field_validator("filters")(_known_filters)
 
 @router.post("/ask")
-async def ask_question(query: Query):
+async def ask_question(query: Query, rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
     """Process a question using the RAG pipeline"""
     try:
         # Get answer using RAG pipeline
         response = await rag_pipeline.process_query(
             question=query.question,
             domain=query.domain,
-            role=query.role
+            role=query.role,
+            filters=query.filters,
+            min_score=query.min_score
         )
         return response
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/ask-stream")
+async def ask_question_stream(query: Query, rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
+    """Process a question, streaming sources and answer tokens as server-sent events"""
+    async def events():
+        try:
+            async for event, data in rag_pipeline.process_query_stream(
+                question=query.question,
+                domain=query.domain,
+                role=query.role,
+                filters=query.filters,
+                min_score=query.min_score
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/ask-batch")
+async def ask_batch(query: BatchQuery, rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
+    """Answer many questions with one batched vector search"""
+    if len(query.questions) > settings.ASK_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.ASK_BATCH_MAX_QUESTIONS} questions per batch"
+        )
+    try:
+        results = await rag_pipeline.process_batch(
+            questions=query.questions,
+            domain=query.domain,
+            role=query.role,
+            filters=query.filters,
+            min_score=query.min_score
+        )
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/stats")
+async def query_stats(rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
+    """Runtime statistics of the query path"""
+    scheduler = rag_pipeline.vector_store.embedding_scheduler
+    return {
+        "embedding_scheduler": scheduler.stats() if scheduler else None,
+        "embedding_cache": rag_pipeline.vector_store.embedding_cache.stats(),
+        "answer_cache": rag_pipeline.answer_cache.stats() if rag_pipeline.answer_cache else None,
+        "index_generation": rag_pipeline.vector_store.generation,
+    }
@@ -0,0 +1,35 @@
+"""Convert the vector store under VECTOR_DB_PATH to another similarity metric.
+
+Moving to cosine L2-normalizes the stored vectors and rebuilds the index
+as an inner-product index; deleted documents are vacuumed on the way.
+Stop the API first: the store is rewritten in place.
+
+Usage (from backend/):
+    python -m scripts.migrate_vector_metric --metric cosine
+"""
+import argparse
+import json
+
+from core.config import Settings
+from services import index_factory
+from services.vector_store import VectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--metric", default=Settings().VECTOR_METRIC, choices=index_factory.METRICS)
+    args = parser.parse_args()
+
+    store = VectorStore()
+    try:
+        if store.metric == args.metric:
+            result = {"chunks": len(store.documents), "from": store.metric, "to": args.metric, "migrated": False}
+        else:
+            result = {**store.migrate_metric(args.metric), "migrated": True}
+    finally:
+        store.close()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
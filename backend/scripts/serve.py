@@ -0,0 +1,62 @@
+"""Run the API as one ingestion writer plus N query workers sharing its index.
+
+The writer (VECTOR_STORE_ROLE=writer) serves uploads, deletes and vacuums on
+`--writer-port` and publishes a new index generation after each change.
+The query workers (VECTOR_STORE_ROLE=reader) are one uvicorn with `--workers`
+processes on `--port`. They memory-map the current generation and pick up new
+ones while serving. Route /api/documents writes to the writer port.
+
+Usage (from backend/):
+    python -m scripts.serve --workers 4 --port 8000 --writer-port 8001
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def uvicorn(port: int, host: str, workers: int, role: str) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port)]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, env={**os.environ, "VECTOR_STORE_ROLE": role})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="query workers")
+    parser.add_argument("--writer-port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    writer = uvicorn(args.writer_port, args.host, 1, "writer")
+    readers = uvicorn(args.port, args.host, args.workers, "reader")
+    servers = [writer, readers]
+
+    def interrupt(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, interrupt)
+    exited = None
+    try:
+        while exited is None:
+            time.sleep(1)
+            exited = next((server for server in servers if server.poll() is not None), None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            if server.poll() is None:
+                server.terminate()
+        for server in servers:
+            server.wait()
+    # One of them stopped on its own: fail so a supervisor restarts both
+    if exited is not None:
+        sys.exit(exited.returncode or 1)
+
+
+if __name__ == "__main__":
+    main()
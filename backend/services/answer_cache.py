@@ -0,0 +1,181 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional
+
+import faiss
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+# No corpus version seen yet
+_UNSET = object()
+
+
+def normalize_question(question: str) -> str:
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip("?!. ")
+
+
+class AnswerCache:
+    """Answer cache for RAGPipeline keyed by (question, domain, role, corpus version).
+
+    Questions match exactly after normalization, or approximately when the
+    cosine similarity of their embeddings reaches `similarity_threshold`
+    (searched in a small dedicated FAISS inner-product index). Entries expire
+    after `ttl_s`, the least recently used are evicted beyond `capacity`, and
+    everything is dropped as soon as the corpus version changes.
+
+    Requests that read the version before a change may still arrive with
+    it afterwards. Their lookups miss and their answers are not stored, so
+    they never bring an earlier version back.
+    """
+
+    def __init__(self, capacity: int = 1024, ttl_s: float = 3600.0, similarity_threshold: float = 0.95):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_key: Dict[bytes, int] = {}
+        self._index = None
+        self._next_id = 0
+        self._version: Hashable = _UNSET
+        self._retired = deque(maxlen=64)
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(question: str, domain: Optional[str], role: Optional[str]) -> bytes:
+        raw = "\0".join([normalize_question(question), domain or "", role or ""])
+        return hashlib.sha1(raw.encode("utf-8")).digest()
+
+    def get(self, question: str, domain: Optional[str], role: Optional[str], version: Hashable) -> Optional[Dict]:
+        """Exact lookup by normalized question hash."""
+        with self._lock:
+            if not self._current(version):
+                return None
+            entry_id = self._by_key.get(self._key(question, domain, role))
+            entry = self._live_entry(entry_id)
+            if entry is None:
+                return None
+            self.exact_hits += 1
+            return entry["response"]
+
+    def get_similar(
+        self, embedding: np.ndarray, domain: Optional[str], role: Optional[str], version: Hashable
+    ) -> Optional[Dict]:
+        """Approximate lookup by query-embedding similarity; counts a miss on failure."""
+        with self._lock:
+            if self._current(version) and self._index is not None and self._index.ntotal:
+                query = self._normalized(embedding)
+                scores, ids = self._index.search(query, min(8, self._index.ntotal))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if score < self.similarity_threshold:
+                        break
+                    entry = self._live_entry(int(entry_id))
+                    if entry is not None and entry["domain"] == domain and entry["role"] == role:
+                        self.semantic_hits += 1
+                        return entry["response"]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        domain: Optional[str],
+        role: Optional[str],
+        version: Hashable,
+        response: Dict,
+        embedding: Optional[np.ndarray] = None,
+    ):
+        with self._lock:
+            if self._version is _UNSET:
+                self._current(version)
+            elif version != self._version:
+                # Built while the corpus changed, possibly from the old content
+                return
+            key = self._key(question, domain, role)
+            if key in self._by_key:
+                self._remove(self._by_key[key])
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "key": key,
+                "domain": domain,
+                "role": role,
+                "response": response,
+                "expires": time.monotonic() + self.ttl_s,
+                "indexed": embedding is not None,
+            }
+            self._by_key[key] = entry_id
+            if embedding is not None:
+                vector = self._normalized(embedding)
+                if self._index is None:
+                    self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def _current(self, version: Hashable) -> bool:
+        """Whether `version` is the current one. A version never seen before
+        becomes current, dropping every entry; a replaced one is stale."""
+        if version == self._version:
+            return True
+        if version in self._retired:
+            return False
+        if self._entries:
+            self.invalidations += 1
+        self._clear()
+        if self._version is not _UNSET:
+            self._retired.append(self._version)
+        self._version = version
+        return True
+
+    def _live_entry(self, entry_id: Optional[int]) -> Optional[Dict]:
+        if entry_id is None or entry_id not in self._entries:
+            return None
+        entry = self._entries[entry_id]
+        if entry["expires"] < time.monotonic():
+            self._remove(entry_id)
+            return None
+        self._entries.move_to_end(entry_id)
+        return entry
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        del self._by_key[entry["key"]]
+        if entry["indexed"]:
+            self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_key.clear()
+        if self._index is not None:
+            self._index.reset()
+
+    @staticmethod
+    def _normalized(embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
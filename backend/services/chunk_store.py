@@ -0,0 +1,151 @@
+import mmap
+import os
+import threading
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+class ChunkStore:
+    """Append-only on-disk chunk storage read through read-only memory maps.
+
+    `chunks.bin` holds the UTF-8 bytes of every chunk back to back and
+    `chunks.idx` holds one uint64 end offset per chunk. Readers only decode
+    the chunks they ask for, and processes mapping the same files share
+    their pages through the OS page cache.
+
+    With `count`, the store is opened read-only as exactly its first
+    `count` chunks (a published index generation, see services/generations.py):
+    nothing is recovered or appended, so another process may keep appending
+    to the same files.
+    """
+
+    def __init__(self, directory: str, name: str = "chunks", count: Optional[int] = None):
+        self.blob_path = os.path.join(directory, f"{name}.bin")
+        self.offsets_path = os.path.join(directory, f"{name}.idx")
+        self.read_only = count is not None
+        self._lock = threading.Lock()
+
+        if self.read_only:
+            self._count = count
+            self._end = self._offsets_at(count - 1) if count else 0
+            self._blob_file = self._offsets_file = None
+        else:
+            for path in (self.blob_path, self.offsets_path):
+                if not os.path.exists(path):
+                    open(path, "wb").close()
+            self._recover()
+            self._blob_file = open(self.blob_path, "ab")
+            self._offsets_file = open(self.offsets_path, "ab")
+        # (count, offsets, blob) swapped as one tuple so readers never mix maps
+        self._maps = (0, np.zeros(0, dtype=np.uint64), b"")
+        if self.read_only:
+            # Mapped now, so the data outlives the files being deleted
+            self._ensure_mapped()
+
+    def _recover(self):
+        """Drop partially written entries left behind by an interrupted append."""
+        count = os.path.getsize(self.offsets_path) // 8
+        with open(self.offsets_path, "r+b") as f:
+            f.truncate(count * 8)
+        end = 0
+        if count:
+            end = int(np.fromfile(self.offsets_path, dtype=np.uint64, offset=(count - 1) * 8)[0])
+        with open(self.blob_path, "r+b") as f:
+            f.truncate(end)
+        self._count = count
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        _, offsets, blob = self._ensure_mapped()
+        start = int(offsets[i - 1]) if i else 0
+        return blob[start:int(offsets[i])].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self[i]
+
+    def get_many(self, ids: Iterable[int]) -> List[str]:
+        return [self[i] for i in ids]
+
+    def append(self, chunks: List[str]) -> int:
+        """Append chunks and return the id of the first one."""
+        if self.read_only:
+            raise ValueError(f"{self.blob_path} is open read-only")
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        with self._lock:
+            start_id = self._count
+            ends = self._end + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+            # The blob goes first so a committed offset never points past it
+            self._blob_file.write(b"".join(encoded))
+            self._blob_file.flush()
+            self._offsets_file.write(ends.astype(np.uint64).tobytes())
+            self._offsets_file.flush()
+            self._count += len(encoded)
+            if len(encoded):
+                self._end = int(ends[-1])
+        return start_id
+
+    def truncate(self, count: int) -> None:
+        """Forget every chunk from position `count` onwards."""
+        if self.read_only:
+            raise ValueError(f"{self.blob_path} is open read-only")
+        with self._lock:
+            if count >= self._count:
+                return
+            self._close_maps()
+            end = int(self._offsets_at(count - 1)) if count else 0
+            self._offsets_file.truncate(count * 8)
+            self._blob_file.truncate(end)
+            self._count = count
+            self._end = end
+
+    def flush(self) -> None:
+        """Force appended chunks to stable storage."""
+        if self.read_only:
+            return
+        with self._lock:
+            for f in (self._blob_file, self._offsets_file):
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _offsets_at(self, i: int) -> int:
+        return int(np.fromfile(self.offsets_path, dtype=np.uint64, count=1, offset=i * 8)[0])
+
+    def _ensure_mapped(self):
+        maps = self._maps
+        if maps[0] == self._count:
+            return maps
+        with self._lock:
+            if self._maps[0] != self._count:
+                blob, offsets = b"", np.zeros(0, dtype=np.uint64)
+                if self._end:
+                    with open(self.blob_path, "rb") as f:
+                        blob = mmap.mmap(f.fileno(), self._end, access=mmap.ACCESS_READ)
+                if self._count:
+                    offsets = np.memmap(
+                        self.offsets_path, dtype=np.uint64, mode="r", shape=(self._count,)
+                    )
+                # Superseded maps are released once in-flight readers drop them
+                self._maps = (self._count, offsets, blob)
+            return self._maps
+
+    def _close_maps(self):
+        _, _, blob = self._maps
+        if isinstance(blob, mmap.mmap):
+            blob.close()
+        self._maps = (0, np.zeros(0, dtype=np.uint64), b"")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_maps()
+            if not self.read_only:
+                self._blob_file.close()
+                self._offsets_file.close()
@@ -0,0 +1,157 @@
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Break candidates by preference; a match's end is where the next chunk may start
+_BREAKS = {
+    "paragraph": re.compile(r"\n[ \t]*\n\s*"),
+    "sentence": re.compile(r"[.!?][\"')\]]*\s+"),
+    "word": re.compile(r"\s+"),
+}
+BOUNDARIES = ("paragraph", "sentence", "word", "none")
+# Approximate LLM tokens, like r"\w+|[^\w\s]": words, numbers and single punctuation
+# marks. ASCII characters are classified by table; other characters count as word characters.
+_SPACE, _WORD, _PUNCT = 0, 1, 2
+_ASCII_CLASS = np.array(
+    [_SPACE if chr(c).isspace() else _WORD if chr(c).isalnum() or chr(c) == "_" else _PUNCT for c in range(128)],
+    dtype=np.uint8,
+)
+
+
+def token_starts(text: str) -> np.ndarray:
+    """Character offsets where tokens start, found without a Python-level loop."""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    classes = np.where(codes < 128, _ASCII_CLASS[np.minimum(codes, 127)], _WORD)
+    previous = np.empty_like(classes)
+    previous[:1] = _SPACE
+    previous[1:] = classes[:-1]
+    return np.flatnonzero((classes == _PUNCT) | ((classes == _WORD) & (previous != _WORD)))
+
+
+class Chunker:
+    """Splits text into overlapping chunks using character offsets into the original string.
+
+    A chunk holds at most `chunk_size` units (characters, or with
+    unit="tokens" word/punctuation tokens) and ends at the best break
+    found in its second half: a paragraph break, then a sentence end,
+    then whitespace, in the order allowed by `boundary`, else a hard cut.
+    The next chunk starts `overlap` units before the previous end,
+    moved forward to a word start. Breaks are searched only inside each
+    chunk's window (regex, str.rfind, and NumPy over token offsets with
+    unit="tokens"), and chunks are slices of the original string, so no
+    word lists are built.
+    """
+
+    def __init__(self, chunk_size: int = 512, overlap: int = 64, unit: str = "chars", boundary: str = "sentence"):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk unit '{unit}', expected 'chars' or 'tokens'")
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"Unknown chunk boundary '{boundary}', expected one of {BOUNDARIES}")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.unit = unit
+        self.breaks = [] if boundary == "none" else list(_BREAKS)[list(_BREAKS).index(boundary):]
+
+    def chunk_text(self, text: str) -> List[str]:
+        return list(self.chunk_segments([text]))
+
+    def chunk_segments(self, segments: Iterable[str], window: int = 1 << 16) -> Iterator[str]:
+        """Lazily chunk a stream of segments (pages, sheet blocks) as one text.
+
+        Segments are joined with a newline and processed about `window`
+        characters at a time; text after the last chunk that is certainly
+        complete is carried into the next window.
+        """
+        buffer = ""
+        for segment in segments:
+            buffer = f"{buffer}\n{segment}" if buffer else segment
+            if len(buffer) >= window:
+                consumed = 0
+                for start, end, consumed in self._spans(buffer, final=False):
+                    chunk = buffer[start:end].strip()
+                    if chunk:
+                        yield chunk
+                buffer = buffer[consumed:]
+        if buffer:
+            for start, end, _ in self._spans(buffer, final=True):
+                chunk = buffer[start:end].strip()
+                if chunk:
+                    yield chunk
+
+    def _spans(self, text: str, final: bool) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, next start) character spans of the chunks in `text`.
+
+        Unless `final`, stops while less than two chunks of text remain, as
+        that tail may still continue in the next segment.
+        """
+        offsets = _Offsets(text, self)
+        start = offsets.skip_space(0)
+        while start < len(text):
+            limit = offsets.limit(start)
+            if limit >= len(text) or (not final and offsets.limit(limit) >= len(text)):
+                if final:
+                    yield start, len(text), len(text)
+                return
+            end = offsets.break_before(start, limit)
+            next_start = offsets.next_start(start, end)
+            yield start, end, next_start
+            start = next_start
+
+
+class _Offsets:
+    """Boundary lookups in one text; only the window of the chunk being cut is scanned."""
+
+    def __init__(self, text: str, chunker: Chunker):
+        self.text = text
+        self.chunk_size = chunker.chunk_size
+        self.overlap = chunker.overlap
+        self.unit = chunker.unit
+        self.breaks = chunker.breaks
+        if self.unit == "tokens":
+            self.tokens = token_starts(text)
+
+    def limit(self, start: int) -> int:
+        """Character offset `chunk_size` units after `start`."""
+        if self.unit == "chars":
+            return start + self.chunk_size
+        last = np.searchsorted(self.tokens, start) + self.chunk_size
+        return int(self.tokens[last]) if last < len(self.tokens) else len(self.text)
+
+    def break_before(self, start: int, limit: int) -> int:
+        """Best break in the second half of (start, limit], else `limit`."""
+        floor = start + (limit - start) // 2
+        text = self.text
+        for name in self.breaks:
+            if name == "word":
+                # str.rfind runs in C and needs no match objects
+                pos = max(text.rfind(" ", floor, limit), text.rfind("\n", floor, limit))
+                if pos >= 0:
+                    return pos + 1
+                continue
+            end = -1
+            for match in _BREAKS[name].finditer(text, floor, limit):
+                end = match.end()
+            if end > floor:
+                return end
+        return limit
+
+    def next_start(self, start: int, end: int) -> int:
+        if self.overlap == 0:
+            return self.skip_space(end)
+        if self.unit == "chars":
+            back = end - self.overlap
+        else:
+            back = int(self.tokens[max(np.searchsorted(self.tokens, end) - self.overlap, 0)])
+        # Start the overlap at a word start, and always make progress
+        match = _BREAKS["word"].search(self.text, max(back - 1, 0), end)
+        back = match.end() if match and match.end() < end else end
+        return max(back, start + 1)
+
+    def skip_space(self, pos: int) -> int:
+        text = self.text
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        return pos
@@ -0,0 +1,163 @@
+import functools
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+@functools.lru_cache(maxsize=None)
+def load_token_counter(encoding: str = "o200k_base") -> Callable[[str], int]:
+    """Token counter for `encoding`, loaded once per process: tiktoken when
+    available, else a characters / 4 estimate. The first load reads (or
+    downloads) the BPE file, so the app does it at startup (core/resources.py).
+    """
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding(encoding)
+    except Exception as e:  # not installed, or the BPE file cannot be fetched
+        print(f"Warning: tiktoken unavailable ({e}); estimating tokens as characters / 4.")
+        return _estimate_tokens
+    return lambda text: len(enc.encode_ordinary(text))
+
+
+def count_tokens(text: str, encoding: str = "o200k_base") -> int:
+    """Token count with tiktoken when available, else a characters / 4 estimate."""
+    return load_token_counter(encoding)(text)
+
+
+class ContextBuilder:
+    """Assembles the LLM context from KG facts and retrieved chunks within a token budget.
+
+    KG facts are deduplicated and capped at `max_kg_facts`. Chunks are
+    deduplicated (exact text, or cosine similarity of at least
+    `dedupe_threshold`) and ordered by maximal marginal relevance,
+    `mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to the
+    chunks already picked`, using the query and chunk embeddings when they
+    are given. Items are then taken in that order while they fit in
+    `max_tokens`.
+    """
+
+    KG_HEADER = "Knowledge Graph Information:\n"
+    CHUNK_HEADER = "Related Content:\n"
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        max_kg_facts: int = 25,
+        mmr_lambda: float = 0.7,
+        dedupe_threshold: float = 0.95,
+        encoding: str = "o200k_base",
+    ):
+        self.max_tokens = max_tokens
+        self.max_kg_facts = max_kg_facts
+        self.mmr_lambda = mmr_lambda
+        self.dedupe_threshold = dedupe_threshold
+        self.encoding = encoding
+
+    def build(
+        self,
+        kg_results: List[Dict],
+        vector_results: List[Dict],
+        query_vector: Optional[np.ndarray] = None,
+        chunk_vectors: Optional[np.ndarray] = None,
+    ) -> Tuple[str, Dict[str, int]]:
+        """Returns the context string and its token usage against the budget."""
+        facts = self._facts(kg_results)
+        chunks = self._rank_chunks(vector_results, query_vector, chunk_vectors)
+
+        budget = self.max_tokens
+        used = 0
+        kg_lines, chunk_lines = [], []
+        for lines, header, candidates in (
+            (kg_lines, self.KG_HEADER, [f"- {r['type']}: {r['value']}\n" for r in facts]),
+            (chunk_lines, self.CHUNK_HEADER, [
+                f"- {r['content']} (similarity: {r['score']:.2f})\n" for r in chunks
+            ]),
+        ):
+            # Sections are separated by a newline, counted with the header
+            header_tokens = self._count(header) + (1 if used else 0)
+            for line in candidates:
+                cost = self._count(line) + (0 if lines else header_tokens)
+                if used + cost <= budget:
+                    lines.append(line)
+                    used += cost
+
+        context_parts = []
+        if kg_lines:
+            context_parts.append(self.KG_HEADER + "".join(kg_lines))
+        if chunk_lines:
+            context_parts.append(self.CHUNK_HEADER + "".join(chunk_lines))
+
+        return "\n".join(context_parts), {
+            "tokens": used,
+            "budget": budget,
+            "kg_facts": len(kg_lines),
+            "kg_facts_dropped": len(kg_results) - len(kg_lines),
+            "chunks": len(chunk_lines),
+            "chunks_dropped": len(vector_results) - len(chunk_lines),
+        }
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.encoding)
+
+    def _facts(self, kg_results: List[Dict]) -> List[Dict]:
+        seen = set()
+        facts = []
+        for result in kg_results:
+            key = (result["type"], str(result["value"]).strip().lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            facts.append(result)
+            if len(facts) >= self.max_kg_facts:
+                break
+        return facts
+
+    def _rank_chunks(
+        self,
+        vector_results: List[Dict],
+        query_vector: Optional[np.ndarray],
+        chunk_vectors: Optional[np.ndarray],
+    ) -> List[Dict]:
+        seen = set()
+        keep = []
+        for i, result in enumerate(vector_results):
+            key = " ".join(result["content"].split()).lower()
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+
+        if chunk_vectors is None or not keep:
+            return sorted((vector_results[i] for i in keep), key=lambda r: -r["score"])
+
+        vectors = _normalized(np.asarray(chunk_vectors, dtype=np.float32)[keep])
+        if query_vector is not None:
+            relevance = vectors @ _normalized(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        else:
+            relevance = np.array([vector_results[i]["score"] for i in keep], dtype=np.float32)
+        similarity = vectors @ vectors.T
+
+        selected: List[int] = []
+        remaining = list(range(len(keep)))
+        # Highest similarity of each remaining chunk to anything selected so far
+        redundancy = np.full(len(keep), -np.inf, dtype=np.float32)
+        while remaining:
+            if selected:
+                mmr = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy[remaining]
+            else:
+                mmr = relevance[remaining]
+            best = remaining.pop(int(np.argmax(mmr)))
+            if redundancy[best] >= self.dedupe_threshold:
+                continue
+            selected.append(best)
+            np.maximum(redundancy, similarity[best], out=redundancy)
+        return [vector_results[keep[i]] for i in selected]
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
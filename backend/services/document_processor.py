@@ -1,56 +1,248 @@
-import pandas as pd
-import pdfplumber
-from typing import Dict, Any
-import spacy
+import asyncio
+import hashlib
+import inspect
+from typing import Dict, Any, Iterator, List
+from core import metrics
+from core.config import Settings
+from services.executors import get_stage_executors
+from services.extraction import extract_segments, iter_segments
 from services.knowledge_graph import KnowledgeGraph
+from services.ner import NEREngine
 from services.vector_store import VectorStore
 
+
+def _filename(file) -> str:
+    # FastAPI's UploadFile has .filename, Streamlit's UploadedFile has .name
+    return getattr(file, "filename", None) or file.name
+
+
+def _size(file):
+    return getattr(file, "size", None)
+
+
+def _binary_stream(file):
+    # UploadFile wraps a spooled temp file; Streamlit's UploadedFile is a BytesIO
+    stream = getattr(file, "file", None) or file
+    stream.seek(0)
+    return stream
+
+
+async def _read_bytes(file) -> bytes:
+    # UploadFile.read() is a coroutine, Streamlit's UploadedFile.read() is not
+    data = file.read()
+    if inspect.isawaitable(data):
+        data = await data
+    return data
+
+
+def _file_type(filename: str) -> str:
+    return filename.rsplit(".", 1)[-1].lower()
+
+
+def _stream_hash(stream) -> str:
+    """sha256 of a seekable binary stream, read in blocks and rewound."""
+    hasher = hashlib.sha256()
+    for block in iter(lambda: stream.read(1 << 20), b""):
+        hasher.update(block)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+
+def _take(segments: Iterator[str], n: int) -> List[str]:
+    return [segment for _, segment in zip(range(n), segments)]
+
+
 class DocumentProcessor:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
-        self.kg = KnowledgeGraph()
-        self.vector_store = VectorStore()
+    def __init__(
+        self, kg: KnowledgeGraph = None, vector_store: VectorStore = None, nlp=None, ner: NEREngine = None
+    ):
+        """`ner` defaults to an NEREngine on the NER-only pipeline, or on `nlp` when one is given."""
+        settings = Settings()
+        self.ner = ner or NEREngine(nlp=nlp)
+        self.kg = kg or KnowledgeGraph()
+        self.vector_store = vector_store or VectorStore()
+        self.executors = get_stage_executors()
+        self.stream_min_bytes = settings.STREAM_MIN_BYTES
+        self.stream_window = settings.STREAM_WINDOW_SEGMENTS
+        self.segment_options = {
+            "max_chars": settings.SEGMENT_MAX_CHARS,
+            "rows_per_segment": settings.EXCEL_ROWS_PER_SEGMENT,
+        }
 
     async def process_file(self, file) -> Dict[str, Any]:
-        content = await self._extract_content(file)
-        entities = self._extract_entities(content)
-        
-        # Store in knowledge graph
-        self.kg.add_entities(entities)
-        
-        # Store embeddings
-        self.vector_store.add_document(content)
-        
-        return {
-            "filename": file.name,  # <-- Changed from file.filename
-            "entities": entities,
-            "status": "processed"
+        return (await self.process_files([file]))[0]
+
+    async def process_files(self, files, domain: str = None) -> List[Dict[str, Any]]:
+        """
+        Staged ingestion for a whole upload. Regular files are parsed
+        concurrently, then NER (one nlp.pipe over every segment) and embedding
+        (one batched encode over every chunk) run side by side, and the graph
+        write and vector-store commit happen once for the request. Files of at
+        least STREAM_MIN_BYTES are instead streamed window by window so memory
+        stays bounded by the window, not the file; such a file becomes
+        searchable once its last window is stored. Vectors are committed only
+        after the graph write succeeded, so a batch that fails in NER or the
+        graph write leaves the vector store untouched.
+
+        Files whose content is already stored are skipped ("unchanged"); a
+        file with the name of a stored document replaces it.
+        """
+        filenames = [_filename(file) for file in files]
+        large = [(_size(file) or 0) >= self.stream_min_bytes for file in files]
+        results: List[Dict[str, Any]] = [None] * len(files)
+
+        batched = [i for i in range(len(files)) if not large[i]]
+        if batched:
+            batched_results = await self._ingest_batched([files[i] for i in batched], domain)
+            for i, result in zip(batched, batched_results):
+                results[i] = result
+
+        for i in range(len(files)):
+            if large[i]:
+                results[i] = await self._ingest_streamed(files[i], domain)
+
+        for result in results:
+            metrics.inc("rag_documents_ingested_total", status=result["status"])
+        return [
+            {"filename": filename, **result}
+            for filename, result in zip(filenames, results)
+        ]
+
+    async def _ingest_batched(self, files, domain: str = None) -> List[Dict[str, Any]]:
+        datas = await asyncio.gather(*(_read_bytes(file) for file in files))
+        hashes = [hashlib.sha256(data).hexdigest() for data in datas]
+        results: List[Dict[str, Any]] = [None] * len(files)
+        new = []
+        for i, content_hash in enumerate(hashes):
+            existing = self.vector_store.find_document(content_hash)
+            if existing is not None:
+                results[i] = {"entities": {}, "status": "unchanged", "doc_id": existing["doc_id"]}
+            else:
+                new.append(i)
+        if not new:
+            return results
+
+        with metrics.span("parse"):
+            segments_per_file = await asyncio.gather(
+                *(self._extract_segments(files[i], datas[i]) for i in new)
+            )
+        metadata = [
+            {
+                "name": _filename(files[i]),
+                "content_hash": hashes[i],
+                "domain": domain,
+                "file_type": _file_type(_filename(files[i])),
+            }
+            for i in new
+        ]
+
+        # NER and the graph write overlap with encoding, so the spans overlap too.
+        # The vectors are only committed once both succeeded: a failed batch
+        # leaves nothing in the vector store.
+        embedding = asyncio.ensure_future(metrics.traced("embed", self.executors.run(
+            "embed", self.vector_store.prepare_documents, segments_per_file, metadata=metadata
+        )))
+        try:
+            with metrics.span("ner"):
+                entities_per_file = await self.executors.run(
+                    "ner", self.ner.extract_groups, segments_per_file
+                )
+            await metrics.traced("graph_write", self.kg.aadd_entities(_merge_entities(entities_per_file)))
+            prepared = await embedding
+        finally:
+            if not embedding.done():
+                # The worker finishes encoding, but nothing is stored
+                embedding.cancel()
+        doc_ids = await metrics.traced("embed", self.executors.run(
+            "embed", self.vector_store.commit_documents, prepared
+        ))
+        for i, entities, doc_id in zip(new, entities_per_file, doc_ids):
+            results[i] = {"entities": entities, "status": "processed", "doc_id": doc_id}
+        return results
+
+    async def _ingest_streamed(self, file, domain: str = None) -> Dict[str, Any]:
+        filename = _filename(file)
+        stream = _binary_stream(file)
+        # Generators cannot be shipped to a process pool, so always pull on a thread
+        pool = self.executors.thread_pool("parse")
+        loop = asyncio.get_running_loop()
+
+        content_hash = await loop.run_in_executor(pool, _stream_hash, stream)
+        existing = self.vector_store.find_document(content_hash)
+        if existing is not None:
+            return {"entities": {}, "status": "unchanged", "doc_id": existing["doc_id"]}
+        segments = iter_segments(filename, stream, **self.segment_options)
+        metadata = {
+            "name": filename,
+            "content_hash": content_hash,
+            "domain": domain,
+            "file_type": _file_type(filename),
         }
 
-    async def _extract_content(self, file) -> str:
-        ext = file.name.split(".")[-1].lower()  # <-- Changed from file.filename
-        content = ""
-        
-        if ext == "pdf":
-            with pdfplumber.open(file) as pdf:  # file.file is optional; pdfplumber can take UploadedFile
-                for page in pdf.pages:
-                    content += page.extract_text() or ""
-        elif ext == "txt":
-            content = await file.read()
-            content = content.decode("utf-8")
-        elif ext in ["xlsx", "xls"]:
-            df = pd.read_excel(file)  # UploadedFile works directly with pandas
-            content = df.to_string()
-        
-        return content
+        entities_per_window: List[Dict[str, list]] = []
+        doc_id = None
+        next_window = loop.run_in_executor(pool, _take, segments, self.stream_window)
+        try:
+            while True:
+                try:
+                    with metrics.span("parse"):
+                        window = await next_window
+                except Exception as e:
+                    raise ValueError(f"Could not parse {filename}: {e}") from e
+                if not window:
+                    break
+                # Parse the following window while this one is analysed and stored
+                next_window = loop.run_in_executor(pool, _take, segments, self.stream_window)
+
+                with metrics.span("ner"):
+                    window_entities = (await self.executors.run("ner", self.ner.extract_groups, [window]))[0]
+                # The first window registers the document as pending, later ones append to it
+                window_metadata = {**metadata, "pending": True} if doc_id is None else {"doc_id": doc_id}
+                _, prepared = await asyncio.gather(
+                    metrics.traced("graph_write", self.kg.aadd_entities(window_entities)),
+                    metrics.traced("embed", self.executors.run(
+                        "embed", self.vector_store.prepare_documents, [window], metadata=[window_metadata]
+                    )),
+                )
+                # Committed only once the window's entities are in the graph
+                doc_ids = await metrics.traced("embed", self.executors.run(
+                    "embed", self.vector_store.commit_documents, prepared
+                ))
+                if doc_id is None and not prepared.new_docs:
+                    # The same content was stored since the hash check
+                    return {"entities": {}, "status": "unchanged", "doc_id": doc_ids[0]}
+                doc_id = doc_ids[0]
+                entities_per_window.append(window_entities)
+            if doc_id is not None:
+                # Only the whole file gets its hash and replaces a stored document of its name
+                doc_id = await self.executors.run("embed", self.vector_store.finish_document, doc_id)
+        except BaseException:
+            if doc_id is not None:
+                # Drop the partial document, so a retry is not taken for an unchanged upload
+                self.vector_store.delete_document(doc_id)
+            raise
+        return {"entities": _merge_entities(entities_per_window), "status": "processed", "doc_id": doc_id}
+
+    async def _extract_segments(self, file, data: bytes) -> List[str]:
+        filename = _filename(file)
+        try:
+            return await self.executors.run(
+                "parse", extract_segments, filename, data, **self.segment_options
+            )
+        except Exception as e:
+            raise ValueError(f"Could not parse {filename}: {e}") from e
 
     def _extract_entities(self, text: str) -> Dict[str, list]:
-        doc = self.nlp(text)
-        entities = {}
-        
-        for ent in doc.ents:
-            if ent.label_ not in entities:
-                entities[ent.label_] = []
-            entities[ent.label_].append(ent.text)
-        
-        return entities
+        return self.ner.extract(text)
+
+    def _extract_entities_batch(self, texts: List[str]) -> List[Dict[str, list]]:
+        return self.ner.extract_many(texts)
+
+
+def _merge_entities(entities_per_file: List[Dict[str, list]]) -> Dict[str, list]:
+    """Union of several {label: [values]} maps, values kept unique in first-seen order."""
+    merged: Dict[str, Dict[str, None]] = {}
+    for entities in entities_per_file:
+        for entity_type, values in entities.items():
+            merged.setdefault(entity_type, {}).update(dict.fromkeys(values))
+    return {entity_type: list(values) for entity_type, values in merged.items()}
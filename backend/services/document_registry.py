@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Chunks stored before documents were tracked belong to this document
+LEGACY_DOC_ID = 0
+FILTER_KEYS = ("domain", "file_type", "name", "doc_id")
+
+
+class DocumentRegistry:
+    """Documents of a VectorStore and the chunk -> document mapping.
+
+    Documents carry a name (e.g. the uploaded file name), a content hash
+    and filterable metadata (domain, file_type). `chunk_docs` holds one
+    uint32 document id per chunk id, so filters and deletions become a
+    boolean mask over chunk ids without touching the chunks themselves.
+    Deleted documents stay as tombstones until VectorStore.vacuum().
+    A `pending` document (a file still being streamed in) holds chunks
+    but is hidden from searches, listings and lookups by hash or name
+    until a record marks it `completed`.
+
+    Every change is described by a JSON record (see `apply`) that the
+    store writes to its log, so replaying the log rebuilds the registry.
+    """
+
+    def __init__(self):
+        self.docs: Dict[int, Dict] = {}
+        self.chunk_docs = array("I")
+        self.next_doc_id = LEGACY_DOC_ID + 1
+        self._by_hash: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._live_mask = None
+
+    def __len__(self) -> int:
+        return len(self.chunk_docs)
+
+    def get(self, doc_id: int) -> Optional[Dict]:
+        doc = self.docs.get(doc_id)
+        return None if doc is None or doc["deleted"] else doc
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        return self.get(self._by_hash.get(content_hash, -1))
+
+    def find_by_name(self, name: str) -> Optional[Dict]:
+        return self.get(self._by_name.get(name, -1))
+
+    def documents(self) -> List[Dict]:
+        """Live documents with their chunk counts.
+
+        Held under the lock: apply() cannot grow chunk_docs while a numpy
+        view of it exists (BufferError).
+        """
+        with self._lock:
+            counts = np.bincount(
+                np.frombuffer(self.chunk_docs, dtype=np.uint32), minlength=self.next_doc_id
+            ) if self.chunk_docs else np.zeros(self.next_doc_id, dtype=np.int64)
+            return [
+                {**doc, "chunks": int(counts[doc_id])}
+                for doc_id, doc in sorted(self.docs.items())
+                if not _hidden(doc)
+            ]
+
+    @property
+    def has_tombstones(self) -> bool:
+        return any(doc["deleted"] for doc in self.docs.values())
+
+    def pending_docs(self) -> List[int]:
+        return [doc_id for doc_id, doc in list(self.docs.items()) if doc.get("pending") and not doc["deleted"]]
+
+    def new_doc(self, name: Optional[str], content_hash: Optional[str], domain=None, file_type=None) -> Dict:
+        """A document entry with a fresh id; registered when its record is applied."""
+        with self._lock:
+            doc_id = self.next_doc_id
+            self.next_doc_id += 1
+        return {
+            "doc_id": doc_id,
+            "name": name,
+            "content_hash": content_hash,
+            "domain": domain,
+            "file_type": file_type,
+            "deleted": False,
+        }
+
+    def apply(self, record: Dict, start: int, count: int):
+        """Apply one log record; idempotent, so replaying a record twice is harmless.
+
+        record = {"docs": [entries], "runs": [[doc_id, n], ...], "deleted": [doc_id, ...],
+                  "completed": [doc_id, ...]}
+        where the runs assign the record's `count` chunks, starting at chunk
+        id `start`, to documents in order, and completed pending documents
+        become visible.
+        """
+        with self._lock:
+            for doc in record.get("docs", ()):
+                if doc["doc_id"] not in self.docs:
+                    self._register(dict(doc))
+            if start > len(self.chunk_docs):
+                # Chunks from before documents were tracked
+                self._pad_legacy(start)
+            if start + count > len(self.chunk_docs):
+                doc_ids = array("I")
+                for doc_id, n in record.get("runs", ()):
+                    doc_ids.extend(array("I", [doc_id]) * n)
+                if len(doc_ids) != count:
+                    doc_ids = array("I", [LEGACY_DOC_ID]) * count
+                self.chunk_docs.extend(doc_ids[len(self.chunk_docs) - start:])
+            for doc_id in record.get("deleted", ()):
+                doc = self.docs.get(doc_id)
+                if doc is not None and not doc["deleted"]:
+                    doc["deleted"] = True
+                    self._unindex(doc)
+            for doc_id in record.get("completed", ()):
+                doc = self.docs.get(doc_id)
+                if doc is not None and doc.get("pending"):
+                    doc["pending"] = False
+                    self._register(doc)
+            self._live_mask = None
+
+    def truncate(self, count: int):
+        """Forget chunk ids >= count (chunks dropped by crash recovery)."""
+        with self._lock:
+            if count < len(self.chunk_docs):
+                del self.chunk_docs[count:]
+            elif count > len(self.chunk_docs):
+                self._pad_legacy(count)
+            self._live_mask = None
+
+    def chunk_mask(self, filters: Optional[Dict] = None) -> Optional[np.ndarray]:
+        """Boolean mask over chunk ids of live chunks matching `filters`, or None if all match.
+
+        `filters` maps keys of FILTER_KEYS to a value or a list of accepted values.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s) {sorted(unknown)}, expected {FILTER_KEYS}")
+        if not filters:
+            return self._live()
+
+        accepted = {
+            key: set(value) if isinstance(value, (list, tuple, set)) else {value}
+            for key, value in filters.items()
+        }
+        doc_ok = np.zeros(self.next_doc_id, dtype=bool)
+        for doc_id, doc in list(self.docs.items()):
+            doc_ok[doc_id] = not _hidden(doc) and all(
+                doc.get(key) in values for key, values in accepted.items()
+            )
+        return doc_ok[np.frombuffer(self.chunk_docs, dtype=np.uint32)]
+
+    def _live(self) -> Optional[np.ndarray]:
+        mask = self._live_mask
+        if mask is None or len(mask) != len(self.chunk_docs):
+            hidden = [doc_id for doc_id, doc in list(self.docs.items()) if _hidden(doc)]
+            if not hidden:
+                return None
+            mask = self._live_mask = self._without(hidden)
+        return mask
+
+    def retained_mask(self) -> Optional[np.ndarray]:
+        """Boolean mask over chunk ids of chunks a vacuum keeps (those of
+        documents that are not deleted, pending ones included), or None if all."""
+        deleted = [doc_id for doc_id, doc in list(self.docs.items()) if doc["deleted"]]
+        return self._without(deleted) if deleted else None
+
+    def _without(self, doc_ids: List[int]) -> np.ndarray:
+        doc_ok = np.ones(self.next_doc_id, dtype=bool)
+        doc_ok[doc_ids] = False
+        return doc_ok[np.frombuffer(self.chunk_docs, dtype=np.uint32)]
+
+    def compacted(self, keep: np.ndarray) -> "DocumentRegistry":
+        """Registry for the chunks at ids `keep`, without deleted documents.
+
+        A document deleted after `keep` was chosen keeps its tombstone while
+        it still owns kept chunks.
+        """
+        with self._lock:
+            chunk_docs = np.frombuffer(self.chunk_docs, dtype=np.uint32)[keep]
+            owners = set(np.unique(chunk_docs).tolist())
+            registry = DocumentRegistry()
+            registry.next_doc_id = self.next_doc_id
+            for doc_id, doc in self.docs.items():
+                if not doc["deleted"] or doc_id in owners:
+                    registry._register(dict(doc))
+            registry.chunk_docs = array("I", chunk_docs.tobytes())
+        return registry
+
+    def to_bytes(self) -> bytes:
+        """Serialized snapshot: a length-prefixed JSON header, then the uint32 chunk mapping."""
+        with self._lock:
+            header = json.dumps({
+                "next_doc_id": self.next_doc_id,
+                "docs": list(self.docs.values()),
+            }).encode("utf-8")
+            return len(header).to_bytes(8, "little") + header + self.chunk_docs.tobytes()
+
+    def save(self, path: str, data: Optional[bytes] = None):
+        """Write a snapshot (default: the current state) atomically (tmp file + os.replace)."""
+        data = self.to_bytes() if data is None else data
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DocumentRegistry":
+        registry = cls()
+        with open(path, "rb") as f:
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            registry.chunk_docs.frombytes(f.read())
+        registry.next_doc_id = header["next_doc_id"]
+        for doc in header["docs"]:
+            registry._register(doc)
+        return registry
+
+    def _register(self, doc: Dict):
+        self.docs[doc["doc_id"]] = doc
+        self.next_doc_id = max(self.next_doc_id, doc["doc_id"] + 1)
+        if not _hidden(doc):
+            if doc.get("content_hash"):
+                self._by_hash[doc["content_hash"]] = doc["doc_id"]
+            if doc.get("name"):
+                self._by_name[doc["name"]] = doc["doc_id"]
+
+    def _unindex(self, doc: Dict):
+        for index, key in ((self._by_hash, doc.get("content_hash")), (self._by_name, doc.get("name"))):
+            if key and index.get(key) == doc["doc_id"]:
+                del index[key]
+
+    def _pad_legacy(self, count: int):
+        if LEGACY_DOC_ID not in self.docs:
+            self._register({
+                "doc_id": LEGACY_DOC_ID,
+                "name": None,
+                "content_hash": None,
+                "domain": None,
+                "file_type": None,
+                "deleted": False,
+            })
+        self.chunk_docs.extend(array("I", [LEGACY_DOC_ID]) * (count - len(self.chunk_docs)))
+
+
+def _hidden(doc: Dict) -> bool:
+    return doc["deleted"] or bool(doc.get("pending"))
+
+
+def runs(doc_ids: Iterable[int]) -> List[List[int]]:
+    """Run-length encode consecutive chunk owners: [[doc_id, n], ...]."""
+    encoded: List[List[int]] = []
+    for doc_id in doc_ids:
+        if encoded and encoded[-1][0] == doc_id:
+            encoded[-1][1] += 1
+        else:
+            encoded.append([doc_id, 1])
+    return encoded
@@ -0,0 +1,177 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Embedding cache keyed by (model name, text hash).
+
+    A bounded in-memory LRU sits in front of an optional SQLite table, so
+    re-ingested chunks and repeated questions skip the model entirely.
+    New and reread embeddings are queued for the table and committed by a
+    background thread every `flush_interval_s`, so a miss never waits on
+    SQLite; the table keeps about the `disk_capacity` most recently stored
+    or read ones (oldest rowids are dropped, and a row read back is
+    rewritten at the end).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        capacity: int = 20000,
+        path: Optional[str] = None,
+        disk_capacity: int = 200_000,
+        flush_interval_s: float = 1.0,
+    ):
+        self.model_name = model_name
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self.flush_interval_s = flush_interval_s
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # Embeddings not yet written to the table
+        self._pending: Dict[bytes, np.ndarray] = {}
+        # _lock guards the LRU, the queue and the counters; _db_lock the connection
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._stopping = threading.Event()
+        self._flush_thread = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # A cache may lose its last commits on power loss; no fsync per commit
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return embeddings for `texts`, calling `encode_fn` once for the misses only."""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    # Evicted from memory before it was written
+                    vector = self._pending.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    found[key] = vector
+            self.memory_hits += len(found)
+            misses = list({key for key in keys if key not in found})
+
+        rows = []
+        if self._db is not None and misses:
+            with self._db_lock:
+                for start in range(0, len(misses), 500):
+                    batch = misses[start:start + 500]
+                    rows.extend(self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall())
+
+        with self._lock:
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                found[key] = vector
+                self._remember(key, vector)
+                # Rewritten with a new rowid, so it is trimmed last
+                self._pending[key] = vector
+            self.disk_hits += len(rows)
+            self.misses += len(misses) - len(rows)
+        return found
+
+    def _store(self, vectors: Dict[bytes, np.ndarray]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self._db is not None:
+                self._pending.update(vectors)
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        """Write queued embeddings to the table in one transaction, then trim
+        it to `disk_capacity` rows."""
+        if self._db is None:
+            return
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in pending.items()],
+            )
+            # Rowids grow with every insert, so this drops the least recently written
+            self._db.execute(
+                "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                (self.disk_capacity,),
+            )
+            self._db.commit()
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Warning: writing the embedding cache failed: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            memory_hits, disk_hits, misses = self.memory_hits, self.disk_hits, self.misses
+            memory_entries = len(self._memory)
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": (memory_hits + disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._stopping.set()
+            self._flush_thread.join()
+            self.flush()
+            self._db.close()
+            self._db = None
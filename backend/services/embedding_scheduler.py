@@ -0,0 +1,112 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingScheduler:
+    """Coalesces concurrent single-text encodes into batched model calls.
+
+    Callers await `embed(text)`. The first pending text opens a window of
+    `max_wait_ms`; everything that arrives before it closes (or until
+    `max_batch_size` texts are pending) is encoded in one call on a worker
+    thread, and each caller's future is resolved with its own row.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+
+        self._loop = None
+        self._worker = None
+        self._pending = deque()
+        self._wakeup = None
+        self._full = None
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Return the embedding of `text`, batched with concurrent callers."""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        # Rebind when first used from a new event loop (e.g. successive asyncio.run calls)
+        if self._loop is loop and self._worker and not self._worker.done():
+            return
+        self._loop = loop
+        self._pending.clear()
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+            if not self._pending:
+                self._wakeup.clear()
+            if batch:
+                await self._encode_batch(batch)
+
+    async def _encode_batch(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            wait = started - enqueued
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        texts = [text for text, _, _ in batch]
+        try:
+            vectors = await self._loop.run_in_executor(self.executor, self.encode_fn, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, float]:
+        """Batch size and queue wait figures since startup."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "mean_queue_wait_ms": 1000 * self.queue_wait_total / self.items if self.items else 0.0,
+            "max_queue_wait_ms": 1000 * self.queue_wait_max,
+        }
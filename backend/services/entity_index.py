@@ -0,0 +1,72 @@
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class EntityIndex:
+    """In-process inverted index from value tokens to (type, value) entities.
+
+    Lookups intersect the posting lists of a mention's tokens, so their cost
+    depends on posting-list sizes rather than on the number of entities.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._entities: List[Tuple[str, str]] = []
+        self._postings: Dict[str, array] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def add(self, rows: Iterable[Dict[str, str]]):
+        """Index {type, value} rows; already known entities are ignored."""
+        with self._lock:
+            for row in rows:
+                key = (row["type"], row["value"])
+                if key in self._ids:
+                    continue
+                entity_id = len(self._entities)
+                self._ids[key] = entity_id
+                self._entities.append(key)
+                # Posting lists stay sorted because ids only grow
+                for token in set(tokenize(row["value"])):
+                    self._postings.setdefault(token, array("I")).append(entity_id)
+
+    def lookup(self, mentions: Iterable[str], limit: int = 25) -> List[Dict[str, str]]:
+        """Entities whose value contains every token of at least one mention.
+
+        Exact (case-insensitive) matches rank first, then shorter values.
+        """
+        matches = {}
+        for mention in mentions:
+            tokens = set(tokenize(mention))
+            if not tokens:
+                continue
+            postings = [self._postings.get(token) for token in tokens]
+            if any(p is None for p in postings):
+                continue
+            postings.sort(key=len)
+            ids = np.frombuffer(postings[0], dtype=np.uint32)
+            for posting in postings[1:]:
+                ids = np.intersect1d(ids, np.frombuffer(posting, dtype=np.uint32), assume_unique=True)
+                if not len(ids):
+                    break
+            normalized = mention.strip().lower()
+            for entity_id in ids.tolist():
+                entity_type, value = self._entities[entity_id]
+                rank = (value.lower() != normalized, len(value))
+                if entity_id not in matches or rank < matches[entity_id]:
+                    matches[entity_id] = rank
+
+        ranked = sorted(matches, key=matches.get)[:limit]
+        return [{"type": self._entities[i][0], "value": self._entities[i][1]} for i in ranked]
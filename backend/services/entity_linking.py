@@ -0,0 +1,38 @@
+from typing import List
+
+# Entity labels that are rarely useful as graph lookups on their own
+_SKIP_LABELS = {"CARDINAL", "ORDINAL", "QUANTITY", "PERCENT"}
+
+
+def extract_mentions(nlp, question: str) -> List[str]:
+    """Candidate entity mentions in a question.
+
+    Named entities and runs of proper nouns, or the content words when there
+    are none, deduplicated case-insensitively.
+    """
+    doc = nlp(question)
+    mentions = [ent.text for ent in doc.ents if ent.label_ not in _SKIP_LABELS]
+
+    run = []
+    for token in list(doc) + [None]:
+        if token is not None and token.pos_ == "PROPN":
+            run.append(token.text)
+        elif run:
+            mentions.append(" ".join(run))
+            run = []
+
+    if not mentions:
+        # Nothing name-like: fall back to the question's content words
+        mentions = [
+            token.text for token in doc
+            if token.is_alpha and not token.is_stop and len(token.text) > 2
+        ]
+
+    seen = set()
+    unique = []
+    for mention in mentions:
+        key = mention.lower()
+        if key not in seen:
+            seen.add(key)
+            unique.append(mention)
+    return unique
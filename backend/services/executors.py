@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from core.config import Settings
+
+# parse: file decoding, ner: ingest-side spaCy, embed: ingest-side encoding,
+# graph: blocking Neo4j work, search: FAISS queries, link: query-time spaCy
+STAGES = ("parse", "ner", "embed", "graph", "search", "link")
+
+
+class StageExecutors:
+    """One bounded pool per pipeline stage, so a slow stage cannot starve the others.
+
+    Only the parse stage may use processes (PARSE_USE_PROCESSES): its inputs
+    and outputs are plain bytes/strings, while the other stages share large
+    in-process objects (spaCy pipeline, model, FAISS index, driver). Its
+    workers are spawned, not forked: a fork of a process running torch and
+    FAISS thread pools can deadlock on a lock held by one of their threads.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        settings = settings or Settings()
+        self.workers = {
+            "parse": settings.PARSE_WORKERS,
+            "ner": settings.NER_WORKERS,
+            "embed": settings.EMBED_WORKERS,
+            "graph": settings.GRAPH_WORKERS,
+            "search": settings.SEARCH_WORKERS,
+            "link": settings.LINK_WORKERS,
+        }
+        self.parse_use_processes = settings.PARSE_USE_PROCESSES
+        self._executors: Dict[str, Executor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, stage: str) -> Executor:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {STAGES}")
+        with self._lock:
+            executor = self._executors.get(stage)
+            if executor is None:
+                if stage == "parse" and self.parse_use_processes:
+                    executor = ProcessPoolExecutor(
+                        max_workers=self.workers[stage], mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    executor = ThreadPoolExecutor(
+                        max_workers=self.workers[stage], thread_name_prefix=stage
+                    )
+                self._executors[stage] = executor
+            return executor
+
+    def thread_pool(self, stage: str) -> Executor:
+        """The stage's pool if it is thread-based, else a companion thread pool.
+
+        For work that cannot cross a process boundary, such as advancing a
+        generator that streams a file.
+        """
+        executor = self.get(stage)
+        if isinstance(executor, ThreadPoolExecutor):
+            return executor
+        with self._lock:
+            key = f"{stage}-threads"
+            if key not in self._executors:
+                self._executors[key] = ThreadPoolExecutor(
+                    max_workers=self.workers[stage], thread_name_prefix=key
+                )
+            return self._executors[key]
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` on the stage's pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get(stage), functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=wait)
+            self._executors.clear()
+
+
+_default: Optional[StageExecutors] = None
+_default_lock = threading.Lock()
+
+
+def get_stage_executors() -> StageExecutors:
+    """Process-wide StageExecutors, created on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = StageExecutors()
+        return _default
@@ -0,0 +1,113 @@
+import codecs
+import io
+from typing import BinaryIO, Iterator, List, Union
+
+import pandas as pd
+import pdfplumber
+
+
+def iter_segments(
+    filename: str,
+    source: Union[bytes, BinaryIO],
+    max_chars: int = 100_000,
+    rows_per_segment: int = 1000,
+) -> Iterator[str]:
+    """Yield a file's text as page-, block- or sheet-sized segments.
+
+    `source` is the file's bytes or a seekable binary file object; with a
+    file object (e.g. an upload spooled to disk) the file is never read into
+    memory as a whole. PDFs yield one segment per page, text files blocks of
+    at most `max_chars` cut at whitespace, spreadsheets `rows_per_segment`
+    rows at a time with the header repeated.
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    ext = filename.split(".")[-1].lower()
+    if ext == "pdf":
+        yield from _pdf_segments(stream)
+    elif ext == "txt":
+        yield from _text_segments(stream, max_chars)
+    elif ext == "xlsx":
+        yield from _xlsx_segments(stream, rows_per_segment)
+    elif ext == "xls":
+        yield from _xls_segments(stream, rows_per_segment)
+
+
+def extract_segments(filename: str, data: bytes, **kwargs) -> List[str]:
+    """Materialized iter_segments; picklable, so it can run in a process pool."""
+    return list(iter_segments(filename, data, **kwargs))
+
+
+def _pdf_segments(stream: BinaryIO) -> Iterator[str]:
+    with pdfplumber.open(stream) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ""
+            # Release the page's parsed layout objects before moving on
+            page.close()
+            if text:
+                yield text
+
+
+def _text_segments(stream: BinaryIO, max_chars: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    carry = ""
+    while True:
+        block = stream.read(max_chars)
+        if not block:
+            break
+        text = carry + decoder.decode(block)
+        while len(text) > max_chars:
+            # Cut at the last whitespace so no word straddles two segments;
+            # text without any is cut hard at max_chars
+            cut = max(text.rfind(" ", 0, max_chars + 1), text.rfind("\n", 0, max_chars + 1))
+            if cut <= 0:
+                cut = max_chars
+            if text[:cut].strip():
+                yield text[:cut]
+            text = text[cut:]
+        carry = text
+    carry += decoder.decode(b"", final=True)
+    if carry.strip():
+        yield carry
+
+
+def _rows_to_text(header, rows) -> str:
+    lines = ["\t".join("" if v is None else str(v) for v in header)]
+    lines.extend("\t".join("" if v is None else str(v) for v in row) for row in rows)
+    return "\n".join(lines)
+
+
+def _xlsx_segments(stream: BinaryIO, rows_per_segment: int) -> Iterator[str]:
+    from openpyxl import load_workbook
+
+    # read_only mode streams rows instead of loading every cell object
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            block = []
+            emitted = False
+            for row in rows:
+                block.append(row)
+                if len(block) >= rows_per_segment:
+                    yield f"Sheet: {sheet.title}\n" + _rows_to_text(header, block)
+                    block = []
+                    emitted = True
+            # A header-only sheet still contributes its column names
+            if block or not emitted:
+                yield f"Sheet: {sheet.title}\n" + _rows_to_text(header, block)
+    finally:
+        workbook.close()
+
+
+def _xls_segments(stream: BinaryIO, rows_per_segment: int) -> Iterator[str]:
+    # The legacy .xls reader cannot stream, but output is still produced per block
+    sheets = pd.read_excel(stream, sheet_name=None)
+    for name, df in sheets.items():
+        if not len(df.columns):
+            continue
+        # A header-only sheet still contributes its column names
+        for start in range(0, max(len(df), 1), rows_per_segment):
+            yield f"Sheet: {name}\n" + df.iloc[start:start + rows_per_segment].to_string()
@@ -0,0 +1,46 @@
+import asyncio
+import re
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List
+
+_TOKENS = re.compile(r"\S+\s*|\s+")
+
+
+class FakeLLMClient:
+    """Offline stand-in for AsyncOpenAI's `chat.completions.create`.
+
+    Returns a fixed `answer`, either as one completion or, with
+    `stream=True`, as an async iterator of word-sized delta chunks shaped
+    like the OpenAI SDK's. `first_token_delay_s` and `token_delay_s`
+    simulate model latency, so streaming and load behaviour can be
+    exercised without network access.
+    """
+
+    def __init__(self, answer: str = "This is a mock answer.", first_token_delay_s: float = 0.0, token_delay_s: float = 0.0):
+        self.answer = answer
+        self.first_token_delay_s = first_token_delay_s
+        self.token_delay_s = token_delay_s
+        self.calls: List[Dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: List[Dict], stream: bool = False, **kwargs):
+        self.calls.append({"model": model, "messages": messages, "stream": stream, **kwargs})
+        if stream:
+            return self._stream()
+        await asyncio.sleep(self.first_token_delay_s + self.token_delay_s * len(_TOKENS.findall(self.answer)))
+        choice = SimpleNamespace(message=SimpleNamespace(content=self.answer), finish_reason="stop")
+        return SimpleNamespace(choices=[choice])
+
+    async def _stream(self) -> AsyncIterator[SimpleNamespace]:
+        await asyncio.sleep(self.first_token_delay_s)
+        tokens = _TOKENS.findall(self.answer)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_delay_s)
+            yield _chunk(token, None)
+        yield _chunk(None, "stop")
+
+
+def _chunk(content, finish_reason) -> SimpleNamespace:
+    choice = SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice])
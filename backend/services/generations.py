@@ -0,0 +1,97 @@
+"""Index generations: immutable snapshots of the vector store, shared by processes.
+
+A writer process (VECTOR_STORE_ROLE=writer) publishes each state of its
+store as a directory under `generations/`:
+- `faiss.index`, `doc_registry.bin` and `sparse.index` written for it.
+  They are snapshotted without the store lock, so they may hold rows
+  added during the publish; readers mask out everything past the
+  manifest's chunk count.
+- Hard links to the append-only `chunks.bin`, `chunks.idx` and
+  `vectors.f32`, read up to the manifest's chunk count.
+
+It then atomically replaces `generation.json`, the manifest naming the
+current generation. Reader workers (VECTOR_STORE_ROLE=reader) poll the
+manifest and swap in new generations. Linking instead of copying keeps
+the chunks and vectors cheap to publish; the written files are still
+O(corpus), so the writer publishes less often as publishing gets slower.
+A vacuum replaces the writer's files with new ones, so older generations
+keep the data they were published with.
+"""
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+MANIFEST = "generation.json"
+GENERATIONS_DIR = "generations"
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """The current generation's manifest, or None before the first publish."""
+    try:
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def generation_path(directory: str, manifest: Dict) -> str:
+    return os.path.join(directory, manifest["path"])
+
+
+class GenerationBuilder:
+    """Files of one generation, assembled in a temporary directory and made
+    current by commit(): directory rename, then manifest replace."""
+
+    def __init__(self, directory: str, generation: int):
+        self.directory = directory
+        self.generation = generation
+        self.name = os.path.join(GENERATIONS_DIR, f"{generation:08d}")
+        self.path = os.path.join(directory, self.name + ".tmp")
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def link(self, source: str, name: str):
+        """Share `source` under `name`; copied where hard links are unsupported."""
+        try:
+            os.link(source, self.file(name))
+        except OSError:
+            shutil.copyfile(source, self.file(name))
+
+    def commit(self, **fields) -> Dict:
+        final = os.path.join(self.directory, self.name)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(self.path, final)
+        manifest = {"generation": self.generation, "path": self.name, "published": time.time(), **fields}
+        tmp_manifest = os.path.join(self.directory, MANIFEST + ".tmp")
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_manifest, os.path.join(self.directory, MANIFEST))
+        return manifest
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def prune(directory: str, keep: int, current: int):
+    """Delete all but the `keep` newest generations, and unfinished ones.
+
+    Readers that still map files of a deleted generation keep working:
+    the data stays until its last map is closed.
+    """
+    root = os.path.join(directory, GENERATIONS_DIR)
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        number = name.split(".")[0]
+        if not number.isdigit():
+            continue
+        unfinished = name.endswith(".tmp")
+        if (unfinished and int(number) < current) or (not unfinished and int(number) <= current - keep):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
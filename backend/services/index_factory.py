@@ -0,0 +1,240 @@
+import faiss
+import numpy as np
+from typing import Optional, Tuple
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+QUANTIZATIONS = ("none", "fp16", "int8", "pq")
+METRICS = ("l2", "cosine")
+# Scalar quantizer code types by VECTOR_QUANTIZATION name
+_SQ_TYPES = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+
+def configured_index(settings) -> Tuple[str, str]:
+    """(index type, quantization) the settings ask for; ivf_pq always means PQ codes."""
+    index_type = settings.VECTOR_INDEX_TYPE
+    quantization = settings.VECTOR_QUANTIZATION
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE '{index_type}', expected one of {INDEX_TYPES}")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown VECTOR_QUANTIZATION '{quantization}', expected one of {QUANTIZATIONS}")
+    if index_type == "ivf_pq" or (index_type == "ivf_flat" and quantization == "pq"):
+        return "ivf_pq", "pq"
+    return index_type, quantization
+
+
+def index_description(settings) -> str:
+    """FAISS index_factory string for the configured VECTOR_INDEX_TYPE and VECTOR_QUANTIZATION."""
+    index_type, quantization = configured_index(settings)
+    encoding = {
+        "none": "Flat",
+        "fp16": "SQfp16",
+        "int8": "SQ8",
+        "pq": f"PQ{settings.VECTOR_PQ_M}",
+    }[quantization]
+    if index_type == "flat":
+        return encoding
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return f"IVF{settings.VECTOR_IVF_NLIST},{encoding}"
+    return f"HNSW{settings.VECTOR_HNSW_M},{encoding}"
+
+
+def faiss_metric(metric: str) -> int:
+    """FAISS metric for a VECTOR_METRIC name; cosine is the inner product of normalized vectors."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown VECTOR_METRIC '{metric}', expected one of {METRICS}")
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+
+def index_metric(index: faiss.Index) -> str:
+    """Map a loaded index back to its VECTOR_METRIC name."""
+    return "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def flat_index(dim: int, metric: str) -> faiss.Index:
+    """Exact index for `metric`; also stages vectors until an index can be trained."""
+    return faiss.IndexFlat(dim, faiss_metric(metric))
+
+
+def build_index(settings, dim: int, metric: Optional[str] = None) -> faiss.Index:
+    """Create an empty (possibly untrained) index of the configured type.
+
+    `metric` defaults to VECTOR_METRIC; stores pass the metric of their
+    existing index so a rebuild never changes it.
+    """
+    metric = faiss_metric(metric or settings.VECTOR_METRIC)
+    index = faiss.index_factory(dim, index_description(settings), metric)
+    hnsw = _hnsw(index)
+    if hnsw is not None:
+        hnsw.efConstruction = settings.VECTOR_HNSW_EF_CONSTRUCTION
+    pq = faiss.downcast_index(faiss.downcast_index(index).storage) if hnsw is not None else faiss.downcast_index(index)
+    if isinstance(pq, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        # Polysemous codes are only used by polysemous search, and training them is slow
+        pq.do_polysemous_training = False
+    return index
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Map a loaded index back to its VECTOR_INDEX_TYPE name."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, (faiss.IndexIVFFlat, faiss.IndexIVFScalarQuantizer)):
+        return "ivf_flat"
+    if isinstance(index, (faiss.IndexFlat, faiss.IndexScalarQuantizer, faiss.IndexPQ)):
+        return "flat"
+    return type(index).__name__
+
+
+def index_quantization(index: faiss.Index) -> str:
+    """Map a loaded index back to its VECTOR_QUANTIZATION name."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        for name, qtype in _SQ_TYPES.items():
+            if index.sq.qtype == qtype:
+                return name
+        return f"sq{index.sq.qtype}"
+    return "none"
+
+
+def index_config(index: faiss.Index) -> Tuple[str, str]:
+    """(index type, quantization) of a loaded index, comparable to configured_index()."""
+    return index_kind(index), index_quantization(index)
+
+
+def is_lossy(index: faiss.Index) -> bool:
+    """Whether the index stores approximations of the vectors rather than the vectors."""
+    return index_quantization(index) != "none"
+
+
+def training_size(settings) -> int:
+    """Number of vectors needed before the configured index can be trained."""
+    index_type, quantization = configured_index(settings)
+    # FAISS warns below ~39 training points per centroid; PQ codebooks have 256
+    if quantization == "pq":
+        return max(settings.VECTOR_IVF_NLIST if index_type == "ivf_pq" else 0, 256) * 39
+    size = settings.VECTOR_IVF_NLIST * 39 if index_type == "ivf_flat" else 0
+    if quantization == "int8":
+        # Per-dimension value ranges need a representative sample
+        size = max(size, 1000)
+    return size
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+) -> Optional[faiss.SearchParameters]:
+    """Per-query search knobs; None leaves the index defaults untouched.
+
+    `mask` is a boolean array over vector ids; only ids where it is True
+    can be returned, and the filtering happens inside the FAISS search.
+    Indexes that take no search parameters (see supports_parameters) get
+    None; filter their results with search_filtered() instead.
+    """
+    if not supports_parameters(index):
+        return None
+    kwargs = {}
+    bitmap = None
+    if mask is not None:
+        bitmap = np.packbits(mask, bitorder="little")
+        kwargs["sel"] = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+
+    kind = index_kind(index)
+    if kind in ("ivf_flat", "ivf_pq") and nprobe:
+        params = faiss.SearchParametersIVF(nprobe=nprobe, **kwargs)
+    elif kind == "hnsw" and ef_search:
+        params = faiss.SearchParametersHNSW(efSearch=ef_search, **kwargs)
+    elif kwargs:
+        params = faiss.SearchParameters(**kwargs)
+    else:
+        return None
+    # The selector reads the bitmap in place, so it must live as long as the parameters
+    params.bitmap = bitmap
+    return params
+
+
+def supports_parameters(index: faiss.Index) -> bool:
+    """Whether index.search accepts SearchParameters; a bare IndexPQ
+    (flat + pq) rejects any, including an id selector."""
+    return not isinstance(faiss.downcast_index(index), faiss.IndexPQ)
+
+
+def search_filtered(
+    index: faiss.Index, query_vectors: np.ndarray, k: int, mask: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Search, keeping the first `k` hits per query whose id is allowed by
+    `mask`, for indexes that cannot filter inside FAISS.
+
+    The search is widened until every query has `k` allowed hits (or all
+    there are), so the result matches a filtered search.
+    """
+    allowed = int(mask.sum())
+    wanted = min(k, allowed)
+    # Enough candidates for k allowed hits if the allowed ids were spread evenly
+    fetch = min(index.ntotal, k * -(-index.ntotal // max(allowed, 1)))
+    while True:
+        distances, indices = index.search(query_vectors, fetch)
+        keep = (indices >= 0) & mask[np.maximum(indices, 0)]
+        if fetch >= index.ntotal or (keep.sum(axis=1) >= wanted).all():
+            break
+        fetch = min(index.ntotal, fetch * 4)
+    top_distances = np.zeros((len(query_vectors), k), dtype=np.float32)
+    top_ids = np.full((len(query_vectors), k), -1, dtype=np.int64)
+    for row in range(len(query_vectors)):
+        columns = np.flatnonzero(keep[row])[:k]
+        top_distances[row, :len(columns)] = distances[row, columns]
+        top_ids[row, :len(columns)] = indices[row, columns]
+    return top_distances, top_ids
+
+
+def read_index_mapped(path: str) -> faiss.Index:
+    """Load a saved index with its vectors or codes memory-mapped, not copied,
+    so processes opening the same file share its pages.
+
+    IVF inverted lists only support the older mmap flag; the file must not
+    change while mapped.
+    """
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+
+
+def reconstruct_all(index: faiss.Index, start: int = 0) -> np.ndarray:
+    """Return the stored vectors from position `start` (lossy for quantized indexes)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    n = index.ntotal - start
+    if n <= 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(start, n)
+
+
+def rebuild_index(
+    vectors: np.ndarray, settings, seed: int = 1234, metric: Optional[str] = None
+) -> Optional[faiss.Index]:
+    """Build a configured index over `vectors`, or None if too few to train."""
+    index = build_index(settings, vectors.shape[1], metric)
+    if not index.is_trained:
+        if len(vectors) < training_size(settings):
+            return None
+        # At least what training_size() asked for (PQ codebooks need 256 * 39)
+        sample_size = min(len(vectors), max(training_size(settings), settings.VECTOR_IVF_NLIST * 256))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    return index
+
+
+def _hnsw(index: faiss.Index):
+    index = faiss.downcast_index(index)
+    return index.hnsw if isinstance(index, faiss.IndexHNSW) else None
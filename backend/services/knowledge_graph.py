@@ -1,46 +1,202 @@
-from neo4j import GraphDatabase
-from typing import Dict, List
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from neo4j.exceptions import Neo4jError, ServiceUnavailable
+import re
+from typing import Dict, List, Optional
+from core import metrics
 from core.config import Settings
+from services.entity_index import EntityIndex
+
+# Backs MERGE lookups with an index instead of a label scan
+ENTITY_CONSTRAINT_QUERY = (
+    "CREATE CONSTRAINT entity_type_value IF NOT EXISTS "
+    "FOR (e:Entity) REQUIRE (e.type, e.value) IS UNIQUE"
+)
+
+MERGE_ENTITIES_QUERY = (
+    "UNWIND $rows AS row "
+    "MERGE (e:Entity {type: row.type, value: row.value})"
+)
+
+ENTITY_FULLTEXT_INDEX_QUERY = (
+    "CREATE FULLTEXT INDEX entity_value_fulltext IF NOT EXISTS "
+    "FOR (e:Entity) ON EACH [e.value]"
+)
+
+# Exact lookups of pre-filtered candidates, served by the uniqueness constraint
+LOOKUP_ENTITIES_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (e:Entity {type: row.type, value: row.value}) "
+    "RETURN e.type AS type, e.value AS value"
+)
+
+FULLTEXT_ENTITIES_QUERY = (
+    "CALL db.index.fulltext.queryNodes('entity_value_fulltext', $search) YIELD node, score "
+    "RETURN node.type AS type, node.value AS value "
+    "ORDER BY score DESC LIMIT $limit"
+)
+
+ALL_ENTITIES_QUERY = "MATCH (e:Entity) RETURN e.type AS type, e.value AS value"
+
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def _entity_rows(entities: Dict[str, List[str]]) -> List[Dict[str, str]]:
+    """Flatten entities into unique {type, value} rows, keeping first-seen order."""
+    seen = set()
+    rows = []
+    for entity_type, values in entities.items():
+        for value in values:
+            key = (entity_type, value)
+            if value and key not in seen:
+                seen.add(key)
+                rows.append({"type": entity_type, "value": value})
+    return rows
+
+
+def _fulltext_search(mentions: List[str]) -> str:
+    """Lucene query matching any mention as a phrase."""
+    phrases = [_LUCENE_SPECIAL.sub(r"\\\1", m) for m in mentions if m.strip()]
+    return " OR ".join(f'"{phrase}"' for phrase in phrases)
+
+
+def _batches(rows: List[Dict], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
 
 
 class KnowledgeGraph:
-    def __init__(self):
+    def __init__(self, driver=None, async_driver=None):
         settings = Settings()
-        self.driver = GraphDatabase.driver(
+        self.write_batch_size = settings.KG_WRITE_BATCH_SIZE
+        self.link_limit = settings.KG_LINK_LIMIT
+        # Reader workers never see the writer's entity writes, so their copy would go stale
+        local_index = settings.KG_LOCAL_ENTITY_INDEX and settings.VECTOR_STORE_ROLE != "reader"
+        self.entity_index = EntityIndex() if local_index else None
+        # Bumped on every write from this process; lets caches detect changes
+        self.version = 0
+        self.driver = driver or GraphDatabase.driver(
             settings.NEO4J_URI,
             auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
         )
+        # Used from async request handlers so graph I/O never blocks the event loop
+        self.async_driver = async_driver or AsyncGraphDatabase.driver(
+            settings.NEO4J_URI,
+            auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+        )
+        self.ensure_schema()
+        self.load_entity_index()
+
+    def ensure_schema(self):
+        """Create the Entity uniqueness constraint and full-text index if missing."""
+        try:
+            with self.driver.session() as session:
+                session.run(ENTITY_CONSTRAINT_QUERY).consume()
+                session.run(ENTITY_FULLTEXT_INDEX_QUERY).consume()
+        except (Neo4jError, ServiceUnavailable, OSError) as e:
+            print(f"Warning: could not ensure Neo4j schema: {e}")
+
+    def load_entity_index(self):
+        """Fill the local entity index from the graph (one streamed read at startup)."""
+        if self.entity_index is None:
+            return
+        try:
+            with self.driver.session() as session:
+                self.entity_index.add(dict(record) for record in session.run(ALL_ENTITIES_QUERY))
+        except (Neo4jError, ServiceUnavailable, OSError) as e:
+            print(f"Warning: could not load entity index: {e}")
 
     def add_entities(self, entities: Dict[str, List[str]]):
-        """Add entity nodes into the graph."""
+        """Add entity nodes into the graph, one UNWIND transaction per batch."""
+        rows = _entity_rows(entities)
+        if not rows:
+            return
         with self.driver.session() as session:
-            for entity_type, values in entities.items():
-                for value in values:
-                    session.execute_write(self._create_entity, entity_type, value)
+            for batch in _batches(rows, self.write_batch_size):
+                session.execute_write(self._merge_entities, batch)
+        self.version += 1
+        metrics.inc("rag_entities_written_total", len(rows))
+        if self.entity_index is not None:
+            self.entity_index.add(rows)
+
+    def query_subgraph(self, query: str, mentions: Optional[List[str]] = None) -> List[Dict]:
+        """Query the knowledge graph for entities linked to the question's mentions.
 
-    def query_subgraph(self, query: str) -> List[Dict]:
-        """Query the knowledge graph for relevant entities and relationships."""
+        With the local entity index, candidates are found in-process and only
+        confirmed by exact, index-backed lookups; a question that links to
+        nothing skips Neo4j entirely. Without it, the full-text index is used.
+        """
+        mentions = mentions or [query]
+        if self.entity_index is not None:
+            candidates = self.entity_index.lookup(mentions, self.link_limit)
+            if not candidates:
+                return []
+            with self.driver.session() as session:
+                return session.execute_read(self._lookup_entities, candidates)
+        search = _fulltext_search(mentions)
+        if not search:
+            return []
         with self.driver.session() as session:
-            return session.execute_read(self._query_graph, query)
+            return session.execute_read(self._fulltext_entities, search, self.link_limit)
+
+    async def aadd_entities(self, entities: Dict[str, List[str]]):
+        """Async variant of add_entities using the driver's async API."""
+        rows = _entity_rows(entities)
+        if not rows:
+            return
+        async with self.async_driver.session() as session:
+            for batch in _batches(rows, self.write_batch_size):
+                await session.execute_write(self._amerge_entities, batch)
+        self.version += 1
+        metrics.inc("rag_entities_written_total", len(rows))
+        if self.entity_index is not None:
+            self.entity_index.add(rows)
+
+    async def aquery_subgraph(self, query: str, mentions: Optional[List[str]] = None) -> List[Dict]:
+        """Async variant of query_subgraph using the driver's async API."""
+        mentions = mentions or [query]
+        if self.entity_index is not None:
+            candidates = self.entity_index.lookup(mentions, self.link_limit)
+            if not candidates:
+                return []
+            async with self.async_driver.session() as session:
+                return await session.execute_read(self._alookup_entities, candidates)
+        search = _fulltext_search(mentions)
+        if not search:
+            return []
+        async with self.async_driver.session() as session:
+            return await session.execute_read(self._afulltext_entities, search, self.link_limit)
 
     @staticmethod
-    def _create_entity(tx, entity_type: str, value: str):
-        cypher_query = (
-            "MERGE (e:Entity {type: $type, value: $value}) "
-            "RETURN e"
-        )
-        return tx.run(cypher_query, {"type": entity_type, "value": value})
+    def _merge_entities(tx, rows: List[Dict[str, str]]):
+        tx.run(MERGE_ENTITIES_QUERY, {"rows": rows}).consume()
 
     @staticmethod
-    def _query_graph(tx, query: str) -> List[Dict]:
-        """Simple example: find entities whose value contains the search query."""
-        cypher_query = (
-            "MATCH (e:Entity) "
-            "WHERE e.value CONTAINS $query "
-            "RETURN e.type AS type, e.value AS value"
-        )
-        result = tx.run(cypher_query, {"query": query})  # ✅ fixed
+    def _lookup_entities(tx, rows: List[Dict[str, str]]) -> List[Dict]:
+        result = tx.run(LOOKUP_ENTITIES_QUERY, {"rows": rows})
+        return [dict(record) for record in result]
+
+    @staticmethod
+    def _fulltext_entities(tx, search: str, limit: int) -> List[Dict]:
+        result = tx.run(FULLTEXT_ENTITIES_QUERY, {"search": search, "limit": limit})
         return [dict(record) for record in result]
 
+    @staticmethod
+    async def _amerge_entities(tx, rows: List[Dict[str, str]]):
+        result = await tx.run(MERGE_ENTITIES_QUERY, {"rows": rows})
+        await result.consume()
+
+    @staticmethod
+    async def _alookup_entities(tx, rows: List[Dict[str, str]]) -> List[Dict]:
+        result = await tx.run(LOOKUP_ENTITIES_QUERY, {"rows": rows})
+        return await result.data()
+
+    @staticmethod
+    async def _afulltext_entities(tx, search: str, limit: int) -> List[Dict]:
+        result = await tx.run(FULLTEXT_ENTITIES_QUERY, {"search": search, "limit": limit})
+        return await result.data()
+
     def close(self):
         self.driver.close()
+
+    async def aclose(self):
+        await self.async_driver.close()
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+from core import metrics
+from core.config import Settings
+from services.entity_index import EntityIndex
+from services.knowledge_graph import _entity_rows
+
+
+class InMemoryGraph:
+    """In-process stand-in for KnowledgeGraph (GRAPH_BACKEND=memory).
+
+    Same interface and linking behaviour as KnowledgeGraph with the local
+    entity index: entities are MERGEd into a set and questions are linked
+    through an EntityIndex. Every call waits `latency_s`, standing in for
+    the Neo4j round trip, so benchmarks and load tests can run without a
+    database. Nothing is persisted.
+    """
+
+    def __init__(self, latency_s: Optional[float] = None):
+        settings = Settings()
+        self.link_limit = settings.KG_LINK_LIMIT
+        self.latency_s = settings.FAKE_GRAPH_LATENCY_MS / 1000 if latency_s is None else latency_s
+        self.entity_index = EntityIndex()
+        self.entities = set()
+        # Bumped on every write; lets caches detect changes
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def add_entities(self, entities: Dict[str, List[str]]):
+        rows = _entity_rows(entities)
+        if not rows:
+            return
+        time.sleep(self.latency_s)
+        self._merge(rows)
+
+    def query_subgraph(self, query: str, mentions: Optional[List[str]] = None) -> List[Dict]:
+        time.sleep(self.latency_s)
+        return self.entity_index.lookup(mentions or [query], self.link_limit)
+
+    async def aadd_entities(self, entities: Dict[str, List[str]]):
+        rows = _entity_rows(entities)
+        if not rows:
+            return
+        await asyncio.sleep(self.latency_s)
+        self._merge(rows)
+
+    async def aquery_subgraph(self, query: str, mentions: Optional[List[str]] = None) -> List[Dict]:
+        await asyncio.sleep(self.latency_s)
+        return self.entity_index.lookup(mentions or [query], self.link_limit)
+
+    def _merge(self, rows: List[Dict[str, str]]):
+        with self._lock:
+            self.entities.update((row["type"], row["value"]) for row in rows)
+            self.version += 1
+        metrics.inc("rag_entities_written_total", len(rows))
+        self.entity_index.add(rows)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,96 @@
+import functools
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import spacy
+
+from core.config import Settings
+
+# Paragraph break, then sentence end, then any whitespace: where a long text is cut
+_BREAKS = ("\n\n", ". ", "\n", " ")
+
+
+@functools.lru_cache(maxsize=None)
+def load_ner_pipeline(model: str, exclude: Tuple[str, ...]):
+    """A spaCy pipeline with only what `doc.ents` needs, loaded once per process.
+
+    Excluded components are never loaded. In the en_core_web_sm/md/lg models
+    NER has its own token-to-vector layer, so the shared tok2vec is dropped
+    too unless NER listens to it.
+    """
+    nlp = spacy.load(model, exclude=list(exclude))
+    if "tok2vec" in nlp.pipe_names and "ner" not in nlp.get_pipe("tok2vec").listening_components:
+        nlp.remove_pipe("tok2vec")
+    return nlp
+
+
+def split_text(text: str, max_chars: int) -> Iterator[str]:
+    """Pieces of at most `max_chars`, cut at the last paragraph break, sentence
+    end or whitespace before the limit (hard cut when there is none).
+
+    An entity that spans a cut is lost, which paragraph-first cuts make rare.
+    """
+    start = 0
+    while len(text) - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for separator in _BREAKS:
+            cut = text.rfind(separator, start + max_chars // 2, limit)
+            if cut != -1:
+                cut += len(separator)
+                break
+        if cut == -1:
+            cut = limit
+        yield text[start:cut]
+        start = cut
+    if start < len(text):
+        yield text[start:]
+
+
+class NEREngine:
+    """Entity extraction for ingestion, through `nlp.pipe` on a NER-only pipeline.
+
+    Texts longer than NER_MAX_CHARS (never more than `nlp.max_length`, past
+    which spaCy refuses a document) are split first. Entity values are
+    whitespace-normalized and deduplicated per type, in first-seen order.
+    spaCy always runs in-process: its n_process forks the server, whose
+    torch and FAISS thread pools a fork can deadlock.
+    """
+
+    def __init__(
+        self,
+        nlp=None,
+        batch_size: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ):
+        settings = Settings()
+        exclude = tuple(name.strip() for name in settings.NER_EXCLUDE.split(",") if name.strip())
+        self.nlp = nlp or load_ner_pipeline(settings.NER_MODEL, exclude)
+        self.batch_size = batch_size or settings.NER_BATCH_SIZE
+        self.max_chars = min(max_chars or settings.NER_MAX_CHARS, self.nlp.max_length)
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        return self.extract_groups([[text]])[0]
+
+    def extract_many(self, texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+        """Entities of each text, as {label: [values]}."""
+        return self.extract_groups([text] for text in texts)
+
+    def extract_groups(self, groups: Iterable[Iterable[str]]) -> List[Dict[str, List[str]]]:
+        """Entities of each group of texts (a file's segments), deduplicated
+        within the group, from one nlp.pipe over every text of every group."""
+        entities, owners, pieces = [], [], []
+        for owner, texts in enumerate(groups):
+            entities.append({})
+            for text in texts:
+                for piece in split_text(text, self.max_chars):
+                    owners.append(owner)
+                    pieces.append(piece)
+        seen = set()
+        docs = self.nlp.pipe(pieces, batch_size=self.batch_size)
+        for owner, doc in zip(owners, docs):
+            for ent in doc.ents:
+                value = " ".join(ent.text.split())
+                if value and (owner, ent.label_, value) not in seen:
+                    seen.add((owner, ent.label_, value))
+                    entities[owner].setdefault(ent.label_, []).append(value)
+        return entities
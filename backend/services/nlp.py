@@ -0,0 +1,8 @@
+import functools
+import spacy
+
+
+@functools.lru_cache(maxsize=None)
+def load_nlp(model: str = "en_core_web_sm"):
+    """Load a spaCy pipeline once per process and share it between services."""
+    return spacy.load(model)
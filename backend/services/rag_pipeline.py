@@ -1,63 +1,403 @@
-from typing import Dict, List
+import asyncio
+import inspect
+import time
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+import numpy as np
+from core import metrics
+from core.config import Settings
+from services.executors import get_stage_executors
+from services.answer_cache import AnswerCache
+from services.context_builder import ContextBuilder
+from services.entity_linking import extract_mentions
+from services.fake_llm import FakeLLMClient
 from services.knowledge_graph import KnowledgeGraph
+from services.nlp import load_nlp
 from services.vector_store import VectorStore
-from openai import OpenAI, OpenAIError
+from openai import AsyncOpenAI, OpenAI, OpenAIError
 import os
-from unittest.mock import AsyncMock, Mock
+
+
+def _cancel_leg(task: asyncio.Task, coro):
+    """Cancel a retrieval leg's task, closing its inner coroutine if the task
+    never got to await it (else it warns that it was never awaited)."""
+    task.cancel()
+    if inspect.getcoroutinestate(coro) == inspect.CORO_CREATED:
+        coro.close()
+
 
 class RAGPipeline:
-    def __init__(self, openai_client: OpenAI = None):
+    def __init__(
+        self,
+        openai_client: OpenAI = None,
+        kg: KnowledgeGraph = None,
+        vector_store: VectorStore = None,
+        nlp=None,
+    ):
         """
         RAG pipeline initialization.
-        Accepts an optional OpenAI client for testing.
+        Accepts an optional OpenAI client for testing, and shared
+        KnowledgeGraph / VectorStore / spaCy instances from the resource registry.
         """
+        settings = Settings()
         api_key = os.getenv("OPENAI_API_KEY")
+        if settings.LLM_BACKEND not in ("openai", "fake"):
+            raise ValueError(f"Unknown LLM_BACKEND '{settings.LLM_BACKEND}', expected 'openai' or 'fake'")
+        if not openai_client and settings.LLM_BACKEND == "fake":
+            openai_client = FakeLLMClient(
+                first_token_delay_s=settings.FAKE_LLM_FIRST_TOKEN_MS / 1000,
+                token_delay_s=settings.FAKE_LLM_TOKEN_MS / 1000,
+            )
         if not openai_client and not api_key:
             print("Warning: OPENAI_API_KEY not set. Using mock OpenAI client for testing.")
-            # Create a mock OpenAI client to avoid runtime errors
-            mock_client = Mock()
-            mock_choice = Mock()
-            mock_choice.message = Mock(content="This is a mock answer due to missing API key.")
-            mock_choice.finish_reason = "stop"
-            mock_client.chat.completions.create = AsyncMock(return_value=Mock(choices=[mock_choice]))
-            self.openai_client = mock_client
+            # Offline client with the same interface (including streaming) to avoid runtime errors
+            self.openai_client = FakeLLMClient(answer="This is a mock answer due to missing API key.")
         else:
-            self.openai_client = openai_client or OpenAI(api_key=api_key)
+            self.openai_client = openai_client or AsyncOpenAI(api_key=api_key)
 
-        self.kg = KnowledgeGraph()
-        self.vector_store = VectorStore()
+        self.kg = kg or KnowledgeGraph()
+        self.vector_store = vector_store or VectorStore()
+        # Full spaCy pipeline (entity linking reads part-of-speech tags)
+        self.nlp = nlp or load_nlp()
+        self.llm_max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self.kg_timeout = settings.KG_TIMEOUT_S
+        self.vector_timeout = settings.VECTOR_TIMEOUT_S
+        self.retrieval_k = settings.RETRIEVAL_K
+        self.context_builder = ContextBuilder(
+            max_tokens=settings.CONTEXT_MAX_TOKENS,
+            max_kg_facts=settings.CONTEXT_MAX_KG_FACTS,
+            mmr_lambda=settings.CONTEXT_MMR_LAMBDA,
+            dedupe_threshold=settings.CONTEXT_DEDUPE_THRESHOLD,
+        )
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                capacity=settings.ANSWER_CACHE_SIZE,
+                ttl_s=settings.ANSWER_CACHE_TTL_S,
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+            )
 
     async def process_query(
-        self, question: str, domain: str = None, role: str = None
+        self,
+        question: str,
+        domain: str = None,
+        role: str = None,
+        filters: Dict = None,
+        min_score: float = None,
     ) -> Dict:
         """
         Main RAG pipeline: fetches KG & vector results, combines context, and generates an answer.
+        Answers are served from the answer cache when the same or a near-identical
+        question was answered against the current corpus.
+
+        The KG and vector legs run concurrently, each bounded by its own timeout
+        (KG_TIMEOUT_S / VECTOR_TIMEOUT_S). A leg that fails or times out
+        contributes no context; the answer is then flagged as `degraded` and
+        the reason is listed under `retrieval_errors`.
+
+        `filters` restricts the document chunks searched to documents with
+        matching metadata and `min_score` drops chunks below that dense score
+        (see VectorStore.search); such queries bypass the answer cache.
+
+        `index_generation` is the vector index generation the question was
+        answered from in a multi-worker deployment (None when standalone).
+        """
+        started = time.perf_counter()
+        generation = self.vector_store.generation
+        cache = None if filters or min_score is not None else self.answer_cache
+        version = None
+        if cache is not None:
+            version = self._corpus_version()
+            with metrics.span("answer_cache"):
+                cached = cache.get(question, domain, role, version)
+            if cached is not None:
+                metrics.inc("rag_answers_total", cache="exact")
+                return {**cached, "cache": "exact", "index_generation": generation}
+
+        retrieval = await self._retrieve(question, domain, role, version, filters, min_score)
+        if "cached" in retrieval:
+            metrics.inc("rag_answers_total", cache="semantic")
+            return {**retrieval["cached"], "cache": "semantic", "index_generation": generation}
+
+        response = await self._answer(
+            question, retrieval["kg_results"], retrieval["vector_results"], domain, role,
+            query_vector=retrieval["query_vector"],
+        )
+        if cache is not None and not retrieval["errors"]:
+            # Tagged with the version read before retrieval, so an answer built
+            # while new content arrived is dropped on the next lookup
+            cache.put(
+                question, domain, role, version, response, embedding=retrieval["query_vector"]
+            )
+        metrics.inc("rag_answers_total", cache="miss")
+
+        result = {
+            **response,
+            "cache": "miss",
+            "index_generation": generation,
+            "degraded": bool(retrieval["errors"]),
+            "timings_ms": {
+                **retrieval["timings_ms"],
+                "total": round(1000 * (time.perf_counter() - started), 2),
+            },
+        }
+        if retrieval["errors"]:
+            result["retrieval_errors"] = retrieval["errors"]
+        return result
+
+    async def process_query_stream(
+        self,
+        question: str,
+        domain: str = None,
+        role: str = None,
+        filters: Dict = None,
+        min_score: float = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Streaming variant of process_query, yielding (event, data) pairs:
+        one `sources` event with the retrieved context as soon as retrieval
+        finishes, a `token` event per generated text delta, and a final
+        `done` event with the full answer, its sources and confidence.
+        """
+        started = time.perf_counter()
+        generation = self.vector_store.generation
+        cache = None if filters or min_score is not None else self.answer_cache
+        version = None
+        cached, cache_state = None, "miss"
+        if cache is not None:
+            version = self._corpus_version()
+            with metrics.span("answer_cache"):
+                cached = cache.get(question, domain, role, version)
+            cache_state = "exact"
+
+        if cached is None:
+            retrieval = await self._retrieve(question, domain, role, version, filters, min_score)
+            cached, cache_state = retrieval.get("cached"), "semantic"
+
+        if cached is not None:
+            metrics.inc("rag_answers_total", cache=cache_state)
+            yield "sources", {"knowledge_graph": [], "documents": [], "cache": cache_state}
+            yield "token", {"text": cached["answer"]}
+            yield "done", {**cached, "cache": cache_state, "index_generation": generation}
+            return
+
+        kg_results, vector_results = retrieval["kg_results"], retrieval["vector_results"]
+        context, context_stats = await self._build_context(
+            kg_results, vector_results, retrieval["query_vector"]
+        )
+        yield "sources", {
+            "knowledge_graph": kg_results,
+            "documents": vector_results,
+            "context": context_stats,
+            "cache": "miss",
+            "degraded": bool(retrieval["errors"]),
+            "retrieval_errors": retrieval["errors"],
+        }
+
+        parts = []
+        finish_reason = None
+        first_token_ms = None
+        # Includes the time the client takes to consume each token event
+        with metrics.span("llm"):
+            async for text, reason in self._stream_answer(question, context, domain, role):
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = 1000 * (time.perf_counter() - started)
+                    parts.append(text)
+                    yield "token", {"text": text}
+                finish_reason = reason or finish_reason
+
+        answer_text = "".join(parts)
+        response = {
+            "answer": answer_text,
+            "sources": self._extract_sources(answer_text),
+            "confidence": 1.0 if finish_reason == "stop" else 0.0,
+            "context": context_stats,
+        }
+        if cache is not None and not retrieval["errors"]:
+            cache.put(
+                question, domain, role, version, response, embedding=retrieval["query_vector"]
+            )
+        metrics.inc("rag_answers_total", cache="miss")
+        yield "done", {
+            **response,
+            "cache": "miss",
+            "index_generation": generation,
+            "degraded": bool(retrieval["errors"]),
+            "timings_ms": {
+                **retrieval["timings_ms"],
+                "first_token": round(first_token_ms or 0.0, 2),
+                "total": round(1000 * (time.perf_counter() - started), 2),
+            },
+        }
+
+    async def process_batch(
+        self,
+        questions: List[str],
+        domain: str = None,
+        role: str = None,
+        filters: Dict = None,
+        min_score: float = None,
+    ) -> List[Dict]:
+        """
+        Answers many questions: one batched vector search for all of them, then
+        per-question KG lookup and LLM call with at most `llm_max_concurrency`
+        completions in flight. A failing question yields an `error` entry
+        instead of failing the whole batch.
+
+        The batched search is bounded by VECTOR_TIMEOUT_S; when it fails or
+        times out (an empty store), every answer is built from the graph
+        alone and flagged `degraded`, as in process_query.
+        """
+        generation = self.vector_store.generation
+        all_vector_results, _, vector_error = await self._timed_leg(
+            metrics.traced("vector_search", get_stage_executors().run(
+                "search", self.vector_store.search_many, questions, k=self.retrieval_k, filters=filters,
+                min_score=min_score,
+            )),
+            self.vector_timeout,
+        )
+        if vector_error:
+            all_vector_results = [[] for _ in questions]
+        semaphore = asyncio.Semaphore(self.llm_max_concurrency)
+
+        async def answer(question: str, vector_results: List[Dict]) -> Dict:
+            try:
+                kg_results, _, kg_error = await self._timed_leg(self._query_graph(question), self.kg_timeout)
+                async with semaphore:
+                    response = await self._answer(question, kg_results, vector_results, domain, role)
+                metrics.inc("rag_answers_total", cache="miss")
+                errors = {}
+                if kg_error:
+                    errors["knowledge_graph"] = kg_error
+                if vector_error:
+                    errors["vector"] = vector_error
+                result = {
+                    "question": question,
+                    **response,
+                    "index_generation": generation,
+                    "degraded": bool(errors),
+                }
+                if errors:
+                    result["retrieval_errors"] = errors
+                return result
+            except Exception as e:
+                return {"question": question, "error": str(e)}
+
+        return await asyncio.gather(
+            *(answer(q, hits) for q, hits in zip(questions, all_vector_results))
+        )
+
+    async def _retrieve(
+        self, question: str, domain: str, role: str, version, filters: Dict = None, min_score: float = None
+    ) -> Dict:
+        """
+        Runs the KG and vector legs concurrently. With the answer cache on (and
+        neither filters nor min_score), the query embedding is computed first (while the graph leg
+        is already running) and a semantic cache hit is returned under `cached`.
         """
-        kg_results = self.kg.query_subgraph(question)
-        vector_results = self.vector_store.search(question, k=3)
-        context = self._combine_context(kg_results, vector_results)
-        response = await self._generate_answer(question, context, domain, role)
+        started = time.perf_counter()
+        # The graph leg only needs the question, so it starts before the query embedding
+        graph_query = self._query_graph(question)
+        kg_leg = asyncio.create_task(self._timed_leg(graph_query, self.kg_timeout))
+
+        query_vector = None
+        if self.answer_cache is not None and not filters and min_score is None:
+            try:
+                with metrics.span("embed_query"):
+                    query_vector = await self.vector_store.aembed_query(question)
+            except BaseException:
+                _cancel_leg(kg_leg, graph_query)
+                raise
+            cached = self.answer_cache.get_similar(query_vector, domain, role, version)
+            if cached is not None:
+                _cancel_leg(kg_leg, graph_query)
+                return {"cached": cached}
+
+        # Without a query_vector from the cache check, this span includes the query embedding
+        vector_leg = self._timed_leg(
+            metrics.traced("vector_search", self.vector_store.asearch(
+                question, k=self.retrieval_k, query_vector=query_vector, filters=filters, min_score=min_score
+            )),
+            self.vector_timeout,
+        )
+        (kg_results, kg_ms, kg_error), (vector_results, vector_ms, vector_error) = await asyncio.gather(
+            kg_leg, vector_leg
+        )
+
+        errors = {}
+        if kg_error:
+            errors["knowledge_graph"] = kg_error
+        if vector_error:
+            errors["vector"] = vector_error
+        return {
+            "kg_results": kg_results,
+            "vector_results": vector_results,
+            "query_vector": query_vector,
+            "errors": errors,
+            "timings_ms": {
+                "knowledge_graph": round(kg_ms, 2),
+                "vector": round(vector_ms, 2),
+                "retrieval": round(1000 * (time.perf_counter() - started), 2),
+            },
+        }
+
+    @staticmethod
+    async def _timed_leg(coro: Awaitable[List[Dict]], timeout: float) -> Tuple[List[Dict], float, Optional[str]]:
+        """Await one retrieval leg; returns (results, elapsed ms, error), with [] on failure."""
+        started = time.perf_counter()
+        try:
+            results, error = await asyncio.wait_for(coro, timeout or None), None
+        except asyncio.TimeoutError:
+            results, error = [], f"timed out after {timeout}s"
+        except Exception as e:
+            print(f"Warning: retrieval failed: {e}")
+            results, error = [], str(e)
+        return results, 1000 * (time.perf_counter() - started), error
+
+    def _corpus_version(self):
+        return (self.vector_store.version, self.kg.version)
+
+    async def _query_graph(self, question: str) -> List[Dict]:
+        """Link the question's entity mentions to graph entities."""
+        with metrics.span("entity_linking"):
+            mentions = await get_stage_executors().run("link", extract_mentions, self.nlp, question)
+        with metrics.span("graph_query"):
+            return await self.kg.aquery_subgraph(question, mentions)
+
+    async def _answer(
+        self,
+        question: str,
+        kg_results: List[Dict],
+        vector_results: List[Dict],
+        domain: str,
+        role: str,
+        query_vector: Optional[np.ndarray] = None,
+    ) -> Dict:
+        context, context_stats = await self._build_context(kg_results, vector_results, query_vector)
+        with metrics.span("llm"):
+            response = await self._generate_answer(question, context, domain, role)
         return {
             "answer": response["answer"],
             "sources": response["sources"],
             "confidence": response["confidence"],
+            "context": context_stats,
         }
 
-    def _combine_context(self, kg_results: List[Dict], vector_results: List[Dict]) -> str:
-        context_parts = []
-        if kg_results:
-            kg_context = "Knowledge Graph Information:\n"
-            for result in kg_results:
-                kg_context += f"- {result['type']}: {result['value']}\n"
-            context_parts.append(kg_context)
-
-        if vector_results:
-            vs_context = "Related Content:\n"
-            for result in vector_results:
-                vs_context += f"- {result['content']} (similarity: {result['score']:.2f})\n"
-            context_parts.append(vs_context)
-
-        return "\n".join(context_parts)
+    async def _build_context(
+        self, kg_results: List[Dict], vector_results: List[Dict], query_vector: Optional[np.ndarray]
+    ) -> Tuple[str, Dict[str, int]]:
+        """Budgeted context; chunk embeddings come from the embedding cache filled at ingest.
+        Tokenizing and MMR ranking run on the search pool, off the event loop."""
+        executors = get_stage_executors()
+        with metrics.span("context"):
+            chunk_vectors = None
+            if len(vector_results) > 1:
+                chunk_vectors = await executors.run(
+                    "search", self.vector_store.embed_chunks, [r["content"] for r in vector_results]
+                )
+            return await executors.run(
+                "search", self.context_builder.build, kg_results, vector_results, query_vector, chunk_vectors
+            )
 
     async def _generate_answer(
         self, question: str, context: str, domain: str, role: str
@@ -65,19 +405,14 @@ class RAGPipeline:
         """
         Async method to generate answer from OpenAI API with error handling and mock fallback.
         """
-        prompt = self._prepare_prompt(question, context, domain, role)
-
         try:
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that provides accurate answers based on the given context."
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            )
+            request = self._completion_request(question, context, domain, role)
+            create = self.openai_client.chat.completions.create
+            if isinstance(self.openai_client, OpenAI):
+                # Synchronous client passed in by the caller: keep it off the event loop
+                response = await asyncio.to_thread(create, **request)
+            else:
+                response = await create(**request)
             message = response.choices[0].message
             finish_reason = response.choices[0].finish_reason
             answer_text = message.content
@@ -93,6 +428,43 @@ class RAGPipeline:
             "confidence": 1.0 if finish_reason == "stop" else 0.0,
         }
 
+    async def _stream_answer(
+        self, question: str, context: str, domain: str, role: str
+    ) -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+        """
+        Yields (text delta, finish reason) pairs as the completion is generated.
+        A synchronous client is not streamed; its whole answer arrives as one delta.
+        """
+        if isinstance(self.openai_client, OpenAI):
+            response = await self._generate_answer(question, context, domain, role)
+            yield response["answer"], "stop" if response["confidence"] else None
+            return
+
+        try:
+            request = self._completion_request(question, context, domain, role)
+            stream = await self.openai_client.chat.completions.create(**request, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                yield choice.delta.content, choice.finish_reason
+        except OpenAIError as e:
+            print(f"OpenAI API error: {e}. Returning mock answer for testing.")
+            yield "This is a mock answer due to OpenAI API error.", "stop"
+
+    def _completion_request(self, question: str, context: str, domain: str, role: str) -> Dict:
+        prompt = self._prepare_prompt(question, context, domain, role)
+        return dict(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a helpful assistant that provides accurate answers based on the given context."
+                },
+                {"role": "user", "content": prompt},
+            ],
+        )
+
     def _prepare_prompt(self, question: str, context: str, domain: str, role: str) -> str:
         prompt_parts = [
             "Based on the following context and metadata, please answer the question.",
@@ -0,0 +1,216 @@
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Identifiers such as "AB-1234" or "v2.1" are kept whole and also split into parts
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+_PART = re.compile(r"\w+")
+_MAX_TF = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART.findall(token))
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)), best first."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class SparseIndex:
+    """In-process BM25 inverted index over the chunk store's chunks.
+
+    Documents are chunk ids and must be added in order. Postings live in
+    a compacted CSR block (doc ids uint32, term frequencies uint16, one
+    offset per term) plus per-term array tails for chunks added since the
+    last compaction. save() merges the tails and writes the block.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms: Dict[str, int] = {}
+        self._base_ids = np.zeros(0, dtype=np.uint32)
+        self._base_tfs = np.zeros(0, dtype=np.uint16)
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._tail_ids: Dict[int, array] = {}
+        self._tail_tfs: Dict[int, array] = {}
+        self._doc_len = array("I")
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._terms)
+
+    @staticmethod
+    def analyze(chunks: Iterable[str]) -> List[Counter]:
+        """Term counts per chunk; done before add() so it can run outside callers' locks."""
+        return [Counter(tokenize(chunk)) for chunk in chunks]
+
+    def add(self, start: int, analyzed: List[Counter]):
+        """Index analyzed chunks as ids start, start + 1, ..."""
+        with self._lock:
+            if start != len(self._doc_len):
+                raise ValueError(f"Expected chunk id {len(self._doc_len)}, got {start}")
+            for doc_id, counts in enumerate(analyzed, start):
+                for term, tf in counts.items():
+                    term_id = self._terms.setdefault(term, len(self._terms))
+                    if term_id not in self._tail_ids:
+                        self._tail_ids[term_id] = array("I")
+                        self._tail_tfs[term_id] = array("H")
+                    self._tail_ids[term_id].append(doc_id)
+                    self._tail_tfs[term_id].append(min(tf, _MAX_TF))
+                length = sum(counts.values())
+                self._doc_len.append(length)
+                self._total_len += length
+
+    def search(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (chunk id, BM25 score) pairs for the query's terms, among
+        the chunk ids where `mask` is True if given."""
+        term_ids = {self._terms.get(term) for term in tokenize(query)} - {None}
+        if not term_ids:
+            return []
+        with self._lock:
+            if not self._doc_len:
+                return []
+            # Scoring reads the tails through buffer views, which must be
+            # released before the next add() can grow them
+            candidates, scores = self._score(term_ids)
+
+        if mask is not None:
+            allowed = candidates < len(mask)
+            allowed[allowed] = mask[candidates[allowed]]
+            candidates, scores = candidates[allowed], scores[allowed]
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def _score(self, term_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """(chunk ids, BM25 scores) of every chunk containing a query term."""
+        n = len(self._doc_len)
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+        avgdl = self._total_len / n or 1.0
+        all_ids, all_scores = [], []
+        for term_id in term_ids:
+            ids, tfs = self._postings(term_id)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            tf = tfs.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * doc_len[ids] / avgdl)
+            all_ids.append(ids)
+            all_scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        del doc_len
+
+        postings = sum(len(ids) for ids in all_ids)
+        if postings * 8 < n:
+            # Rare terms: aggregate just the matching postings
+            ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+            return ids, np.bincount(inverse, weights=np.concatenate(all_scores)).astype(np.float32)
+        # Common terms: a dense accumulator is cheaper than sorting the postings
+        dense = np.zeros(n, dtype=np.float32)
+        for ids, scores in zip(all_ids, all_scores):
+            # A term occurs once per document in its postings, so ids are unique
+            dense[ids] += scores
+        ids = np.flatnonzero(dense)
+        return ids, dense[ids]
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        parts_ids, parts_tfs = [], []
+        if term_id + 1 < len(self._base_offsets):
+            lo, hi = self._base_offsets[term_id], self._base_offsets[term_id + 1]
+            parts_ids.append(self._base_ids[lo:hi])
+            parts_tfs.append(self._base_tfs[lo:hi])
+        if term_id in self._tail_ids:
+            parts_ids.append(np.frombuffer(self._tail_ids[term_id], dtype=np.uint32))
+            parts_tfs.append(np.frombuffer(self._tail_tfs[term_id], dtype=np.uint16))
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_tfs[0]
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def _compact(self):
+        """Merge the tails into the CSR block; caller holds the lock."""
+        if not self._tail_ids:
+            return
+        lengths = np.zeros(len(self._terms), dtype=np.int64)
+        base_terms = len(self._base_offsets) - 1
+        lengths[:base_terms] = np.diff(self._base_offsets)
+        for term_id, ids in self._tail_ids.items():
+            lengths[term_id] += len(ids)
+
+        offsets = np.zeros(len(self._terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ids_out = np.empty(offsets[-1], dtype=np.uint32)
+        tfs_out = np.empty(offsets[-1], dtype=np.uint16)
+        for term_id in range(len(self._terms)):
+            ids, tfs = self._postings(term_id)
+            lo, hi = offsets[term_id], offsets[term_id + 1]
+            ids_out[lo:hi] = ids
+            tfs_out[lo:hi] = tfs
+            del ids, tfs
+
+        self._base_ids, self._base_tfs, self._base_offsets = ids_out, tfs_out, offsets
+        self._tail_ids.clear()
+        self._tail_tfs.clear()
+
+    def nbytes(self) -> int:
+        """Approximate in-memory size of the postings and document lengths."""
+        tails = sum(ids.itemsize * len(ids) + 2 * len(ids) for ids in self._tail_ids.values())
+        return (
+            self._base_ids.nbytes + self._base_tfs.nbytes + self._base_offsets.nbytes
+            + tails + self._doc_len.itemsize * len(self._doc_len)
+        )
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Compact and capture the arrays save() writes, as of this call."""
+        with self._lock:
+            self._compact()
+            # The compacted arrays are never mutated, only replaced
+            return {
+                "terms": np.frombuffer("\n".join(self._terms).encode("utf-8"), dtype=np.uint8),
+                "ids": self._base_ids,
+                "tfs": self._base_tfs,
+                "offsets": self._base_offsets,
+                "doc_len": np.array(self._doc_len, dtype=np.uint32),
+                "params": np.array([self.k1, self.b]),
+            }
+
+    def save(self, path: str, snapshot: Optional[Dict[str, np.ndarray]] = None):
+        """Write the index (or an earlier snapshot of it) atomically (tmp file + os.replace)."""
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, k1: float = 1.2, b: float = 0.75) -> "SparseIndex":
+        index = cls(k1=k1, b=b)
+        with np.load(path) as data:
+            terms = data["terms"].tobytes().decode("utf-8")
+            index._terms = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+            index._base_ids = data["ids"]
+            index._base_tfs = data["tfs"]
+            index._base_offsets = data["offsets"]
+            index._doc_len = array("I", data["doc_len"].tobytes())
+        index._total_len = int(np.frombuffer(index._doc_len, dtype=np.uint32).sum(dtype=np.int64))
+        return index
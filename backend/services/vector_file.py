@@ -0,0 +1,130 @@
+import os
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class VectorFile:
+    """Append-only float32 vectors on disk, read through a read-only memory map.
+
+    `vectors.f32` holds one row of `dim` float32 values per chunk id, so
+    the index can keep compact (quantized) codes in RAM while exact
+    re-scoring and index rebuilds read the original vectors. Pages are
+    loaded on demand and shared between processes through the page cache.
+
+    With `count`, the file is opened read-only as exactly its first `count`
+    rows (a published index generation), like ChunkStore.
+    """
+
+    def __init__(self, directory: str, dim: int, name: str = "vectors", count: Optional[int] = None):
+        self.path = os.path.join(directory, f"{name}.f32")
+        self.dim = dim
+        self.read_only = count is not None
+        self._row_bytes = dim * 4
+        self._lock = threading.Lock()
+
+        if self.read_only:
+            self._count = count
+            self._file = None
+        else:
+            if not os.path.exists(self.path):
+                open(self.path, "wb").close()
+            # Drop a partially written row left behind by an interrupted append
+            self._count = os.path.getsize(self.path) // self._row_bytes
+            with open(self.path, "r+b") as f:
+                f.truncate(self._count * self._row_bytes)
+            self._file = open(self.path, "ab")
+        self._map = np.zeros((0, dim), dtype=np.float32)
+        if self.read_only:
+            self._ensure_mapped()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, vectors: np.ndarray) -> int:
+        """Append rows and return the id of the first one."""
+        if self.read_only:
+            raise ValueError(f"{self.path} is open read-only")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            start = self._count
+            self._file.write(vectors.tobytes())
+            self._file.flush()
+            self._count += len(vectors)
+        return start
+
+    def rows(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Rows [start, stop) as a read-only view of the map (no copy)."""
+        stop = self._count if stop is None else min(stop, self._count)
+        return self._ensure_mapped()[start:stop]
+
+    def get(self, ids: Sequence[int]) -> np.ndarray:
+        """Copies of the rows at `ids`; only their pages are read."""
+        return self._ensure_mapped()[np.asarray(ids, dtype=np.int64)]
+
+    def distances(self, query: np.ndarray, ids: Sequence[int], metric: str = "l2") -> np.ndarray:
+        """Exact distances from `query` to the rows at `ids`, as FAISS reports
+        them: squared L2, or for metric="cosine" the inner product (higher is closer)."""
+        rows = self.get(ids)
+        if metric == "cosine":
+            return rows @ query
+        return ((rows - query) ** 2).sum(axis=1)
+
+    def rescore(self, query_vectors: np.ndarray, indices: np.ndarray, k: int, metric: str = "l2"):
+        """Re-rank candidate ids (a FAISS search result, -1 padded) by exact
+        distance; returns (distances, indices) with `k` columns."""
+        closer_first = -1 if metric == "cosine" else 1
+        distances = np.full((len(query_vectors), k), closer_first * np.inf, dtype=np.float32)
+        top_ids = np.full((len(query_vectors), k), -1, dtype=np.int64)
+        for row, (query, ids) in enumerate(zip(query_vectors, indices)):
+            ids = ids[ids >= 0]
+            if not len(ids):
+                continue
+            exact = self.distances(query, ids, metric)
+            top = np.argsort(closer_first * exact, kind="stable")[:k]
+            distances[row, :len(top)] = exact[top]
+            top_ids[row, :len(top)] = ids[top]
+        return distances, top_ids
+
+    def truncate(self, count: int) -> None:
+        """Forget every row from position `count` onwards."""
+        if self.read_only:
+            raise ValueError(f"{self.path} is open read-only")
+        with self._lock:
+            if count >= self._count:
+                return
+            self._map = np.zeros((0, self.dim), dtype=np.float32)
+            self._file.truncate(count * self._row_bytes)
+            self._count = count
+
+    def flush(self) -> None:
+        """Force appended rows to stable storage."""
+        if self.read_only:
+            return
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def nbytes(self) -> int:
+        return self._count * self._row_bytes
+
+    def _ensure_mapped(self) -> np.ndarray:
+        vectors = self._map
+        if len(vectors) == self._count:
+            return vectors
+        with self._lock:
+            if len(self._map) != self._count:
+                # Superseded maps are released once in-flight readers drop them
+                self._map = np.memmap(
+                    self.path, dtype=np.float32, mode="r", shape=(self._count, self.dim)
+                ) if self._count else np.zeros((0, self.dim), dtype=np.float32)
+            return self._map
+
+    def close(self) -> None:
+        """Close the file for writing. The rows stay mapped, so readers still
+        holding this object keep working after the file is replaced (vacuum)."""
+        self._ensure_mapped()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
@@ -0,0 +1,83 @@
+import os
+import struct
+import zlib
+from typing import Iterator, Tuple
+
+import numpy as np
+
+# magic, start position, vector count, dimension, metadata length, crc32
+_HEADER = struct.Struct("<4sQIIII")
+_MAGIC = b"VWAL"
+
+
+class VectorLog:
+    """Append-only write-ahead log of embedding batches.
+
+    Each record stores the index position of its first vector so replay is
+    idempotent: records already contained in the compacted index are skipped.
+    """
+
+    def __init__(self, path: str, dim: int, fsync: bool = False):
+        self.path = path
+        self.dim = dim
+        self.fsync = fsync
+        self._file = open(self.path, "ab")
+
+    def append(self, start: int, vectors: np.ndarray, meta: bytes = b"") -> None:
+        """Append one batch; cost is proportional to the batch only."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        payload = vectors.tobytes() + meta
+        header = _HEADER.pack(
+            _MAGIC, start, vectors.shape[0], self.dim, len(meta), zlib.crc32(payload)
+        )
+        self._file.write(header + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(self) -> Iterator[Tuple[int, np.ndarray, bytes]]:
+        """Yield (start, vectors, meta) for every intact record.
+
+        A torn record at the tail (e.g. after a crash mid-write) ends the
+        replay and is cut off so later appends start on a clean boundary.
+        """
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, start, n, dim, meta_len, crc = _HEADER.unpack(header)
+                if magic != _MAGIC or dim != self.dim:
+                    break
+                payload = f.read(n * dim * 4 + meta_len)
+                if len(payload) < n * dim * 4 + meta_len or zlib.crc32(payload) != crc:
+                    break
+                vectors = np.frombuffer(payload, dtype=np.float32, count=n * dim).reshape(n, dim)
+                valid_end = f.tell()
+                yield start, vectors, payload[n * dim * 4:]
+
+        if valid_end < self.size():
+            print(f"Warning: discarding torn tail of {self.path} at byte {valid_end}.")
+            self._file.truncate(valid_end)
+            self._file.seek(valid_end)
+
+    def size(self) -> int:
+        return self._file.tell()
+
+    def truncate_prefix(self, offset: int) -> None:
+        """Drop everything before `offset` (already compacted into the index)."""
+        tmp_path = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            src.seek(offset)
+            while True:
+                block = src.read(1 << 20)
+                if not block:
+                    break
+                dst.write(block)
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "ab")
+
+    def close(self) -> None:
+        self._file.close()
@@ -1,99 +1,1116 @@
 import os
+import glob
+import hashlib
 import json
-import numpy as np
+import threading
+import time
+from contextlib import contextmanager
 import faiss
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import Iterable, List, Dict, NamedTuple, Optional, Sequence, Union
+from core import metrics
 from core.config import Settings
+from services import generations, index_factory
+from services.chunk_store import ChunkStore
+from services.chunker import Chunker
+from services.document_registry import DocumentRegistry, runs
+from services.embedding_cache import EmbeddingCache
+from services.embedding_scheduler import EmbeddingScheduler
+from services.executors import get_stage_executors
+from services.sparse_index import SparseIndex, reciprocal_rank_fusion
+from services.vector_file import VectorFile
+from services.vector_log import VectorLog
 
+ROLES = ("standalone", "writer", "reader")
+# Chunks added during a vacuum that are copied over with the lock held;
+# larger backlogs are caught up without it first
+_REWRITE_LOCKED_ROWS = 1000
+# The publish loop waits at least this many times as long as the last publish
+# took, keeping the writer's time spent publishing under about 1 / (1 + it)
+_PUBLISH_BACKOFF = 10
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """A write to a reader-role store; documents are ingested by the writer."""
+
+
+class _SearchView(NamedTuple):
+    """What one search reads, taken together under the lock: a reader can
+    swap in a new generation (and a vacuum new files) between two searches."""
+    index: faiss.Index
+    documents: ChunkStore
+    chunk_docs: Sequence[int]
+    raw_vectors: VectorFile
+    sparse: Optional[SparseIndex]
+    mask: Optional[np.ndarray]
+
+
+class _IndexLock:
+    """Shared for FAISS searches, exclusive for adds into the live index.
+
+    FAISS indexes can be searched from several threads at once, but not
+    while vectors are added. A waiting writer holds back new readers so a
+    stream of searches cannot starve ingestion.
+    """
 
-class VectorStore:
     def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class PreparedDocuments(NamedTuple):
+    """Documents chunked and encoded by prepare_documents(), not yet stored."""
+    doc_ids: List[int]
+    new_docs: List[Dict]
+    chunks: List[str]
+    owners: List[int]
+    vectors: np.ndarray
+    analyzed: Optional[list]
+
+
+def _content_hash(segments: Iterable[str]) -> str:
+    hasher = hashlib.sha256()
+    for segment in segments:
+        hasher.update(segment.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class VectorStore:
+    """Chunks, embeddings and the FAISS/BM25 indexes under VECTOR_DB_PATH.
+
+    VECTOR_STORE_ROLE decides who may write. A standalone store is the only
+    process using the directory. A writer also publishes index generations
+    (services/generations.py) for reader stores, which serve searches from
+    the newest one and refuse writes with ReadOnlyStoreError.
+    """
+
+    def __init__(self, model: SentenceTransformer = None):
         settings = Settings()
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self.settings = settings
+        self.role = settings.VECTOR_STORE_ROLE
+        if self.role not in ROLES:
+            raise ValueError(f"Unknown VECTOR_STORE_ROLE '{self.role}', expected one of {ROLES}")
+        os.makedirs(settings.VECTOR_DB_PATH, exist_ok=True)
+        self.model = model or SentenceTransformer(settings.EMBEDDING_MODEL)
         self.vector_dim = 384  # Dimension for all-MiniLM-L6-v2
+        self.embedding_cache = EmbeddingCache(
+            settings.EMBEDDING_MODEL,
+            capacity=settings.EMBED_CACHE_SIZE,
+            disk_capacity=settings.EMBED_CACHE_DISK_SIZE,
+            # Reader workers keep to memory rather than contend for the SQLite file
+            path=os.path.join(settings.VECTOR_DB_PATH, "embeddings.sqlite")
+            if settings.EMBED_CACHE_DISK and self.role != "reader" else None,
+        )
+        self.embedding_scheduler = None
+        if settings.EMBED_BATCH_ENABLED:
+            self.embedding_scheduler = EmbeddingScheduler(
+                self._encode_queries,
+                max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS,
+            )
+        self.chunker = Chunker(
+            settings.CHUNK_SIZE,
+            overlap=settings.CHUNK_OVERLAP,
+            unit=settings.CHUNK_UNIT,
+            boundary=settings.CHUNK_BOUNDARY,
+        )
         self.index = None
-        self.documents: List[str] = []
+        # Bumped on every content change; lets caches detect a stale corpus
+        self.version = 0
 
         # Paths for persistence
         self.index_path = os.path.join(settings.VECTOR_DB_PATH, "faiss.index")
         self.docs_path = os.path.join(settings.VECTOR_DB_PATH, "documents.json")
+        self.wal_path = os.path.join(settings.VECTOR_DB_PATH, "vectors.wal")
+        self.sparse_path = os.path.join(settings.VECTOR_DB_PATH, "sparse.index")
+        self.registry_path = os.path.join(settings.VECTOR_DB_PATH, "doc_registry.bin")
+        self.vacuum_marker_path = os.path.join(settings.VECTOR_DB_PATH, "vacuum.commit")
+        self.compact_threshold = settings.VECTOR_WAL_COMPACT_BYTES
+        # Completed vacuums/metric migrations; chunk ids change with each
+        self.rewrites = 0
 
-        os.makedirs(settings.VECTOR_DB_PATH, exist_ok=True)
+        # _lock guards index/documents/log; _compact_lock serializes compactions.
+        # Searches do not take _lock, only _index_lock shared; in-place adds
+        # to the live index take it exclusive, inside _lock.
+        self._lock = threading.RLock()
+        self._index_lock = _IndexLock()
+        self._compact_lock = threading.Lock()
+        self._compaction_thread = None
+        # Generation served (reader) or last published (writer); None when standalone
+        self.generation = None
+        self._published_version = None
+        self._publish_seconds = 0.0
+        # A reader's generation holds rows beyond its chunk count (see publish)
+        self._rows_beyond_count = False
+        self._publish_lock = threading.Lock()
+        self._generation_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._generation_thread = None
+
+        if self.role == "reader":
+            self._open_reader()
+            return
+
+        self._finish_vacuum()
+        self.documents = ChunkStore(settings.VECTOR_DB_PATH)
+        self.raw_vectors = VectorFile(settings.VECTOR_DB_PATH, self.vector_dim)
+        self.registry = (
+            DocumentRegistry.load(self.registry_path)
+            if os.path.exists(self.registry_path) else DocumentRegistry()
+        )
         self._load_or_create_index()
+        self.wal = VectorLog(self.wal_path, self.vector_dim, fsync=settings.VECTOR_WAL_FSYNC)
+        self._replay_log()
+        self._abandon_pending()
+        self.sparse = self._load_sparse_index() if settings.HYBRID_SEARCH else None
+        self._maybe_compact()
+        if self.role == "writer":
+            self._open_writer()
+
+    def _open_writer(self):
+        """Publish the recovered state, then keep publishing in the background."""
+        manifest = generations.read_manifest(self.settings.VECTOR_DB_PATH)
+        self.generation = manifest["generation"] if manifest else 0
+        self.publish()
+        self._generation_thread = threading.Thread(target=self._publish_loop, daemon=True)
+        self._generation_thread.start()
+
+    def _open_reader(self):
+        """Serve the current generation (empty until the writer publishes one)
+        and watch for newer ones."""
+        directory = self.settings.VECTOR_DB_PATH
+        self.wal = None
+        self.metric = self.settings.VECTOR_METRIC
+        self.index = index_factory.flat_index(self.vector_dim, self.metric)
+        self.documents = ChunkStore(directory, count=0)
+        self.raw_vectors = VectorFile(directory, self.vector_dim, count=0)
+        self.registry = DocumentRegistry()
+        self.sparse = None
+        self.refresh()
+        self._generation_thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self._generation_thread.start()
+
+    def _require_writable(self):
+        if self.role == "reader":
+            raise ReadOnlyStoreError("This worker serves a read-only index; send writes to the writer process.")
+
+    def publish(self) -> int:
+        """Publish the store's current state as a new generation (writer role).
+
+        Only the chunk count and hard links to the append-only chunks and
+        vectors are taken under the lock, so a vacuum cannot replace them in
+        between. The index is serialized under the shared index lock (searches
+        go on, adds into it wait) and the registry and BM25 snapshots under
+        their own locks; rows they gain meanwhile lie beyond the manifest's
+        chunk count and are cut off by readers. Serializing is still O(corpus),
+        which is why _publish_loop backs off as it gets slower. Returns the
+        generation number.
+        """
+        self._require_writable()
+        directory = self.settings.VECTOR_DB_PATH
+        with self._publish_lock:
+            started = time.perf_counter()
+            builder = generations.GenerationBuilder(directory, self.generation + 1)
+            try:
+                with self._lock:
+                    version = self.version
+                    count = len(self.documents)
+                    metric = self.metric
+                    # Objects a vacuum swaps out are no longer written to, so
+                    # these stay consistent with the linked files
+                    index, registry, sparse = self.index, self.registry, self.sparse
+                    builder.link(self.documents.blob_path, "chunks.bin")
+                    builder.link(self.documents.offsets_path, "chunks.idx")
+                    builder.link(self.raw_vectors.path, "vectors.f32")
+                with self._index_lock.shared():
+                    index_bytes = faiss.serialize_index(index)
+                index_bytes.tofile(builder.file("faiss.index"))
+                registry.save(builder.file("doc_registry.bin"))
+                if sparse is not None:
+                    sparse.save(builder.file("sparse.index"))
+                builder.commit(chunks=count, metric=metric, version=version)
+            except BaseException:
+                builder.abort()
+                raise
+            self.generation = builder.generation
+            self._published_version = version
+            generations.prune(directory, self.settings.GENERATION_KEEP, self.generation)
+            self._publish_seconds = time.perf_counter() - started
+        return self.generation
+
+    def _request_publish(self):
+        if self._generation_thread is not None and self.role == "writer":
+            self._generation_requested.set()
+
+    def _publish_loop(self):
+        """Publish GENERATION_MIN_INTERVAL_S after a change, or _PUBLISH_BACKOFF
+        times as long as the last publish took if that is longer, so a large
+        corpus is not reserialized back to back; changes made meanwhile (an
+        upload burst) join the same generation."""
+        while True:
+            self._generation_requested.wait()
+            interval = max(self.settings.GENERATION_MIN_INTERVAL_S, _PUBLISH_BACKOFF * self._publish_seconds)
+            if self._stopping.wait(interval):
+                return
+            self._generation_requested.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Warning: publishing an index generation failed: {e}")
+
+    def _watch_loop(self):
+        while not self._stopping.wait(self.settings.GENERATION_POLL_S):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: loading an index generation failed: {e}")
+
+    def refresh(self) -> bool:
+        """Swap in the newest published generation if it is not the one served
+        (reader role). Searches in flight finish on the generation they started
+        with; its maps are released once they drop it. Returns True on a swap.
+        """
+        directory = self.settings.VECTOR_DB_PATH
+        manifest = generations.read_manifest(directory)
+        if manifest is None or manifest["generation"] == self.generation:
+            return False
+        path = generations.generation_path(directory, manifest)
+        if not os.path.isdir(path):
+            # Pruned after the manifest was read; a newer generation is current
+            return False
+        count = manifest["chunks"]
+        sparse_path = os.path.join(path, "sparse.index")
+        try:
+            index = index_factory.read_index_mapped(os.path.join(path, "faiss.index"))
+            documents = ChunkStore(path, count=count)
+            raw_vectors = VectorFile(path, self.vector_dim, count=count)
+            registry = DocumentRegistry.load(os.path.join(path, "doc_registry.bin"))
+            sparse = (
+                SparseIndex.load(sparse_path, k1=self.settings.BM25_K1, b=self.settings.BM25_B)
+                if self.settings.HYBRID_SEARCH and os.path.exists(sparse_path) else None
+            )
+        except FileNotFoundError:
+            return False
+        # Rows the writer added while publishing are masked out of searches
+        registry.truncate(count)
+        beyond_count = index.ntotal > count or (sparse is not None and len(sparse) > count)
+        with self._lock:
+            self.index = index
+            self.metric = index_factory.index_metric(index)
+            self.documents = documents
+            self.raw_vectors = raw_vectors
+            self.registry = registry
+            self.sparse = sparse
+            self._rows_beyond_count = beyond_count
+            self.generation = manifest["generation"]
+            self.version += 1
+        return True
 
     def _load_or_create_index(self):
-        """Load index + documents if available, otherwise create new."""
+        """Load index if available, otherwise create new."""
         if os.path.exists(self.index_path):
             self.index = faiss.read_index(self.index_path)
-            if os.path.exists(self.docs_path):
-                with open(self.docs_path, "r", encoding="utf-8") as f:
-                    self.documents = json.load(f)
+            # The stored vectors were prepared for this metric, whatever the settings say
+            self.metric = index_factory.index_metric(self.index)
+            if self.metric != self.settings.VECTOR_METRIC:
+                print(
+                    f"Warning: {self.index_path} uses {self.metric} similarity, not VECTOR_METRIC "
+                    f"{self.settings.VECTOR_METRIC}; convert it with python -m scripts.migrate_vector_metric."
+                )
+            self._migrate_documents_json()
         else:
-            self.index = faiss.IndexFlatL2(self.vector_dim)
+            self.metric = self.settings.VECTOR_METRIC
+            self.index = index_factory.build_index(self.settings, self.vector_dim)
+            if not self.index.is_trained:
+                # Stage vectors in a flat index until there are enough to train on
+                self.index = index_factory.flat_index(self.vector_dim, self.metric)
+
+    def _migrate_documents_json(self):
+        """One-time import of the legacy documents.json into the chunk store."""
+        if len(self.documents) or not os.path.exists(self.docs_path):
+            return
+        with open(self.docs_path, "r", encoding="utf-8") as f:
+            self.documents.append(json.load(f)[:self.index.ntotal])
+        self.documents.flush()
+        os.replace(self.docs_path, self.docs_path + ".migrated")
+
+    def _replay_log(self):
+        """Re-apply log records that are not yet part of the compacted index."""
+        if len(self.raw_vectors) < self.index.ntotal:
+            # Stores from before vectors.f32 existed; lossy if the index is quantized
+            self.raw_vectors.append(index_factory.reconstruct_all(self.index, start=len(self.raw_vectors)))
+        for start, vectors, meta in self.wal.replay():
+            skip = self.index.ntotal - start
+            if skip < 0:
+                print(f"Warning: gap in {self.wal_path} at position {start}; stopping replay.")
+                break
+            # Normalizing is idempotent, so logs written before the cosine metric replay too
+            vectors = self._prepare(vectors)
+            if skip < len(vectors):
+                self.index.add(vectors[skip:])
+            if start + len(vectors) > len(self.raw_vectors):
+                self.raw_vectors.append(vectors[len(self.raw_vectors) - start:])
+            self.registry.apply(json.loads(meta) if meta else {}, start, len(vectors))
+        # Chunks are appended before their log record, so an interrupted
+        # add_document can leave chunks without vectors behind
+        self.documents.truncate(self.index.ntotal)
+        self.raw_vectors.truncate(self.index.ntotal)
+        self.registry.truncate(self.index.ntotal)
+
+    def _abandon_pending(self):
+        """Tombstone documents left pending by a streamed upload that was interrupted."""
+        pending = self.registry.pending_docs()
+        if pending:
+            record = {"deleted": pending}
+            start = len(self.documents)
+            self.wal.append(start, np.zeros((0, self.vector_dim), dtype=np.float32), json.dumps(record).encode("utf-8"))
+            self.registry.apply(record, start, 0)
+
+    def _load_sparse_index(self) -> SparseIndex:
+        """Load the BM25 index and catch it up with chunks added since it was saved."""
+        k1, b = self.settings.BM25_K1, self.settings.BM25_B
+        sparse = None
+        if os.path.exists(self.sparse_path):
+            sparse = SparseIndex.load(self.sparse_path, k1=k1, b=b)
+            if len(sparse) > len(self.documents):
+                # Chunks it covers were dropped by recovery; rebuild
+                sparse = None
+        sparse = sparse or SparseIndex(k1=k1, b=b)
+        for start in range(len(sparse), len(self.documents), 10000):
+            ids = range(start, min(start + 10000, len(self.documents)))
+            sparse.add(start, sparse.analyze(self.documents.get_many(ids)))
+        return sparse
 
     def save(self):
-        """Persist FAISS index and documents to disk."""
-        faiss.write_index(self.index, self.index_path)
-        with open(self.docs_path, "w", encoding="utf-8") as f:
-            json.dump(self.documents, f, ensure_ascii=False, indent=2)
-
-    def add_document(self, content: str, chunk_size: int = 512):
-        """Split content into chunks, embed them, and add to FAISS + memory store."""
-        chunks = self._chunk_text(content, chunk_size)
-        if not chunks:
+        """Compact the write-ahead log into the FAISS index.
+
+        Snapshotting happens under the lock; the slow file writes do not, so
+        concurrent add_document calls keep appending to the log meanwhile.
+        """
+        self._require_writable()
+        with self._compact_lock:
+            if self._rebuild_pending():
+                self.rebuild_index()
+            with self._lock:
+                index_bytes = faiss.serialize_index(self.index)
+                registry_bytes = self.registry.to_bytes()
+                wal_offset = self.wal.size()
+
+            self.documents.flush()
+            # The index must never cover rows vectors.f32 could lose in a crash
+            self.raw_vectors.flush()
+            tmp_index = self.index_path + ".tmp"
+            index_bytes.tofile(tmp_index)
+            os.replace(tmp_index, self.index_path)
+            self.registry.save(self.registry_path, registry_bytes)
+
+            if self.sparse is not None:
+                self.sparse.save(self.sparse_path)
+
+            with self._lock:
+                self.wal.truncate_prefix(wal_offset)
+
+    def _rebuild_pending(self) -> bool:
+        """Whether the live index differs from VECTOR_INDEX_TYPE / VECTOR_QUANTIZATION
+        and can be rebuilt."""
+        return (
+            index_factory.index_config(self.index) != index_factory.configured_index(self.settings)
+            and self.index.ntotal > 0
+            and self.index.ntotal >= index_factory.training_size(self.settings)
+        )
+
+    def rebuild_index(self) -> bool:
+        """Rebuild the live index as the configured type, training it if needed.
+
+        The new index is built from the exact vectors in vectors.f32, never
+        from a quantized index's approximations. Vectors added while it is
+        trained are copied over before it is swapped in. Returns False when
+        there is not enough data to train.
+        """
+        self._require_writable()
+        with self._lock:
+            count = self.index.ntotal
+            rewrites = self.rewrites
+        # vectors.f32 is append-only, so these rows stay valid while others are added
+        index = index_factory.rebuild_index(self.raw_vectors.rows(0, count), self.settings, metric=self.metric)
+        if index is None:
+            return False
+        with self._lock:
+            if self.rewrites != rewrites:
+                # A vacuum renumbered the chunks meanwhile and built its own index
+                return False
+            tail = self.raw_vectors.rows(count, self.index.ntotal)
+            if len(tail):
+                index.add(np.ascontiguousarray(tail))
+            self.index = index
+        return True
+
+    def _maybe_compact(self):
+        """Start a background compaction once the log exceeds its threshold
+        or the index is due to be rebuilt as the configured type."""
+        # A running compaction swaps the log file out under the lock
+        with self._lock:
+            if self.wal.size() < self.compact_threshold and not self._rebuild_pending():
+                return
+        if self._compaction_thread and self._compaction_thread.is_alive():
             return
+        self._compaction_thread = threading.Thread(target=self.save, daemon=True)
+        self._compaction_thread.start()
 
-        embeddings = self.model.encode(
-            chunks,
-            batch_size=32,
-            convert_to_numpy=True,
-            show_progress_bar=False,
+    def add_document(self, content: str, chunk_size: Optional[int] = None, metadata: Optional[Dict] = None) -> int:
+        """Split content into chunks, embed them, and append them to the log + index."""
+        return self.add_documents([content], chunk_size, [metadata or {}])[0]
+
+    def add_documents(
+        self,
+        contents: List[Union[str, Iterable[str]]],
+        chunk_size: Optional[int] = None,
+        metadata: Optional[List[Dict]] = None,
+    ) -> List[int]:
+        """Add or replace several documents with one batched encode and one log record.
+
+        Each document is a string or an iterable of text segments (pages,
+        sheet blocks) that is chunked as one continuous stream. `chunk_size`
+        overrides CHUNK_SIZE for this call.
+
+        `metadata` holds one dict per document with optional `name`,
+        `content_hash`, `domain` and `file_type`. A document whose content
+        hash is already stored is skipped; one whose name is already stored
+        replaces that document. Passing `doc_id` instead appends the chunks
+        to that document (a file ingested window by window). With `pending`,
+        the document stays hidden, and replaces nothing, until
+        finish_document(). Returns the document ids.
+        """
+        return self.commit_documents(self.prepare_documents(contents, chunk_size, metadata))
+
+    def prepare_documents(
+        self,
+        contents: List[Union[str, Iterable[str]]],
+        chunk_size: Optional[int] = None,
+        metadata: Optional[List[Dict]] = None,
+    ) -> PreparedDocuments:
+        """The slow half of add_documents(): chunk and encode, storing nothing.
+
+        Lets a caller overlap encoding with other work and only commit once
+        that work succeeded; an uncommitted batch leaves no trace.
+        """
+        self._require_writable()
+        chunker = self.chunker
+        if chunk_size is not None and chunk_size != chunker.chunk_size:
+            chunker = Chunker(
+                chunk_size,
+                overlap=min(chunker.overlap, chunk_size // 4),
+                unit=chunker.unit,
+                boundary=self.settings.CHUNK_BOUNDARY,
+            )
+        metadata = metadata or [{} for _ in contents]
+
+        doc_ids, new_docs, chunks, owners = [], [], [], []
+        for content, meta in zip(contents, metadata):
+            if meta.get("doc_id") is not None:
+                doc_ids.append(meta["doc_id"])
+                self._chunk_into(chunker, content, meta["doc_id"], chunks, owners)
+                continue
+
+            content_hash = meta.get("content_hash")
+            if content_hash is None and isinstance(content, str):
+                content_hash = _content_hash([content])
+            existing = self.registry.find_by_hash(content_hash) if content_hash else None
+            if existing is not None:
+                doc_ids.append(existing["doc_id"])
+                continue
+
+            doc = self.registry.new_doc(
+                meta.get("name"), content_hash, meta.get("domain"), meta.get("file_type")
+            )
+            if meta.get("pending"):
+                doc["pending"] = True
+            digest = self._chunk_into(chunker, content, doc["doc_id"], chunks, owners)
+            if doc["content_hash"] is None:
+                doc["content_hash"] = digest
+                existing = self.registry.find_by_hash(digest)
+                if existing is not None:
+                    # Only known to be a duplicate once its segments were read
+                    while owners and owners[-1] == doc["doc_id"]:
+                        owners.pop()
+                        chunks.pop()
+                    doc_ids.append(existing["doc_id"])
+                    continue
+            new_docs.append(doc)
+            doc_ids.append(doc["doc_id"])
+
+        vectors = self._prepare(
+            self.embedding_cache.encode(chunks, self._encode)
+            if chunks else np.zeros((0, self.vector_dim), dtype=np.float32)
         )
+        analyzed = self.sparse.analyze(chunks) if self.sparse is not None and chunks else None
+        return PreparedDocuments(doc_ids, new_docs, chunks, owners, vectors, analyzed)
+
+    def commit_documents(self, prepared: PreparedDocuments) -> List[int]:
+        """Store documents from prepare_documents() with one log record; returns their ids."""
+        self._require_writable()
+        doc_ids, new_docs, chunks, owners, vectors, analyzed = prepared
+        if not chunks and not new_docs:
+            return doc_ids
+
+        with self._lock:
+            record = {
+                "docs": new_docs,
+                "runs": runs(owners),
+                "deleted": self._replaced_docs(new_docs),
+            }
+            start = self.documents.append(chunks) if chunks else len(self.documents)
+            self.wal.append(start, vectors, json.dumps(record).encode("utf-8"))
+            self.raw_vectors.append(vectors)
+            with self._index_lock.exclusive():
+                self.index.add(vectors)
+            self.registry.apply(record, start, len(chunks))
+            if analyzed is not None:
+                self.sparse.add(start, analyzed)
+            self.version += 1
+        metrics.inc("rag_chunks_ingested_total", len(chunks))
+        self._maybe_compact()
+        self._request_publish()
+        return doc_ids
+
+    @staticmethod
+    def _chunk_into(chunker: Chunker, content, doc_id: int, chunks: List[str], owners: List[int]) -> str:
+        """Chunk one document into `chunks`; returns the hash of its segments."""
+        segments = [content] if isinstance(content, str) else content
+        hasher = hashlib.sha256()
+
+        def hashed(segments):
+            for segment in segments:
+                hasher.update(segment.encode("utf-8"))
+                yield segment
+
+        before = len(chunks)
+        chunks.extend(chunker.chunk_segments(hashed(segments)))
+        owners.extend([doc_id] * (len(chunks) - before))
+        return hasher.hexdigest()
+
+    def _replaced_docs(self, new_docs: List[Dict]) -> List[int]:
+        """Documents superseded by `new_docs`; called under the lock so concurrent
+        uploads of the same content or name cannot both stay live."""
+        deleted = []
+        names = {}
+        for doc in new_docs:
+            if doc.get("pending"):
+                continue
+            duplicate = self.registry.find_by_hash(doc["content_hash"]) if doc["content_hash"] else None
+            if duplicate is not None:
+                deleted.append(doc["doc_id"])
+                continue
+            name = doc["name"]
+            if name:
+                previous = names.get(name) or self.registry.find_by_name(name)
+                if previous is not None:
+                    deleted.append(previous["doc_id"])
+                names[name] = doc
+        return deleted
+
+    def finish_document(self, doc_id: int) -> int:
+        """Make a pending document visible, replacing the stored document of
+        the same name. Returns the id of the live document with its content:
+        `doc_id`, or an identical one stored while it was pending."""
+        self._require_writable()
+        with self._lock:
+            doc = self.registry.get(doc_id)
+            if doc is None or not doc.get("pending"):
+                raise ValueError(f"No pending document {doc_id}")
+            duplicate = self.registry.find_by_hash(doc["content_hash"]) if doc["content_hash"] else None
+            record = (
+                {"deleted": [doc_id]} if duplicate is not None
+                else {"completed": [doc_id], "deleted": self._replaced_docs([{**doc, "pending": False}])}
+            )
+            start = len(self.documents)
+            self.wal.append(start, np.zeros((0, self.vector_dim), dtype=np.float32), json.dumps(record).encode("utf-8"))
+            self.registry.apply(record, start, 0)
+            self.version += 1
+        self._maybe_compact()
+        self._request_publish()
+        return doc_id if duplicate is None else duplicate["doc_id"]
+
+    def delete_document(self, doc_id: int) -> bool:
+        """Tombstone a document; its chunks leave search results at once and
+        storage on the next vacuum(). Returns False if there is no such document."""
+        self._require_writable()
+        with self._lock:
+            if self.registry.get(doc_id) is None:
+                return False
+            record = {"deleted": [doc_id]}
+            start = len(self.documents)
+            self.wal.append(start, np.zeros((0, self.vector_dim), dtype=np.float32), json.dumps(record).encode("utf-8"))
+            self.registry.apply(record, start, 0)
+            self.version += 1
+        self._maybe_compact()
+        self._request_publish()
+        return True
+
+    def list_documents(self) -> List[Dict]:
+        return self.registry.documents()
+
+    def find_document(self, content_hash: str) -> Optional[Dict]:
+        """The live document with this content hash, if any."""
+        return self.registry.find_by_hash(content_hash)
+
+    def vacuum(self) -> Dict[str, int]:
+        """Rebuild chunks, FAISS index, BM25 index and registry without deleted documents.
+
+        Searches and writes carry on while it runs (see _rewrite). The new
+        files are written next to the live ones, then a commit marker is
+        written and the files are moved into place; an interrupted vacuum is
+        completed (marker present) or discarded (no marker) the next time the
+        store is opened.
+        """
+        self._require_writable()
+        with self._compact_lock:
+            with self._lock:
+                live = self.registry.retained_mask()
+                before = len(self.documents)
+            if live is None:
+                return {"chunks": before, "removed_chunks": 0}
+            keep = np.flatnonzero(live)
+            chunks = self._rewrite(keep, before, self.metric)
+        self._request_publish()
+        return {"chunks": chunks, "removed_chunks": before - len(keep)}
+
+    def migrate_metric(self, metric: str) -> Dict[str, int]:
+        """Convert the store to another VECTOR_METRIC on disk, vacuuming it on the way.
+
+        Moving to cosine normalizes the stored vectors; moving back to l2 keeps
+        them normalized, as the raw embeddings are not stored.
+        """
+        self._require_writable()
+        index_factory.faiss_metric(metric)
+        with self._compact_lock:
+            with self._lock:
+                live = self.registry.retained_mask()
+                count = len(self.documents)
+                before = self.metric
+            keep = np.arange(count) if live is None else np.flatnonzero(live)
+            chunks = self._rewrite(keep, count, metric)
+        self._request_publish()
+        return {"chunks": chunks, "from": before, "to": metric}
+
+    def _rewrite(self, keep: np.ndarray, count: int, metric: str) -> int:
+        """Replace every file of the store with one holding chunk ids `keep`
+        (taken from the first `count`) and every chunk added since, indexed
+        for `metric`. Returns the number of chunks in the new files.
+
+        The caller holds _compact_lock. Training, the BM25 rebuild and the
+        file writes happen without _lock, so searches and writes carry on;
+        chunks added meanwhile are copied over in rounds, and only the last
+        few rows, the registry and the swap itself are done under it. Those
+        rows are logged to the new log rather than written into the saved
+        index, which stays as it was written outside the lock.
+        """
+        directory = self.settings.VECTOR_DB_PATH
+        vectors = self.raw_vectors.get(keep)
+        if metric == "cosine":
+            faiss.normalize_L2(vectors)
+        index = index_factory.rebuild_index(vectors, self.settings, metric=metric)
+        if index is None:
+            index = index_factory.flat_index(self.vector_dim, metric)
+            index.add(vectors)
+        raw_vectors = VectorFile(directory, self.vector_dim, name="vacuum-vectors")
+        raw_vectors.append(vectors)
+        store = ChunkStore(directory, name="vacuum-chunks")
+        sparse = SparseIndex(k1=self.settings.BM25_K1, b=self.settings.BM25_B) if self.sparse is not None else None
+        for batch_start in range(0, len(keep), 10000):
+            batch = self.documents.get_many(keep[batch_start:batch_start + 10000])
+            start = store.append(batch)
+            if sparse is not None:
+                sparse.add(start, sparse.analyze(batch))
+        copied = count
+        while True:
+            with self._lock:
+                end = len(self.documents)
+            if end - copied <= _REWRITE_LOCKED_ROWS:
+                break
+            self._copy_rows(copied, end, metric, store, raw_vectors, index, sparse)
+            copied = end
+
+        faiss.write_index(index, self.index_path + ".vacuum")
+        if sparse is not None:
+            # Chunks it lacks are caught up from the chunk store on open
+            sparse.save(self.sparse_path + ".vacuum")
+        store.flush()
+        raw_vectors.flush()
+        moves = [
+            (store.blob_path, self.documents.blob_path),
+            (store.offsets_path, self.documents.offsets_path),
+            (raw_vectors.path, self.raw_vectors.path),
+            (self.index_path + ".vacuum", self.index_path),
+            (self.registry_path + ".vacuum", self.registry_path),
+            (self.wal_path + ".vacuum", self.wal_path),
+        ]
+        if sparse is not None:
+            moves.append((self.sparse_path + ".vacuum", self.sparse_path))
+
+        with self._lock:
+            end = len(self.documents)
+            tail_start = len(store)
+            tail = self._copy_rows(copied, end, metric, store, raw_vectors, index, sparse)
+            store.flush()
+            raw_vectors.flush()
+            store.close()
+            raw_vectors.close()
+            wal = VectorLog(self.wal_path + ".vacuum", self.vector_dim, fsync=self.settings.VECTOR_WAL_FSYNC)
+            if len(tail):
+                wal.append(tail_start, tail)
+            wal.close()
+            registry = self.registry.compacted(np.concatenate([keep, np.arange(count, end)]))
+            registry.save(self.registry_path + ".vacuum")
+
+            tmp_marker = self.vacuum_marker_path + ".tmp"
+            with open(tmp_marker, "w", encoding="utf-8") as f:
+                json.dump({"moves": moves}, f)
+            os.replace(tmp_marker, self.vacuum_marker_path)
+
+            # Readers may still hold the old chunk store; its maps stay valid
+            # because os.replace keeps the replaced files' data alive
+            self.wal.close()
+            self.raw_vectors.close()
+            self._finish_vacuum()
+            self.documents = ChunkStore(directory)
+            self.raw_vectors = VectorFile(directory, self.vector_dim)
+            self.wal = VectorLog(self.wal_path, self.vector_dim, fsync=self.settings.VECTOR_WAL_FSYNC)
+            self.index = index
+            self.metric = metric
+            self.registry = registry
+            self.sparse = sparse
+            self.rewrites += 1
+            self.version += 1
+            return len(self.documents)
+
+    def _copy_rows(self, start: int, stop: int, metric: str, store, raw_vectors, index, sparse) -> np.ndarray:
+        """Append live chunk ids [start, stop) to a rewrite's files and index;
+        returns their vectors."""
+        if stop <= start:
+            return np.zeros((0, self.vector_dim), dtype=np.float32)
+        vectors = np.array(self.raw_vectors.rows(start, stop), dtype=np.float32)
+        if metric == "cosine":
+            faiss.normalize_L2(vectors)
+        chunks = self.documents.get_many(range(start, stop))
+        first = store.append(chunks)
+        raw_vectors.append(vectors)
+        index.add(vectors)
+        if sparse is not None:
+            sparse.add(first, sparse.analyze(chunks))
+        return vectors
+
+    def _finish_vacuum(self):
+        """Complete a committed vacuum, or discard the files of an interrupted one."""
+        if os.path.exists(self.vacuum_marker_path):
+            with open(self.vacuum_marker_path, "r", encoding="utf-8") as f:
+                moves = json.load(f)["moves"]
+            for src, dst in moves:
+                if os.path.exists(src):
+                    os.replace(src, dst)
+            if self.wal_path not in (dst for _, dst in moves):
+                # Vacuums that logged nothing: every record is part of the vacuumed files
+                open(self.wal_path, "wb").close()
+            os.remove(self.vacuum_marker_path)
+            return
+        directory = self.settings.VECTOR_DB_PATH
+        for path in glob.glob(os.path.join(directory, "*.vacuum")) + glob.glob(os.path.join(directory, "vacuum-*.*")):
+            os.remove(path)
+
+    def close(self):
+        """Wait for a running compaction and release the log and chunk files.
 
-        self.index.add(np.array(embeddings, dtype=np.float32))
-        self.documents.extend(chunks)
-        self.save()  # ✅ auto-save after adding
+        A writer stops publishing in the background and publishes whatever
+        changed since its last generation."""
+        self._stopping.set()
+        self._generation_requested.set()
+        if self._generation_thread:
+            self._generation_thread.join()
+        if self._compaction_thread:
+            self._compaction_thread.join()
+        if self.role == "writer" and self.version != self._published_version:
+            self.publish()
+        if self.wal is not None:
+            self.wal.close()
+        self.documents.close()
+        self.raw_vectors.close()
+        self.embedding_cache.close()
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, float]]:
-        """Search for the top-k most similar chunks to the query."""
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, float]]:
+        """Search for the top-k most similar chunks to the query.
+
+        `nprobe` (IVF indexes) and `ef_search` (HNSW) override the configured
+        defaults for this query only. `filters` restricts the search to
+        documents matching metadata, e.g. {"domain": "finance", "file_type": ["pdf", "xlsx"]}.
+        Chunks whose dense score is below `min_score` (default VECTOR_MIN_SCORE)
+        are dropped.
+        """
+        return self.search_many(
+            [query], k, nprobe=nprobe, ef_search=ef_search, filters=filters, min_score=min_score
+        )[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[Dict[str, float]]]:
+        """Search for many queries with one batched encode and one FAISS search."""
         if not self.documents:
             raise ValueError("No documents in vector store. Add documents before searching.")
+        if not queries:
+            return []
 
-        # prevent asking FAISS for more results than exist
-        k = min(k, len(self.documents))
+        query_vectors = self._encode_queries(queries)
+        return self.search_hybrid(
+            queries, query_vectors, k, nprobe=nprobe, ef_search=ef_search, filters=filters, min_score=min_score
+        )
 
-        query_vector = self.model.encode([query], convert_to_numpy=True)[0].reshape(1, -1)
-        distances, indices = self.index.search(query_vector.astype(np.float32), k)
+    def search_hybrid(
+        self,
+        queries: List[str],
+        query_vectors: np.ndarray,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[Dict[str, float]]]:
+        """Dense search fused with BM25 by reciprocal rank fusion.
 
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if 0 <= idx < len(self.documents):
-                results.append({
-                    "content": self.documents[idx],
-                    "score": float(1 / (1 + dist))  # similarity score
-                })
-        return results
+        Each leg contributes its top HYBRID_CANDIDATES chunks. `score` is the
+        fused RRF score scaled so that ranking first in both legs gives 1.0;
+        `dense_score` and `bm25_score` are the legs' own scores (None when
+        the chunk was not among that leg's candidates). Dense-only when
+        HYBRID_SEARCH is off.
 
-    @staticmethod
-    def _chunk_text(text: str, chunk_size: int) -> List[str]:
-        """Split text into chunks of approximately `chunk_size` characters."""
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_size = 0
-
-        for word in words:
-            word_len = len(word) + 1  # +1 for space
-            if current_size + word_len > chunk_size and current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_size = word_len
-            else:
-                current_chunk.append(word)
-                current_size += word_len
+        With a `min_score` cutoff, BM25-only candidates get their exact
+        dense score too, and every chunk scoring below it is dropped.
+        """
+        if min_score is None:
+            min_score = self.settings.VECTOR_MIN_SCORE
+        query_vectors = self._prepare(query_vectors)
+        view = self._view(filters)
+        if view.sparse is None:
+            return self._search_dense(query_vectors, k, nprobe, ef_search, view, min_score)
+
+        candidates = max(k, self.settings.HYBRID_CANDIDATES)
+        rrf_k = self.settings.RRF_K
+        best = 2.0 / (rrf_k + 1)
+        dense = self._search_dense(query_vectors, candidates, nprobe, ef_search, view)
+
+        all_results = []
+        for query, query_vector, dense_hits in zip(queries, query_vectors, dense):
+            sparse_hits = view.sparse.search(query, candidates, mask=view.mask)
+            dense_scores = {hit["id"]: hit["score"] for hit in dense_hits}
+            bm25_scores = dict(sparse_hits)
+            fused = reciprocal_rank_fusion(
+                [[hit["id"] for hit in dense_hits], [i for i, _ in sparse_hits]], rrf_k
+            )
+            if min_score is not None:
+                missing = [i for i, _ in fused if i not in dense_scores]
+                if missing:
+                    exact = self._similarity(view.raw_vectors.distances(query_vector, missing, self.metric))
+                    dense_scores.update(zip(missing, exact.tolist()))
+                fused = [(i, score) for i, score in fused if dense_scores[i] >= min_score]
+            fused = fused[:k]
+            contents = view.documents.get_many([i for i, _ in fused])
+            all_results.append([
+                {
+                    "id": i,
+                    "doc_id": view.chunk_docs[i],
+                    "content": content,
+                    "score": score / best,
+                    "dense_score": dense_scores.get(i),
+                    "bm25_score": bm25_scores.get(i),
+                }
+                for (i, score), content in zip(fused, contents)
+            ])
+        return all_results
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        query_vector: Optional[np.ndarray] = None,
+        filters: Optional[Dict] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, float]]:
+        """Async search: the query encode is coalesced with concurrent callers
+        and the FAISS search runs on the search stage pool. Pass `query_vector`
+        when the query was already embedded via aembed_query."""
+        if not self.documents:
+            raise ValueError("No documents in vector store. Add documents before searching.")
+
+        if query_vector is None:
+            query_vector = await self.aembed_query(query)
+        results = await get_stage_executors().run(
+            "search", self.search_hybrid, [query], query_vector, k,
+            nprobe=nprobe, ef_search=ef_search, filters=filters, min_score=min_score,
+        )
+        return results[0]
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        """Embed one query without blocking the event loop."""
+        if self.embedding_scheduler is None:
+            vectors = await get_stage_executors().run("search", self._encode_queries, [query])
+            return vectors[0]
+        return await self.embedding_scheduler.embed(query)
+
+    def embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """Embeddings of stored chunk texts, normally served by the cache filled at ingest."""
+        return self._prepare(self.embedding_cache.encode(chunks, self._encode))
 
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        return self._prepare(self.embedding_cache.encode(queries, self._encode))
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Embeddings as the index stores them: L2-normalized for the cosine metric.
+
+        The embedding cache keeps the model's raw output, so it is valid for either metric.
+        """
+        vectors = np.array(vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _similarity(self, distances: np.ndarray) -> np.ndarray:
+        """FAISS distances as scores: the cosine itself, or 1 / (1 + squared L2 distance)."""
+        if self.metric == "cosine":
+            return distances
+        return 1 / (1 + distances)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=32,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def search_vectors(
+        self,
+        query_vectors: np.ndarray,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[Dict[str, float]]]:
+        """Search with already-encoded query vectors, one result list per row."""
+        if min_score is None:
+            min_score = self.settings.VECTOR_MIN_SCORE
+        view = self._view(filters)
+        return self._search_dense(self._prepare(query_vectors), k, nprobe, ef_search, view, min_score)
+
+    def _view(self, filters: Optional[Dict] = None) -> _SearchView:
+        with self._lock:
+            mask = self.registry.chunk_mask(filters)
+            if mask is None and self._rows_beyond_count:
+                mask = np.ones(len(self.documents), dtype=bool)
+            return _SearchView(
+                self.index,
+                self.documents,
+                self.registry.chunk_docs,
+                self.raw_vectors,
+                self.sparse,
+                mask,
+            )
+
+    def _search_dense(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        view: _SearchView,
+        min_score: Optional[float] = None,
+    ) -> List[List[Dict[str, float]]]:
+        documents, mask = view.documents, view.mask
+        # prevent asking FAISS for more results than exist
+        k = min(k, len(documents))
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        if k == 0 or (mask is not None and not mask.any()):
+            return [[] for _ in query_vectors]
+
+        # Quantized indexes fetch extra candidates, re-ranked by exact distance
+        factor = self.settings.VECTOR_RERANK_FACTOR
+        index = view.index
+        with self._index_lock.shared():
+            if mask is not None and len(mask) < index.ntotal:
+                # Vectors added since the view was taken are not selectable
+                mask = np.concatenate([mask, np.zeros(index.ntotal - len(mask), dtype=bool)])
+            rerank = factor > 0 and index_factory.is_lossy(index)
+            fetch = min(k * factor, len(documents)) if rerank else k
+            if mask is not None and not index_factory.supports_parameters(index):
+                distances, indices = index_factory.search_filtered(index, query_vectors, fetch, mask)
+            else:
+                params = index_factory.search_parameters(
+                    index,
+                    nprobe=nprobe or self.settings.VECTOR_NPROBE,
+                    ef_search=ef_search or self.settings.VECTOR_EF_SEARCH,
+                    mask=mask,
+                )
+                distances, indices = index.search(query_vectors, fetch, params=params)
+        if rerank:
+            distances, indices = view.raw_vectors.rescore(query_vectors, indices, k, self.metric)
+        chunk_docs = view.chunk_docs
 
-        return chunks
+        all_results = []
+        for row_scores, row_indices in zip(self._similarity(distances), indices):
+            results = []
+            for score, idx in zip(row_scores, row_indices):
+                if 0 <= idx < len(documents) and (min_score is None or score >= min_score):
+                    results.append({
+                        "id": int(idx),
+                        "doc_id": chunk_docs[idx],
+                        "content": documents[idx],
+                        "score": float(score),
+                    })
+            all_results.append(results)
+        return all_results
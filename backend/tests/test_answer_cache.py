@@ -0,0 +1,129 @@
+import asyncio
+import gc
+import warnings
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+
+from services.answer_cache import AnswerCache
+
+RESPONSE = {"answer": "Tim Cook is the CEO of Apple.", "sources": [], "confidence": 1.0}
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    cache = AnswerCache()
+    cache.put("Who is the CEO of Apple?", None, None, 1, RESPONSE)
+
+    assert cache.get("who is the  CEO of apple", None, None, 1) == RESPONSE
+    assert cache.get("Who is the CEO of Apple?", "finance", None, 1) is None
+
+
+def test_semantic_match_above_threshold():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("Who is Apple's CEO?", None, None, 1, RESPONSE, embedding=np.array([1.0, 0.0, 0.1]))
+
+    assert cache.get_similar(np.array([0.95, 0.0, 0.12]), None, None, 1) == RESPONSE
+    assert cache.get_similar(np.array([0.0, 1.0, 0.0]), None, None, 1) is None
+    assert cache.get_similar(np.array([0.95, 0.0, 0.12]), None, "analyst", 1) is None
+
+
+def test_version_change_invalidates_everything():
+    cache = AnswerCache()
+    cache.put("q", None, None, (1, 1), RESPONSE, embedding=np.ones(3))
+
+    assert cache.get("q", None, None, (2, 1)) is None
+    assert cache.get_similar(np.ones(3), None, None, (2, 1)) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_answers_built_against_an_older_version_are_dropped():
+    cache = AnswerCache()
+    cache.put("q", None, None, 1, RESPONSE, embedding=np.ones(3))
+    assert cache.get("other", None, None, 2) is None
+    cache.put("new", None, None, 2, RESPONSE, embedding=np.ones(3))
+
+    # A request that read version 1 before the upload finishes afterwards
+    cache.put("slow", None, None, 1, RESPONSE)
+    assert cache.get("slow", None, None, 1) is None
+    assert cache.get_similar(np.ones(3), None, None, 1) is None
+
+    assert cache.get("slow", None, None, 2) is None
+    assert cache.get("new", None, None, 2) == RESPONSE
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_and_lru_eviction():
+    cache = AnswerCache(capacity=2, ttl_s=60)
+    for q in ("a", "b", "c"):
+        cache.put(q, None, None, 1, RESPONSE, embedding=np.random.rand(4))
+
+    assert cache.get("a", None, None, 1) is None
+    assert cache.get("c", None, None, 1) == RESPONSE
+
+    expired = AnswerCache(ttl_s=-1)
+    expired.put("a", None, None, 1, RESPONSE)
+    assert expired.get("a", None, None, 1) is None
+
+
+def make_pipeline():
+    with patch("services.rag_pipeline.OpenAI") as mock_openai:
+        mock_client = mock_openai.return_value
+        mock_choice = Mock()
+        mock_choice.message = Mock(content="Tim Cook is the CEO of Apple.")
+        mock_choice.finish_reason = "stop"
+        mock_client.chat.completions.create = AsyncMock(return_value=Mock(choices=[mock_choice]))
+
+        from services.rag_pipeline import RAGPipeline
+
+        kg = Mock(version=0)
+        kg.aquery_subgraph = AsyncMock(return_value=[{"type": "PERSON", "value": "Tim Cook"}])
+        vector_store = Mock(version=0)
+        vector_store.embed_chunks = lambda chunks: np.eye(len(chunks), 4)
+        vector_store.aembed_query = AsyncMock(
+            side_effect=lambda q: np.array([1.0, 0.0]) if "apple" in q.lower() else np.array([0.0, 1.0])
+        )
+        vector_store.asearch = AsyncMock(return_value=[{"content": "Apple is a tech company.", "score": 0.95}])
+        rag = RAGPipeline(openai_client=mock_client, kg=kg, vector_store=vector_store, nlp=Mock())
+    return rag, mock_client
+
+
+def test_pipeline_serves_repeated_questions_from_cache(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    rag, client = make_pipeline()
+
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=["Apple"]):
+            first = await rag.process_query("Who is the CEO of Apple?")
+            exact = await rag.process_query("who is the ceo of apple")
+            semantic = await rag.process_query("Apple's chief executive?")
+            rag.vector_store.version += 1
+            after_upload = await rag.process_query("Who is the CEO of Apple?")
+        return first, exact, semantic, after_upload
+
+    first, exact, semantic, after_upload = asyncio.run(run())
+
+    assert [r["cache"] for r in (first, exact, semantic, after_upload)] == [
+        "miss", "exact", "semantic", "miss"
+    ]
+    assert exact["answer"] == first["answer"]
+    assert client.chat.completions.create.await_count == 2
+
+
+def test_semantic_hit_leaves_no_unawaited_graph_query(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    rag, _ = make_pipeline()
+
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=["Apple"]):
+            await rag.process_query("Who is the CEO of Apple?")
+            return await rag.process_query("Apple's chief executive?")
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        semantic = asyncio.run(run())
+        gc.collect()
+
+    assert semantic["cache"] == "semantic"
+    assert not [w for w in caught if "never awaited" in str(w.message)]
@@ -8,6 +8,7 @@ import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 from services.document_processor import DocumentProcessor
+from services.nlp import load_nlp
 from services.rag_pipeline import RAGPipeline
 from dotenv import load_dotenv
 import os
@@ -27,7 +28,14 @@ def init_processors():
     
     client = OpenAI(api_key=api_key)
     doc_processor = DocumentProcessor()
-    rag_pipeline = RAGPipeline(openai_client=client)
+    # Share the graph and vector store so queries see new uploads. Entity linking
+    # needs the full spaCy pipeline (PROPN tags), not the NER-only one used at ingest
+    rag_pipeline = RAGPipeline(
+        openai_client=client,
+        kg=doc_processor.kg,
+        vector_store=doc_processor.vector_store,
+        nlp=load_nlp(),
+    )
     return doc_processor, rag_pipeline
 
 doc_processor, rag_pipeline = init_processors()
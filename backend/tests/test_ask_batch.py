@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.common import HashingEmbedder
+
+
+@pytest.fixture(autouse=True)
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+
+
+def test_search_many_runs_one_faiss_search(monkeypatch):
+    from services.vector_store import VectorStore
+
+    store = VectorStore(model=HashingEmbedder())
+    store.add_documents(["pump gasket replacement guide", "quarterly revenue grew strongly", "cats sleep a lot"])
+    batch_sizes = []
+    search = type(store.index).search
+
+    def counted(index, x, *args, **kwargs):
+        batch_sizes.append(len(x))
+        return search(index, x, *args, **kwargs)
+
+    monkeypatch.setattr(type(store.index), "search", counted)
+
+    results = store.search_many(["gasket", "revenue", "cats"], k=1)
+
+    assert batch_sizes == [3]
+    assert [hits[0]["content"] for hits in results] == [
+        "pump gasket replacement guide", "quarterly revenue grew strongly", "cats sleep a lot"
+    ]
+    store.close()
+
+
+class CountingLLM:
+    """Completions that track how many are in flight; questions containing 'boom' fail."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model, messages, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if "boom" in messages[1]["content"]:
+                raise RuntimeError("model overloaded")
+            choice = SimpleNamespace(message=SimpleNamespace(content="An answer."), finish_reason="stop")
+            return SimpleNamespace(choices=[choice])
+        finally:
+            self.in_flight -= 1
+
+
+def test_batch_caps_llm_calls_and_reports_failures_per_question():
+    from services.rag_pipeline import RAGPipeline
+
+    kg = Mock(version=0)
+    kg.aquery_subgraph = AsyncMock(return_value=[])
+    vector_store = Mock(version=0, generation=None)
+    vector_store.search_many = lambda questions, **kwargs: [
+        [{"content": f"context for {question}", "score": 0.9}] for question in questions
+    ]
+    vector_store.embed_chunks = lambda chunks: np.eye(len(chunks), 4)
+    llm = CountingLLM()
+    rag = RAGPipeline(openai_client=llm, kg=kg, vector_store=vector_store, nlp=Mock())
+    rag.llm_max_concurrency = 2
+    questions = [f"question {i}" for i in range(5)] + ["question boom"]
+
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=[]):
+            return await rag.process_batch(questions)
+
+    results = asyncio.run(run())
+
+    assert llm.peak == 2
+    assert [result["question"] for result in results] == questions
+    assert all(result["answer"] == "An answer." for result in results[:5])
+    assert results[5] == {"question": "question boom", "error": "model overloaded"}
+
+
+def test_batch_on_an_empty_store_degrades_to_graph_context():
+    from services.memory_graph import InMemoryGraph
+    from services.rag_pipeline import RAGPipeline
+    from services.vector_store import VectorStore
+
+    store = VectorStore(model=HashingEmbedder())
+    rag = RAGPipeline(openai_client=CountingLLM(), kg=InMemoryGraph(latency_s=0), vector_store=store, nlp=Mock())
+
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=[]):
+            return await rag.process_batch(["question 1", "question 2"])
+
+    results = asyncio.run(run())
+
+    assert [result["answer"] for result in results] == ["An answer.", "An answer."]
+    assert all(result["degraded"] for result in results)
+    assert all("No documents" in result["retrieval_errors"]["vector"] for result in results)
+    store.close()
+
+
+def test_ask_batch_rejects_oversized_batches(monkeypatch):
+    from routers import query_router
+
+    rag = Mock()
+    rag.process_batch = AsyncMock(return_value=[{"question": "a", "answer": "An answer."}])
+    app = FastAPI()
+    app.include_router(query_router.router, prefix="/api/query")
+    app.dependency_overrides[query_router.get_rag_pipeline] = lambda: rag
+    monkeypatch.setattr(query_router.settings, "ASK_BATCH_MAX_QUESTIONS", 2)
+
+    with TestClient(app) as client:
+        response = client.post("/api/query/ask-batch", json={"questions": ["a", "b", "c"]})
+        assert response.status_code == 413
+        assert rag.process_batch.await_count == 0
+
+        response = client.post("/api/query/ask-batch", json={"questions": ["a", "b"]})
+        assert response.status_code == 200
+        assert response.json() == {"results": [{"question": "a", "answer": "An answer."}]}
+
+
+def test_unknown_filter_keys_are_rejected(monkeypatch):
+    from routers import query_router
+
+    rag = Mock()
+    rag.process_query = AsyncMock(return_value={"answer": "An answer."})
+    rag.process_batch = AsyncMock(return_value=[])
+    app = FastAPI()
+    app.include_router(query_router.router, prefix="/api/query")
+    app.dependency_overrides[query_router.get_rag_pipeline] = lambda: rag
+
+    with TestClient(app) as client:
+        response = client.post("/api/query/ask", json={"question": "a", "filters": {"author": "x"}})
+        assert response.status_code == 422
+        assert "author" in response.text
+        response = client.post("/api/query/ask-batch", json={"questions": ["a"], "filters": {"author": "x"}})
+        assert response.status_code == 422
+        assert rag.process_query.await_count == rag.process_batch.await_count == 0
+
+        response = client.post("/api/query/ask", json={"question": "a", "filters": {"domain": "finance"}})
+        assert response.status_code == 200
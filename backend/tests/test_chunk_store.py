@@ -0,0 +1,86 @@
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services.chunk_store import ChunkStore
+from services.vector_store import VectorStore
+
+
+def test_append_read_round_trip(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    assert store.append(["pump gasket", "", "naïve café ☕"]) == 0
+    assert store.append(["last"]) == 3
+
+    assert len(store) == 4
+    assert list(store) == ["pump gasket", "", "naïve café ☕", "last"]
+    assert store[-1] == "last"
+    assert store.get_many([2, 0]) == ["naïve café ☕", "pump gasket"]
+    with pytest.raises(IndexError):
+        store[4]
+    store.close()
+
+
+def test_reopen_drops_torn_entries(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.append(["first", "second"])
+    store.close()
+    # A crash between the blob and offsets writes, and halfway through an offset
+    with open(store.blob_path, "ab") as f:
+        f.write(b"orphaned bytes")
+    with open(store.offsets_path, "ab") as f:
+        f.write(b"\x00" * 3)
+
+    reopened = ChunkStore(str(tmp_path))
+    assert list(reopened) == ["first", "second"]
+    assert reopened.append(["third"]) == 2
+    reopened.close()
+    assert list(ChunkStore(str(tmp_path))) == ["first", "second", "third"]
+
+
+def test_truncate_survives_reopen(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.append(["a", "bb", "ccc"])
+    store.truncate(1)
+    assert list(store) == ["a"]
+    store.append(["dddd"])
+    store.close()
+
+    assert list(ChunkStore(str(tmp_path))) == ["a", "dddd"]
+
+
+def test_reads_see_chunks_appended_after_mapping(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.append(["one"])
+    assert store[0] == "one"  # maps the files as they are now
+    store.append([f"chunk {i}" for i in range(1000)])
+
+    assert store[1000] == "chunk 999"
+    assert store[0] == "one"
+    # A read-only view of the first chunks ignores later appends
+    view = ChunkStore(str(tmp_path), count=2)
+    store.append(["more"])
+    assert list(view) == ["one", "chunk 0"]
+    view.close()
+    store.close()
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+def test_store_truncates_chunks_without_vectors_on_reopen(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    store.add_documents(["pump gasket replacement guide"])
+    # A crash after the chunks were written but before the log record
+    store.documents.append(["never indexed"])
+    store.close()
+
+    store = VectorStore(model=HashingEmbedder())
+    assert store.index.ntotal == 1
+    assert list(store.documents) == ["pump gasket replacement guide"]
+    store.close()
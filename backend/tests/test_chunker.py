@@ -0,0 +1,53 @@
+import pytest
+
+from services.chunker import Chunker
+
+TEXT = (
+    "The pump uses a standard gasket. Gaskets wear out after two years! "
+    "Replace them during the annual service.\n\n"
+    "Model XK-9921 needs a reinforced gasket. It is sold separately. "
+) * 20
+
+
+def test_chunks_respect_size_and_end_at_sentences():
+    chunks = Chunker(chunk_size=120, overlap=0).chunk_text(TEXT)
+
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert all(chunk[-1] in ".!?" for chunk in chunks)
+    # Without overlap no text is lost or repeated
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == TEXT.replace(" ", "").replace("\n", "")
+
+
+def test_overlap_repeats_the_tail_of_the_previous_chunk():
+    chunks = Chunker(chunk_size=120, overlap=40).chunk_text(TEXT)
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        head = chunk.split()[0]
+        assert head in previous[-60:]
+
+
+def test_token_sizing():
+    chunks = Chunker(chunk_size=20, overlap=5, unit="tokens").chunk_text(TEXT)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.replace(".", " .").replace("!", " !").split()) <= 20 for chunk in chunks)
+
+
+def test_streamed_segments_match_whole_text():
+    segments = [f"Page {i} says something about gaskets. " * 40 for i in range(200)]
+    chunker = Chunker(chunk_size=300, overlap=50)
+
+    streamed = chunker.chunk_segments(iter(segments), window=4096)
+
+    assert list(streamed) == chunker.chunk_text("\n".join(segments))
+
+
+def test_hard_cut_without_boundaries():
+    assert Chunker(chunk_size=10, overlap=0, boundary="none").chunk_text("abcdefghijklmnopqrstuvwxyz") == [
+        "abcdefghij", "klmnopqrst", "uvwxyz"
+    ]
+
+
+def test_rejects_overlap_not_smaller_than_size():
+    with pytest.raises(ValueError):
+        Chunker(chunk_size=10, overlap=10)
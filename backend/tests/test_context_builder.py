@@ -0,0 +1,46 @@
+import numpy as np
+
+from services.context_builder import ContextBuilder, count_tokens
+
+
+def chunk(content, score):
+    return {"content": content, "score": score}
+
+
+def test_kg_facts_are_deduplicated_and_capped():
+    builder = ContextBuilder(max_kg_facts=2)
+    kg_results = [
+        {"type": "ORG", "value": "Apple"},
+        {"type": "ORG", "value": "apple "},
+        {"type": "PERSON", "value": "Tim Cook"},
+        {"type": "GPE", "value": "Cupertino"},
+    ]
+
+    context, stats = builder.build(kg_results, [])
+
+    assert context == "Knowledge Graph Information:\n- ORG: Apple\n- PERSON: Tim Cook\n"
+    assert stats["kg_facts"] == 2 and stats["kg_facts_dropped"] == 2
+
+
+def test_mmr_skips_near_duplicates_and_prefers_diverse_chunks():
+    builder = ContextBuilder(mmr_lambda=0.5, dedupe_threshold=0.95)
+    results = [chunk("apple revenue", 0.9), chunk("apple revenue, again", 0.89), chunk("apple ceo", 0.7)]
+    query = np.array([1.0, 0.2, 0.2])
+    vectors = np.array([[1.0, 0.3, 0.0], [1.0, 0.31, 0.0], [0.8, 0.0, 0.6]])
+
+    context, stats = builder.build([], results, query, vectors)
+
+    assert "apple revenue, again" not in context
+    assert context.index("apple revenue") < context.index("apple ceo")
+    assert stats["chunks"] == 2 and stats["chunks_dropped"] == 1
+
+
+def test_context_stays_within_token_budget():
+    builder = ContextBuilder(max_tokens=120)
+    results = [chunk(f"chunk {i} " + "word " * 30, 1.0 - i / 100) for i in range(10)]
+
+    context, stats = builder.build([{"type": "ORG", "value": "Apple"}], results)
+
+    assert stats["tokens"] <= stats["budget"] == 120
+    assert count_tokens(context) <= 120
+    assert stats["kg_facts"] == 1 and 0 < stats["chunks"] < 10
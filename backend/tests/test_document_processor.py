@@ -0,0 +1,105 @@
+import asyncio
+import io
+
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services.document_processor import DocumentProcessor
+from services.memory_graph import InMemoryGraph
+from services.vector_store import VectorStore
+
+
+class Upload(io.BytesIO):
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+class StubNER:
+    def __init__(self, fail=False, fail_on_call=None):
+        self.fail = fail
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+
+    def extract_groups(self, groups):
+        self.calls += 1
+        if self.fail or self.calls == self.fail_on_call:
+            raise RuntimeError("NER worker died")
+        return [{"ORG": ["Acme Corporation"]} for _ in groups]
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+def uploads():
+    return [
+        Upload("pump.txt", b"Acme Corporation pump gasket replacement guide"),
+        Upload("revenue.txt", b"Acme Corporation quarterly revenue grew strongly"),
+    ]
+
+
+def test_failed_ner_stores_no_vectors(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    graph = InMemoryGraph(latency_s=0)
+    processor = DocumentProcessor(kg=graph, vector_store=store, ner=StubNER(fail=True))
+
+    with pytest.raises(RuntimeError, match="NER worker died"):
+        asyncio.run(processor.process_files(uploads()))
+    assert store.index.ntotal == 0
+    assert store.list_documents() == []
+
+    # Nothing half-stored, so a retry is not mistaken for an unchanged upload
+    processor.ner = StubNER()
+    results = asyncio.run(processor.process_files(uploads()))
+    assert [result["status"] for result in results] == ["processed", "processed"]
+    assert store.index.ntotal == 2
+    assert graph.entities == {("ORG", "Acme Corporation")}
+    store.close()
+
+
+def test_streamed_upload_failing_midway_leaves_nothing_behind(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    [old] = store.add_documents(["old pump manual"], metadata=[{"name": "manual.txt"}])
+    processor = DocumentProcessor(kg=InMemoryGraph(latency_s=0), vector_store=store, ner=StubNER(fail_on_call=2))
+    # Stream every upload, one 20-character segment per window
+    processor.stream_min_bytes = 1
+    processor.stream_window = 1
+    processor.segment_options["max_chars"] = 20
+    text = b"pump gasket replacement guide for the new Acme pump series"
+
+    def upload():
+        manual = Upload("manual.txt", text)
+        manual.size = len(text)
+        return [manual]
+
+    with pytest.raises(RuntimeError, match="NER worker died"):
+        asyncio.run(processor.process_files(upload()))
+    # The first window was stored, but neither shows nor replaced the old manual
+    assert [doc["doc_id"] for doc in store.list_documents()] == [old]
+    assert store.search("gasket", k=5)[0]["doc_id"] == old
+
+    [result] = asyncio.run(processor.process_files(upload()))
+    assert result["status"] == "processed"
+    [doc] = store.list_documents()
+    assert doc["doc_id"] == result["doc_id"] != old
+    assert doc["chunks"] > 1
+    assert {hit["doc_id"] for hit in store.search("gasket", k=5)} == {doc["doc_id"]}
+    store.close()
+
+
+def test_reopening_drops_uploads_that_never_finished(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    [doc_id] = store.add_documents(["first window"], metadata=[{"name": "big.txt", "pending": True}])
+    store.close()
+
+    store = VectorStore(model=HashingEmbedder())
+    assert store.registry.pending_docs() == []
+    assert store.registry.docs[doc_id]["deleted"]
+    store.close()
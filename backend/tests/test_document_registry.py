@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pytest
+
+from services.document_registry import LEGACY_DOC_ID, DocumentRegistry, runs
+
+
+def add(registry, start, name, count, **metadata):
+    doc = registry.new_doc(name, f"hash-{name}", **metadata)
+    registry.apply({"docs": [doc], "runs": runs([doc["doc_id"]] * count)}, start, count)
+    return doc["doc_id"]
+
+
+def test_replaying_a_record_is_idempotent():
+    registry = DocumentRegistry()
+    doc = registry.new_doc("a.pdf", "h1", domain="finance", file_type="pdf")
+    record = {"docs": [doc], "runs": [[doc["doc_id"], 3]]}
+
+    registry.apply(record, 0, 3)
+    registry.apply(record, 0, 3)
+
+    assert len(registry) == 3
+    assert registry.documents() == [{**doc, "chunks": 3}]
+    assert registry.find_by_hash("h1")["doc_id"] == doc["doc_id"]
+
+
+def test_chunks_from_before_tracking_belong_to_the_legacy_document():
+    registry = DocumentRegistry()
+    doc_id = add(registry, 2, "new.txt", 2)
+
+    assert list(registry.chunk_docs) == [LEGACY_DOC_ID, LEGACY_DOC_ID, doc_id, doc_id]
+
+
+def test_chunk_mask_filters_metadata_and_hides_deleted_documents():
+    registry = DocumentRegistry()
+    a = add(registry, 0, "a.pdf", 2, domain="finance", file_type="pdf")
+    b = add(registry, 2, "b.xlsx", 1, domain="finance", file_type="xlsx")
+    add(registry, 3, "c.pdf", 1, domain="hr", file_type="pdf")
+
+    assert registry.chunk_mask() is None
+    assert registry.chunk_mask({"domain": "finance"}).tolist() == [True, True, True, False]
+    assert registry.chunk_mask({"file_type": ["xlsx", "pdf"], "domain": "hr"}).tolist() == [False] * 3 + [True]
+
+    registry.apply({"deleted": [a]}, 4, 0)
+
+    assert registry.chunk_mask().tolist() == [False, False, True, True]
+    assert registry.chunk_mask({"doc_id": [a, b]}).tolist() == [False, False, True, False]
+    assert registry.find_by_name("a.pdf") is None
+    with pytest.raises(ValueError):
+        registry.chunk_mask({"author": "x"})
+
+
+def test_compacted_drops_deleted_documents(tmp_path):
+    registry = DocumentRegistry()
+    a = add(registry, 0, "a.pdf", 2)
+    b = add(registry, 2, "b.pdf", 2)
+    registry.apply({"deleted": [a]}, 4, 0)
+
+    compacted = registry.compacted(np.flatnonzero(registry.chunk_mask()))
+    path = str(tmp_path / "doc_registry.bin")
+    compacted.save(path)
+    loaded = DocumentRegistry.load(path)
+
+    assert list(loaded.chunk_docs) == [b, b]
+    assert [doc["doc_id"] for doc in loaded.documents()] == [b]
+    assert not loaded.has_tombstones
+    # Ids are never reused after a vacuum
+    assert loaded.new_doc("c.pdf", "h")["doc_id"] == b + 1
+
+
+def test_listing_documents_while_chunks_are_applied():
+    registry = DocumentRegistry()
+    stop = threading.Event()
+    errors = []
+
+    def list_documents():
+        while not stop.is_set():
+            try:
+                registry.documents()
+            except Exception as e:
+                errors.append(e)
+
+    lister = threading.Thread(target=list_documents)
+    lister.start()
+    try:
+        for i in range(3000):
+            add(registry, len(registry), f"d{i}.txt", 50)
+    finally:
+        stop.set()
+        lister.join()
+
+    assert errors == []
+    assert len(registry.documents()) == 3000
+
+
+def test_pending_documents_stay_hidden_until_completed():
+    registry = DocumentRegistry()
+    old = add(registry, 0, "a.txt", 1)
+    doc = {**registry.new_doc("a.txt", "h2"), "pending": True}
+    registry.apply({"docs": [doc], "runs": [[doc["doc_id"], 2]]}, 1, 2)
+
+    assert [d["doc_id"] for d in registry.documents()] == [old]
+    assert registry.find_by_hash("h2") is None
+    assert registry.find_by_name("a.txt")["doc_id"] == old
+    assert registry.chunk_mask().tolist() == [True, False, False]
+    # A vacuum must keep the chunks of an upload still streaming in
+    assert registry.retained_mask() is None
+    assert registry.pending_docs() == [doc["doc_id"]]
+
+    registry.apply({"completed": [doc["doc_id"]], "deleted": [old]}, 3, 0)
+    assert [d["doc_id"] for d in registry.documents()] == [doc["doc_id"]]
+    assert registry.find_by_name("a.txt")["doc_id"] == registry.find_by_hash("h2")["doc_id"] == doc["doc_id"]
+    assert registry.chunk_mask().tolist() == [False, True, True]
+    assert registry.pending_docs() == []
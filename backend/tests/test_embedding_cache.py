@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_repeated_texts_are_encoded_once():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("test-model", capacity=10)
+
+    first = cache.encode(["alpha", "beta", "alpha"], encoder)
+    second = cache.encode(["beta", "gamma"], encoder)
+
+    assert encoder.encoded == ["alpha", "beta", "gamma"]
+    assert first.shape == (3, 2)
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(first[1], second[0])
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_lru_evicts_oldest_entries():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("test-model", capacity=2)
+
+    cache.encode(["a", "b"], encoder)
+    cache.encode(["a"], encoder)  # refresh "a" so "b" is the eviction candidate
+    cache.encode(["c"], encoder)
+    cache.encode(["a", "b"], encoder)
+
+    assert encoder.encoded == ["a", "b", "c", "b"]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("test-model", capacity=10, path=path)
+    cache.encode(["persisted chunk"], encoder)
+    cache.close()
+
+    reopened = EmbeddingCache("test-model", capacity=10, path=path)
+    vectors = reopened.encode(["persisted chunk"], encoder)
+
+    assert encoder.encoded == ["persisted chunk"]
+    assert reopened.stats()["disk_hits"] == 1
+    assert vectors[0][0] == len("persisted chunk")
+
+
+def test_model_name_is_part_of_the_key():
+    encoder = CountingEncoder()
+    EmbeddingCache("model-a").encode(["same text"], encoder)
+    EmbeddingCache("model-b").encode(["same text"], encoder)
+
+    assert encoder.encoded == ["same text", "same text"]
+
+
+def stored_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_disk_writes_are_batched_off_the_lookup_path(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("test-model", capacity=10, path=path, flush_interval_s=3600)
+    cache.encode(["first question"], CountingEncoder())
+    cache.encode(["second question"], CountingEncoder())
+
+    assert stored_rows(path) == 0
+    cache.flush()
+    assert stored_rows(path) == 2
+    cache.close()
+
+
+def test_disk_tier_keeps_the_most_recently_used(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("test-model", capacity=1, path=path, disk_capacity=2, flush_interval_s=3600)
+    encoder = CountingEncoder()
+    cache.encode(["a"], encoder)
+    cache.encode(["b"], encoder)
+    cache.flush()
+    cache.encode(["a"], encoder)  # read back from disk, so "b" is the oldest row
+    cache.encode(["c"], encoder)
+    cache.close()
+
+    assert stored_rows(path) == 2
+    reopened = EmbeddingCache("test-model", capacity=10, path=path)
+    reopened.encode(["a", "b", "c"], encoder)
+    assert encoder.encoded == ["a", "b", "c", "b"]
+    reopened.close()
+
+
+def test_counters_add_up_under_concurrent_lookups():
+    cache = EmbeddingCache("test-model", capacity=100)
+    texts = [f"text {i % 20}" for i in range(200)]
+
+    def lookups():
+        for text in texts:
+            cache.encode([text], CountingEncoder())
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["memory_hits"] + stats["disk_hits"] + stats["misses"] == 8 * len(texts)
@@ -0,0 +1,57 @@
+import asyncio
+
+import numpy as np
+
+from services.embedding_scheduler import EmbeddingScheduler
+
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(t))] for t in texts], dtype=np.float32)
+    return encode
+
+
+def test_concurrent_embeds_are_coalesced():
+    calls = []
+    scheduler = EmbeddingScheduler(fake_encode(calls), max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(scheduler.embed("x" * i) for i in range(1, 6)))
+
+    vectors = asyncio.run(run())
+
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(calls) == 1
+    stats = scheduler.stats()
+    assert stats["batches"] == 1
+    assert stats["max_batch_size"] == 5
+
+
+def test_batches_are_capped_at_max_batch_size():
+    calls = []
+    scheduler = EmbeddingScheduler(fake_encode(calls), max_batch_size=4, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(scheduler.embed("q") for _ in range(10)))
+
+    vectors = asyncio.run(run())
+
+    assert len(vectors) == 10
+    assert [len(batch) for batch in calls] == [4, 4, 2]
+
+
+def test_encode_errors_reach_every_caller():
+    def failing_encode(texts):
+        raise RuntimeError("model unavailable")
+
+    scheduler = EmbeddingScheduler(failing_encode, max_batch_size=4, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(
+            scheduler.embed("a"), scheduler.embed("b"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
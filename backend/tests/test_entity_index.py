@@ -0,0 +1,45 @@
+from services.entity_index import EntityIndex
+
+
+def build_index():
+    index = EntityIndex()
+    index.add([
+        {"type": "ORG", "value": "Apple Inc."},
+        {"type": "ORG", "value": "Apple"},
+        {"type": "PERSON", "value": "Tim Cook"},
+        {"type": "GPE", "value": "Cupertino, California"},
+        {"type": "ORG", "value": "Apple"},
+    ])
+    return index
+
+
+def test_duplicates_are_indexed_once():
+    assert len(build_index()) == 4
+
+
+def test_every_mention_token_must_match():
+    index = build_index()
+
+    assert index.lookup(["Tim Cook"]) == [{"type": "PERSON", "value": "Tim Cook"}]
+    assert index.lookup(["Tim Apple"]) == []
+
+
+def test_exact_matches_rank_first():
+    index = build_index()
+
+    results = index.lookup(["apple"])
+
+    assert results[0] == {"type": "ORG", "value": "Apple"}
+    assert {"type": "ORG", "value": "Apple Inc."} in results
+
+
+def test_lookup_is_case_and_punctuation_insensitive():
+    index = build_index()
+
+    assert index.lookup(["CUPERTINO"]) == [{"type": "GPE", "value": "Cupertino, California"}]
+
+
+def test_limit_caps_results():
+    index = build_index()
+
+    assert len(index.lookup(["apple", "cook"], limit=2)) == 2
@@ -0,0 +1,63 @@
+import io
+
+from services.extraction import extract_segments, iter_segments
+
+
+def test_text_is_cut_at_whitespace_and_carried_over():
+    text = "alpha beta gamma delta epsilon zeta eta theta iota kappa"
+    segments = extract_segments("notes.txt", text.encode("utf-8"), max_chars=12)
+
+    # Blocks are read 12 bytes at a time; the word cut off at the end of one
+    # is carried over into the next segment
+    assert segments == ["alpha beta", " gamma delta", " epsilon", " zeta eta", " theta iota", " kappa"]
+
+
+def test_text_without_whitespace_is_cut_hard_at_max_chars():
+    text = "a" * 25 + " tail " + "b" * 30
+    segments = list(iter_segments("blob.txt", io.BytesIO(text.encode("utf-8")), max_chars=10))
+
+    assert "".join(segments) == text
+    assert max(len(segment) for segment in segments) == 10
+    assert segments[:2] == ["a" * 10, "a" * 10]
+
+
+def test_multibyte_characters_survive_block_boundaries():
+    text = "naïve café " * 20
+    segments = extract_segments("notes.txt", text.encode("utf-8"), max_chars=7)
+
+    assert "".join(segments) == text
+
+
+def workbook_bytes(sheets):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def test_xlsx_repeats_the_header_per_row_block():
+    rows = [("part", "qty")] + [(f"p{i}", i) for i in range(5)]
+    data = workbook_bytes({"Stock": rows, "Empty": []})
+
+    segments = extract_segments("stock.xlsx", data, rows_per_segment=2)
+
+    assert segments == [
+        "Sheet: Stock\npart\tqty\np0\t0\np1\t1",
+        "Sheet: Stock\npart\tqty\np2\t2\np3\t3",
+        "Sheet: Stock\npart\tqty\np4\t4",
+    ]
+
+
+def test_xlsx_header_only_sheet_keeps_its_column_names():
+    data = workbook_bytes({"Todo": [("owner", "due date")], "Done": [("owner", "done"), ("ann", "yes")]})
+
+    segments = extract_segments("tasks.xlsx", data, rows_per_segment=1)
+
+    assert segments == ["Sheet: Todo\nowner\tdue date", "Sheet: Done\nowner\tdone\nann\tyes"]
@@ -0,0 +1,125 @@
+import os
+import threading
+
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services import generations
+from services.vector_store import ReadOnlyStoreError, VectorStore
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    # Tests call publish() and refresh() themselves
+    monkeypatch.setenv("GENERATION_MIN_INTERVAL_S", "60")
+    monkeypatch.setenv("GENERATION_POLL_S", "60")
+    return tmp_path
+
+
+def open_store(monkeypatch, role):
+    monkeypatch.setenv("VECTOR_STORE_ROLE", role)
+    return VectorStore(model=HashingEmbedder())
+
+
+def test_reader_swaps_in_published_generations(store_path, monkeypatch):
+    writer = open_store(monkeypatch, "writer")
+    reader = open_store(monkeypatch, "reader")
+    assert writer.generation == reader.generation == 1
+    assert len(reader.documents) == 0
+
+    [pump] = writer.add_documents(["pump gasket replacement guide"], metadata=[{"name": "pump.txt"}])
+    # Searches keep answering from generation 1 until the swap
+    assert not reader.documents
+    writer.publish()
+    assert reader.refresh()
+    assert reader.generation == 2
+    assert reader.search("gasket", k=1)[0]["content"] == "pump gasket replacement guide"
+    assert [doc["name"] for doc in reader.list_documents()] == ["pump.txt"]
+    assert not reader.refresh()
+
+    writer.add_documents(["quarterly revenue grew strongly"])
+    writer.delete_document(pump)
+    writer.publish()
+    reader.refresh()
+    hits = reader.search("gasket revenue", k=5)
+    assert [hit["content"] for hit in hits] == ["quarterly revenue grew strongly"]
+
+    reader.close()
+    writer.close()
+
+
+def test_published_generations_survive_vacuum_and_pruning(store_path, monkeypatch):
+    monkeypatch.setenv("GENERATION_KEEP", "2")
+    writer = open_store(monkeypatch, "writer")
+    old, _ = writer.add_documents(["old pump manual", "cats sleep most of the day"])
+    writer.publish()
+    reader = open_store(monkeypatch, "reader")
+    held = reader.documents
+
+    writer.delete_document(old)
+    writer.vacuum()
+    writer.publish()
+    writer.publish()
+
+    # Generation 2 was pruned and its files replaced, but the reader's maps still hold it
+    assert sorted(os.listdir(store_path / generations.GENERATIONS_DIR)) == ["00000003", "00000004"]
+    assert list(held) == ["old pump manual", "cats sleep most of the day"]
+    assert reader.refresh()
+    assert list(reader.documents) == ["cats sleep most of the day"]
+    assert reader.search("cats", k=1)[0]["id"] == 0
+
+    reader.close()
+    writer.close()
+
+
+def test_uploads_during_a_publish_wait_for_the_next_generation(store_path, monkeypatch):
+    writer = open_store(monkeypatch, "writer")
+    writer.add_documents(["pump gasket replacement guide"])
+    save = writer.registry.save
+
+    def save_during_an_upload(path, data=None):
+        monkeypatch.setattr(writer.registry, "save", save)
+        upload = threading.Thread(target=writer.add_documents, args=(["gasket kit for the new pump"],))
+        upload.start()
+        upload.join(timeout=10)
+        # Would time out if the store lock were held while publishing
+        assert not upload.is_alive()
+        save(path, data)
+
+    monkeypatch.setattr(writer.registry, "save", save_during_an_upload)
+    writer.publish()
+    reader = open_store(monkeypatch, "reader")
+    # The registry and BM25 snapshots hold the upload, but the generation ends before it
+    assert len(reader.documents) == 1
+    assert reader._rows_beyond_count
+    assert [hit["content"] for hit in reader.search("gasket kit", k=5)] == ["pump gasket replacement guide"]
+
+    writer.publish()
+    reader.refresh()
+    assert len(reader.search("gasket kit", k=5)) == 2
+    reader.close()
+    writer.close()
+
+
+def test_reader_refuses_writes_and_writer_publishes_on_close(store_path, monkeypatch):
+    reader = open_store(monkeypatch, "reader")
+    assert reader.generation is None
+    with pytest.raises(ReadOnlyStoreError):
+        reader.add_documents(["anything"])
+    with pytest.raises(ReadOnlyStoreError):
+        reader.vacuum()
+
+    writer = open_store(monkeypatch, "writer")
+    writer.add_documents(["quarterly revenue grew strongly"])
+    writer.close()
+
+    manifest = generations.read_manifest(str(store_path))
+    assert manifest["generation"] == 2 and manifest["chunks"] == 1
+    assert reader.refresh()
+    assert reader.search("revenue", k=1)[0]["content"] == "quarterly revenue grew strongly"
+    reader.close()
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services import index_factory
+from services.vector_store import VectorStore
+
+# Every (VECTOR_INDEX_TYPE, VECTOR_QUANTIZATION) pair configured_index() keeps apart
+PAIRS = [
+    ("flat", "none"), ("flat", "fp16"), ("flat", "int8"), ("flat", "pq"),
+    ("ivf_flat", "none"), ("ivf_flat", "fp16"), ("ivf_flat", "int8"),
+    ("hnsw", "none"), ("hnsw", "fp16"), ("hnsw", "int8"), ("hnsw", "pq"),
+    ("ivf_pq", "pq"),
+]
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    monkeypatch.setenv("HYBRID_SEARCH", "false")
+    monkeypatch.setenv("VECTOR_IVF_NLIST", "4")
+    monkeypatch.setenv("VECTOR_PQ_M", "8")
+    return tmp_path
+
+
+@pytest.mark.parametrize("index_type,quantization", PAIRS)
+def test_filtered_search_skips_tombstones(store_path, monkeypatch, index_type, quantization):
+    monkeypatch.setenv("VECTOR_INDEX_TYPE", index_type)
+    monkeypatch.setenv("VECTOR_QUANTIZATION", quantization)
+    store = VectorStore(model=HashingEmbedder())
+    n = max(index_factory.training_size(store.settings), 400)
+    texts = [f"record{i} alpha{i % 50} beta{i % 7} gamma{i % 11}" for i in range(n)]
+    doc_ids = store.add_documents(
+        texts, metadata=[{"name": f"r{i}.txt", "domain": "even" if i % 2 == 0 else "odd"} for i in range(n)]
+    )
+    assert store.rebuild_index()
+    assert index_factory.index_config(store.index) == index_factory.configured_index(store.settings)
+
+    # A same-name upload tombstones the old document, so every search now carries a mask
+    [replacement] = store.add_documents(["record0 replaced"], metadata=[{"name": "r0.txt", "domain": "even"}])
+    hits = store.search(texts[0], k=5, nprobe=4, ef_search=64)
+    assert len(hits) == 5
+    assert doc_ids[0] not in {hit["doc_id"] for hit in hits}
+
+    even = {doc_id for i, doc_id in enumerate(doc_ids) if i % 2 == 0} - {doc_ids[0]} | {replacement}
+    hits = store.search(texts[1], k=5, nprobe=4, ef_search=64, filters={"domain": "even"})
+    assert len(hits) == 5
+    assert {hit["doc_id"] for hit in hits} <= even
+    store.close()
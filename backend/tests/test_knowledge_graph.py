@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from services.knowledge_graph import (
+    ALL_ENTITIES_QUERY,
+    LOOKUP_ENTITIES_QUERY,
+    MERGE_ENTITIES_QUERY,
+    KnowledgeGraph,
+)
+
+
+class FakeResult:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        return None
+
+    def data(self):
+        return []
+
+
+class FakeTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, params=None):
+        self.driver.queries.append((query, params))
+        if query == LOOKUP_ENTITIES_QUERY:
+            return FakeResult(params["rows"])
+        return FakeResult(self.driver.stored if query == ALL_ENTITIES_QUERY else ())
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params=None):
+        self.driver.round_trips += 1
+        return FakeTx(self.driver).run(query, params)
+
+    def execute_write(self, fn, *args):
+        self.driver.round_trips += 1
+        return fn(FakeTx(self.driver), *args)
+
+    def execute_read(self, fn, *args):
+        self.driver.round_trips += 1
+        return fn(FakeTx(self.driver), *args)
+
+
+class FakeDriver:
+    """Stands in for neo4j.Driver and counts transactions sent to the server."""
+
+    def __init__(self, stored=()):
+        self.round_trips = 0
+        self.queries = []
+        self.stored = list(stored)
+
+    def session(self):
+        return FakeSession(self)
+
+
+class FakeAsyncResult(FakeResult):
+    async def consume(self):
+        return None
+
+
+class FakeAsyncTx(FakeTx):
+    async def run(self, query, params=None):
+        self.driver.queries.append((query, params))
+        return FakeAsyncResult()
+
+
+class FakeAsyncSession(FakeSession):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_write(self, fn, *args):
+        self.driver.round_trips += 1
+        return await fn(FakeAsyncTx(self.driver), *args)
+
+
+class FakeAsyncDriver(FakeDriver):
+    def session(self):
+        return FakeAsyncSession(self)
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("KG_WRITE_BATCH_SIZE", "2")
+    kg = KnowledgeGraph(driver=FakeDriver(), async_driver=FakeAsyncDriver())
+    kg.driver.round_trips = 0
+    kg.driver.queries.clear()
+    return kg
+
+
+def merged_rows(driver):
+    return [row for query, params in driver.queries if query == MERGE_ENTITIES_QUERY for row in params["rows"]]
+
+
+def test_schema_constraint_created_on_startup(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    driver = FakeDriver()
+    KnowledgeGraph(driver=driver, async_driver=FakeAsyncDriver())
+
+    statements = [query for query, _ in driver.queries]
+    assert any("CREATE CONSTRAINT" in q for q in statements)
+    assert any("CREATE FULLTEXT INDEX" in q for q in statements)
+
+
+def test_add_entities_dedupes_and_batches(graph):
+    graph.add_entities({
+        "ORG": ["Apple", "Apple", "Google"],
+        "PERSON": ["Tim Cook", "Tim Cook", ""],
+    })
+
+    # 3 unique rows with a batch size of 2 -> 2 transactions instead of 6
+    assert graph.driver.round_trips == 2
+    assert merged_rows(graph.driver) == [
+        {"type": "ORG", "value": "Apple"},
+        {"type": "ORG", "value": "Google"},
+        {"type": "PERSON", "value": "Tim Cook"},
+    ]
+
+
+def test_add_entities_skips_empty_input(graph):
+    graph.add_entities({"ORG": []})
+
+    assert graph.driver.round_trips == 0
+
+
+def test_async_add_entities_batches(graph):
+    asyncio.run(graph.aadd_entities({"GPE": ["Cupertino", "California", "Cupertino", "Paris"]}))
+
+    assert graph.async_driver.round_trips == 2
+    assert len(merged_rows(graph.async_driver)) == 3
+
+
+def test_local_index_is_loaded_from_graph_at_startup(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    driver = FakeDriver(stored=[{"type": "PERSON", "value": "Tim Cook"}])
+    kg = KnowledgeGraph(driver=driver, async_driver=FakeAsyncDriver())
+
+    assert kg.query_subgraph("Who is Tim Cook?", mentions=["Tim Cook"]) == [
+        {"type": "PERSON", "value": "Tim Cook"}
+    ]
+
+
+def test_unlinked_question_skips_the_graph(graph):
+    graph.add_entities({"ORG": ["Apple Inc."]})
+    graph.driver.round_trips = 0
+
+    assert graph.query_subgraph("What is the weather?", mentions=["weather"]) == []
+    assert graph.driver.round_trips == 0
+
+
+def test_linked_mentions_use_exact_lookups(graph):
+    graph.add_entities({"ORG": ["Apple Inc.", "Pineapple Co"], "PERSON": ["Tim Cook"]})
+    graph.driver.queries.clear()
+
+    results = graph.query_subgraph("Who runs Apple?", mentions=["Apple"])
+
+    assert results == [{"type": "ORG", "value": "Apple Inc."}]
+    assert graph.driver.queries[0][0] == LOOKUP_ENTITIES_QUERY
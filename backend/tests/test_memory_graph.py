@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from benchmarks.corpus import synthetic_corpus, synthetic_questions
+from core.resources import build_resources
+from services.memory_graph import InMemoryGraph
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+
+
+def test_memory_graph_merges_and_links():
+    graph = InMemoryGraph(latency_s=0)
+    graph.add_entities({"ORG": ["Acme Corporation", "Acme Corporation"], "GPE": ["Berlin"]})
+    asyncio.run(graph.aadd_entities({"PERSON": ["Jane Smith"]}))
+
+    assert graph.entities == {("ORG", "Acme Corporation"), ("GPE", "Berlin"), ("PERSON", "Jane Smith")}
+    assert graph.version == 2
+    assert graph.query_subgraph("q", mentions=["acme"]) == [{"type": "ORG", "value": "Acme Corporation"}]
+    assert asyncio.run(graph.aquery_subgraph("Jane Smith")) == [{"type": "PERSON", "value": "Jane Smith"}]
+
+
+def test_graph_backend_setting_selects_the_stand_in(monkeypatch):
+    monkeypatch.setenv("GRAPH_BACKEND", "memory")
+    assert isinstance(build_resources().get("knowledge_graph"), InMemoryGraph)
+
+    monkeypatch.setenv("GRAPH_BACKEND", "sqlite")
+    with pytest.raises(ValueError, match="GRAPH_BACKEND"):
+        build_resources().get("knowledge_graph")
+
+
+def test_synthetic_corpus_is_deterministic():
+    corpus = synthetic_corpus(3, words_per_doc=200)
+
+    assert corpus == synthetic_corpus(3, words_per_doc=200)
+    assert all(len(doc["text"].split()) >= 200 for doc in corpus)
+    fact = corpus[0]["facts"][0]
+    assert fact["org"] in corpus[0]["text"] or fact["person"] in corpus[0]["text"]
+    assert synthetic_questions(corpus, 5) == synthetic_questions(corpus, 5)
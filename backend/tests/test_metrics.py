@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from core import metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.configure(True, timing_header=True)
+    yield metrics.REGISTRY
+    metrics.configure(False)
+    metrics.REGISTRY.reset()
+
+
+def test_disabled_spans_and_counters_are_no_ops():
+    metrics.configure(False)
+
+    with metrics.span("vector_search") as span:
+        metrics.inc("rag_answers_total", cache="miss")
+
+    assert span is None
+    assert metrics.REGISTRY.value("rag_stage_seconds", stage="vector_search") is None
+    assert metrics.REGISTRY.value("rag_answers_total", cache="miss") is None
+
+
+def test_render_prometheus_text(enabled):
+    enabled.inc("rag_chunks_ingested_total", 3)
+    enabled.inc("rag_chunks_ingested_total", 2)
+    enabled.observe("rag_stage_seconds", 0.003, stage='say "hi"')
+    enabled.observe("rag_stage_seconds", 100.0, stage='say "hi"')
+    enabled.add_collector(lambda: [("rag_index_vectors", {}, 42)])
+
+    text = enabled.render()
+
+    assert "# TYPE rag_chunks_ingested_total counter\nrag_chunks_ingested_total 5\n" in text
+    assert "rag_index_vectors 42\n" in text
+    assert 'rag_stage_seconds_bucket{stage="say \\"hi\\"",le="0.0025"} 0\n' in text
+    assert 'rag_stage_seconds_bucket{stage="say \\"hi\\"",le="0.005"} 1\n' in text
+    assert 'rag_stage_seconds_bucket{stage="say \\"hi\\"",le="30"} 1\n' in text
+    assert 'rag_stage_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 2\n' in text
+    assert 'rag_stage_seconds_count{stage="say \\"hi\\""} 2\n' in text
+
+
+def test_server_timing_header_breaks_down_concurrent_stages(enabled):
+    app = FastAPI()
+    app.add_middleware(metrics.TimingMiddleware)
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    async def item(item_id: int):
+        await asyncio.gather(
+            metrics.traced("graph_query", asyncio.sleep(0.01)),
+            metrics.traced("vector_search", asyncio.sleep(0.02)),
+        )
+        return {"item": item_id}
+
+    app.include_router(router, prefix="/api")
+
+    response = TestClient(app).get("/api/items/7")
+
+    stages = dict(part.split(";dur=") for part in response.headers["server-timing"].split(", "))
+    assert set(stages) == {"graph_query", "vector_search", "total"}
+    assert float(stages["vector_search"]) >= 20
+    assert float(stages["total"]) >= float(stages["vector_search"])
+    assert enabled.value("rag_stage_seconds", stage="graph_query") == 1
+    assert enabled.value("rag_http_request_seconds", method="GET", route="/api/items/{item_id}") == 1
@@ -0,0 +1,70 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from services.ner import NEREngine, split_text
+
+
+class CapitalizedNames:
+    """spaCy stand-in: runs of capitalized words are PERSON entities."""
+
+    max_length = 1000
+
+    def __init__(self):
+        self.calls = []
+
+    def pipe(self, texts, batch_size):
+        texts = list(texts)
+        self.calls.append((texts, batch_size))
+        for text in texts:
+            if len(text) > self.max_length:
+                raise ValueError("[E088] Text exceeds maximum")
+            yield SimpleNamespace(ents=[
+                SimpleNamespace(text=m.group(0), label_="PERSON")
+                for m in re.finditer(r"[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*", text)
+            ])
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+
+
+def test_split_text_prefers_paragraphs_then_sentences():
+    text = "aaaa bbbb. cccc\n\ndddd eeee. ffff gggg"
+    pieces = list(split_text(text, 20))
+
+    assert "".join(pieces) == text
+    assert pieces[0] == "aaaa bbbb. cccc\n\n"
+    assert all(len(piece) <= 20 for piece in pieces)
+    assert list(split_text("x" * 25, 10)) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_groups_are_piped_once_and_deduplicated_per_group():
+    nlp = CapitalizedNames()
+    engine = NEREngine(nlp=nlp, batch_size=8)
+
+    entities = engine.extract_groups([
+        ["Jane Smith met Tom.", "Later Jane  Smith left."],
+        ["Tom stayed."],
+        [],
+    ])
+
+    assert entities == [
+        {"PERSON": ["Jane Smith", "Tom", "Later Jane Smith"]},
+        {"PERSON": ["Tom"]},
+        {},
+    ]
+    assert len(nlp.calls) == 1 and nlp.calls[0][1] == 8
+
+
+def test_texts_longer_than_max_length_are_split():
+    nlp = CapitalizedNames()
+    engine = NEREngine(nlp=nlp, max_chars=10_000)
+    text = "filler words here. " * 100 + "Ada Lovelace wrote notes. " + "more filler. " * 100
+
+    assert engine.max_chars == nlp.max_length
+    assert engine.extract(text) == {"PERSON": ["Ada Lovelace"]}
+    assert all(len(piece) <= nlp.max_length for piece in nlp.calls[0][0])
@@ -63,9 +63,12 @@ async def test_document_processing():
         # Mock KnowledgeGraph and VectorStore at instance level
         rag.kg = Mock()
         rag.kg.query_subgraph.return_value = [{"type": "CEO", "value": "Tim Cook"}]
+        rag.kg.aquery_subgraph = AsyncMock(return_value=rag.kg.query_subgraph.return_value)
 
         rag.vector_store = Mock()
         rag.vector_store.search.return_value = [{"content": "Apple is a tech company.", "score": 0.95}]
+        rag.vector_store.asearch = AsyncMock(return_value=rag.vector_store.search.return_value)
+        rag.vector_store.aembed_query = AsyncMock(return_value=[0.1] * 384)
 
         # Run RAG query
         test_question = "Who is the CEO of Apple?"
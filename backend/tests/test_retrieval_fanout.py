@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+
+
+def make_pipeline(kg_delay: float, vector_delay: float, kg_timeout: float = 2.0):
+    with patch("services.rag_pipeline.OpenAI") as mock_openai:
+        mock_client = mock_openai.return_value
+        mock_choice = Mock()
+        mock_choice.message = Mock(content="Tim Cook is the CEO of Apple.")
+        mock_choice.finish_reason = "stop"
+        mock_client.chat.completions.create = AsyncMock(return_value=Mock(choices=[mock_choice]))
+
+        from services.rag_pipeline import RAGPipeline
+
+        async def query_subgraph(question, mentions=None):
+            await asyncio.sleep(kg_delay)
+            return [{"type": "PERSON", "value": "Tim Cook"}]
+
+        async def search(question, k=3, query_vector=None, filters=None, min_score=None):
+            await asyncio.sleep(vector_delay)
+            return [{"content": "Apple is a tech company.", "score": 0.95}]
+
+        kg = Mock(version=0)
+        kg.aquery_subgraph = query_subgraph
+        vector_store = Mock(version=0)
+        vector_store.embed_chunks = lambda chunks: np.eye(len(chunks), 4)
+        vector_store.aembed_query = AsyncMock(return_value=np.ones(4))
+        vector_store.asearch = search
+        rag = RAGPipeline(openai_client=mock_client, kg=kg, vector_store=vector_store, nlp=Mock())
+    rag.kg_timeout = kg_timeout
+    rag.answer_cache = None
+    return rag, mock_client
+
+
+def run_query(rag, question="Who is the CEO of Apple?"):
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=["Apple"]):
+            return await rag.process_query(question)
+
+    return asyncio.run(run())
+
+
+def test_legs_run_concurrently():
+    rag, _ = make_pipeline(kg_delay=0.2, vector_delay=0.2)
+
+    started = time.perf_counter()
+    response = run_query(rag)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.35
+    assert response["degraded"] is False
+    assert response["timings_ms"]["knowledge_graph"] >= 200
+    assert response["timings_ms"]["vector"] >= 200
+
+
+def test_slow_graph_degrades_to_vector_context():
+    rag, client = make_pipeline(kg_delay=1.0, vector_delay=0.0, kg_timeout=0.1)
+
+    response = run_query(rag)
+
+    assert response["degraded"] is True
+    assert "knowledge_graph" in response["retrieval_errors"]
+    prompt = client.chat.completions.create.await_args.kwargs["messages"][1]["content"]
+    assert "Apple is a tech company." in prompt
+    assert "Tim Cook" not in prompt
+
+
+def test_query_linking_does_not_wait_for_ingestion_ner():
+    from services.executors import get_stage_executors
+
+    rag, _ = make_pipeline(kg_delay=0.0, vector_delay=0.0, kg_timeout=1.0)
+    ner = get_stage_executors().get("ner")
+    release = threading.Event()
+    # An upload's NER occupying every worker of the ner stage
+    busy = [ner.submit(release.wait, 10) for _ in range(ner._max_workers)]
+    try:
+        response = run_query(rag)
+    finally:
+        release.set()
+        for future in busy:
+            future.result()
+
+    assert response["degraded"] is False
+
+
+def test_context_is_built_off_the_event_loop():
+    rag, _ = make_pipeline(kg_delay=0.0, vector_delay=0.0)
+    build = rag.context_builder.build
+    threads = []
+
+    def recorded(*args):
+        threads.append(threading.current_thread())
+        return build(*args)
+
+    rag.context_builder.build = recorded
+    response = run_query(rag)
+
+    assert response["context"]["chunks"] == 1
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_tokenizer_is_loaded_with_the_pipeline():
+    from core.resources import build_resources
+
+    registry = build_resources()
+    report = registry.report()
+    assert report["tokenizer"]["lazy"] is False
+    assert list(report).index("tokenizer") < list(report).index("rag_pipeline")
+
+
+def test_stream_sends_sources_then_tokens_then_done():
+    from services.fake_llm import FakeLLMClient
+
+    rag, _ = make_pipeline(kg_delay=0.0, vector_delay=0.0)
+    rag.openai_client = FakeLLMClient(answer="Tim Cook leads Apple. Source: annual report")
+
+    async def run():
+        with patch("services.rag_pipeline.extract_mentions", return_value=["Apple"]):
+            return [event async for event in rag.process_query_stream("Who is the CEO of Apple?")]
+
+    events = asyncio.run(run())
+    names = [name for name, _ in events]
+
+    assert names[0] == "sources" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3
+    assert events[0][1]["documents"][0]["content"] == "Apple is a tech company."
+    done = events[-1][1]
+    assert "".join(data["text"] for name, data in events if name == "token") == done["answer"]
+    assert done["sources"] == ["annual report"]
+    assert done["confidence"] == 1.0
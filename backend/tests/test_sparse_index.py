@@ -0,0 +1,47 @@
+import numpy as np
+
+from services.sparse_index import SparseIndex, reciprocal_rank_fusion, tokenize
+
+
+def build(chunks):
+    index = SparseIndex()
+    index.add(0, index.analyze(chunks))
+    return index
+
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    assert tokenize("Part AB-1234 fits v2.1") == ["part", "ab-1234", "ab", "1234", "fits", "v2.1", "v2", "1"]
+
+
+def test_exact_identifier_ranks_first():
+    index = build([
+        "The pump uses a standard gasket.",
+        "Replacement gasket for pump model XK-9921.",
+        "Gasket XK-9922 is discontinued.",
+    ])
+
+    hits = index.search("gasket XK-9921", k=2)
+
+    assert [doc_id for doc_id, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build(["alpha beta", "beta gamma"])
+    path = str(tmp_path / "sparse.index")
+    index.save(path)
+    index.add(2, index.analyze(["gamma delta"]))
+
+    loaded = SparseIndex.load(path)
+    loaded.add(2, loaded.analyze(["gamma delta"]))
+
+    assert len(loaded) == 3
+    for query in ("beta", "gamma", "delta"):
+        assert loaded.search(query) == index.search(query)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2]
+    assert np.isclose(fused[0][1], 1 / 61 + 1 / 62)
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services import index_factory, vector_store
+from services.vector_store import VectorStore
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+@pytest.mark.parametrize("locked_rows", [1000, 0])
+def test_vacuum_lets_searches_and_writes_through(store_path, monkeypatch, locked_rows):
+    # 0 copies the chunks added meanwhile in an unlocked round, 1000 in the final swap
+    monkeypatch.setattr(vector_store, "_REWRITE_LOCKED_ROWS", locked_rows)
+    store = VectorStore(model=HashingEmbedder())
+    old, kept, doomed = store.add_documents(
+        ["old pump manual", "cats sleep most of the day", "quarterly revenue grew strongly"]
+    )
+    store.delete_document(old)
+    during = {}
+
+    rebuild = index_factory.rebuild_index
+
+    def rebuild_while_serving(*args, **kwargs):
+        def serve():
+            during["hits"] = store.search("cats", k=1)
+            [during["added"]] = store.add_documents(["dogs bark at the mail carrier"])
+            store.delete_document(doomed)
+
+        worker = threading.Thread(target=serve)
+        worker.start()
+        worker.join(timeout=10)
+        # Would time out if the vacuum held the store lock while building
+        assert not worker.is_alive()
+        return rebuild(*args, **kwargs)
+
+    monkeypatch.setattr(index_factory, "rebuild_index", rebuild_while_serving)
+    result = store.vacuum()
+
+    assert during["hits"][0]["content"] == "cats sleep most of the day"
+    assert result == {"chunks": 3, "removed_chunks": 1}
+    expected = ["cats sleep most of the day", "dogs bark at the mail carrier"]
+    assert sorted(hit["content"] for hit in store.search("cats dogs revenue", k=5)) == expected
+    assert [doc["doc_id"] for doc in store.list_documents()] == [kept, during["added"]]
+    store.close()
+
+    store = VectorStore(model=HashingEmbedder())
+    assert store.index.ntotal == 3
+    assert sorted(hit["content"] for hit in store.search("cats dogs revenue", k=5)) == expected
+    store.close()
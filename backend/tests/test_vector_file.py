@@ -0,0 +1,66 @@
+import faiss
+import numpy as np
+
+from benchmarks.common import bench_settings, synthetic_vectors
+from services import index_factory
+from services.vector_file import VectorFile
+
+
+def test_append_reopen_and_drop_torn_row(tmp_path):
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    store = VectorFile(str(tmp_path), 4)
+    assert store.append(vectors[:2]) == 0
+    assert store.append(vectors[2:]) == 2
+    store.close()
+    with open(store.path, "ab") as f:
+        f.write(b"\x00" * 6)  # half a row, as left by a crash
+
+    reopened = VectorFile(str(tmp_path), 4)
+
+    assert len(reopened) == 3
+    np.testing.assert_array_equal(reopened.get([2, 0]), vectors[[2, 0]])
+    reopened.truncate(1)
+    np.testing.assert_array_equal(reopened.rows(), vectors[:1])
+
+
+def test_quantized_configs_round_trip():
+    for index_type in index_factory.INDEX_TYPES:
+        for quantization in index_factory.QUANTIZATIONS:
+            settings = bench_settings(
+                VECTOR_INDEX_TYPE=index_type, VECTOR_QUANTIZATION=quantization, VECTOR_IVF_NLIST=16
+            )
+            index = index_factory.build_index(settings, 96)
+            assert index_factory.index_config(index) == index_factory.configured_index(settings)
+
+
+def test_rescore_restores_float32_ranking(tmp_path):
+    data = synthetic_vectors(3020, 64)
+    vectors, queries = data[:3000], data[3000:]
+    raw = VectorFile(str(tmp_path), 64)
+    raw.append(vectors)
+    settings = bench_settings(VECTOR_INDEX_TYPE="flat", VECTOR_QUANTIZATION="pq", VECTOR_PQ_M=8)
+    pq = index_factory.build_index(settings, 64)
+    pq.train(vectors)
+    pq.add(vectors)
+    truth = index_factory.rebuild_index(vectors, bench_settings(VECTOR_INDEX_TYPE="flat"))
+
+    exact_distances, exact_ids = truth.search(queries, 5)
+    _, candidates = pq.search(queries, 40)
+    distances, ids = raw.rescore(queries, candidates, 5, metric="cosine")
+
+    assert index_factory.is_lossy(pq)
+    assert index_factory.index_metric(pq) == "cosine"
+    assert np.mean([len(set(a) & set(b)) / 5 for a, b in zip(ids, exact_ids)]) >= 0.9
+    np.testing.assert_allclose(distances[ids == exact_ids], exact_distances[ids == exact_ids], rtol=1e-4)
+
+
+def test_rebuild_trains_on_at_least_training_size_vectors(monkeypatch):
+    settings = bench_settings(VECTOR_INDEX_TYPE="flat", VECTOR_QUANTIZATION="pq", VECTOR_PQ_M=4, VECTOR_IVF_NLIST=4)
+    vectors = synthetic_vectors(index_factory.training_size(settings) + 100, 16)
+    trained_on = []
+    train = faiss.IndexPQ.train
+    monkeypatch.setattr(faiss.IndexPQ, "train", lambda self, x: trained_on.append(len(x)) or train(self, x))
+
+    assert index_factory.rebuild_index(vectors, settings).ntotal == len(vectors)
+    # VECTOR_IVF_NLIST * 256 alone would have sampled 1024, too few for 256 PQ centroids
+    assert trained_on == [index_factory.training_size(settings)]
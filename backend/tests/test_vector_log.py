@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services.vector_log import VectorLog
+from services.vector_store import VectorStore
+
+DIM = 4
+
+
+def batch(n, value):
+    return np.full((n, DIM), value, dtype=np.float32)
+
+
+def records(log):
+    return [(start, vectors.tolist(), meta) for start, vectors, meta in log.replay()]
+
+
+def test_replay_after_reopen_yields_every_record(tmp_path):
+    path = str(tmp_path / "vectors.wal")
+    log = VectorLog(path, DIM)
+    log.append(0, batch(2, 1.0), b'{"a": 1}')
+    log.append(2, batch(1, 2.0))
+    log.close()
+
+    log = VectorLog(path, DIM)
+    assert records(log) == [(0, batch(2, 1.0).tolist(), b'{"a": 1}'), (2, batch(1, 2.0).tolist(), b"")]
+    log.close()
+
+
+def test_torn_tail_is_cut_off_and_appends_continue_cleanly(tmp_path):
+    path = str(tmp_path / "vectors.wal")
+    log = VectorLog(path, DIM)
+    log.append(0, batch(2, 1.0))
+    intact = log.size()
+    log.append(2, batch(3, 2.0), b"meta")
+    log.close()
+    # Crash halfway through the second record
+    with open(path, "r+b") as f:
+        f.truncate(intact + 10)
+
+    log = VectorLog(path, DIM)
+    assert [start for start, _, _ in records(log)] == [0]
+    assert os.path.getsize(path) == intact
+    log.append(2, batch(1, 3.0))
+    log.close()
+
+    log = VectorLog(path, DIM)
+    assert [(start, len(vectors)) for start, vectors, _ in records(log)] == [(0, 2), (2, 1)]
+    log.close()
+
+
+def test_truncate_prefix_keeps_only_later_records(tmp_path):
+    path = str(tmp_path / "vectors.wal")
+    log = VectorLog(path, DIM)
+    log.append(0, batch(2, 1.0))
+    offset = log.size()
+    log.append(2, batch(1, 2.0))
+
+    log.truncate_prefix(offset)
+    log.append(3, batch(1, 3.0))
+
+    assert [(start, vectors[0][0]) for start, vectors, _ in records(log)] == [(2, 2.0), (3, 3.0)]
+    log.close()
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+def test_store_replays_the_log_and_compacts_it_into_the_index(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    store.add_documents(["pump gasket replacement guide", "quarterly revenue grew strongly"])
+    store.close()
+    assert not (store_path / "faiss.index").exists()
+
+    # Nothing compacted yet: the index is rebuilt from the log
+    store = VectorStore(model=HashingEmbedder())
+    assert store.index.ntotal == 2
+    store.save()
+    assert store.wal.size() == 0
+    store.add_documents(["cats sleep most of the day"])
+    store.close()
+
+    store = VectorStore(model=HashingEmbedder())
+    assert (store_path / "faiss.index").exists()
+    assert store.index.ntotal == 3
+    assert store.search("cats sleep", k=1)[0]["content"] == "cats sleep most of the day"
+    store.close()
@@ -0,0 +1,89 @@
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from services import index_factory
+from services.vector_store import VectorStore
+
+
+class BagOfWordsModel:
+    """Deterministic stand-in for the sentence-transformer: hashed word counts."""
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.strip(".,").encode()) % 384] += 3.0
+        return vectors
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+DOCS = ["pump gasket replacement guide", "quarterly revenue grew strongly", "cats sleep most of the day"]
+
+
+def test_cosine_scores_are_similarities_with_cutoff(store_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_METRIC", "cosine")
+    store = VectorStore(model=BagOfWordsModel())
+    store.add_documents(DOCS)
+
+    hits = store.search("revenue grew", k=3)
+    kept = store.search("revenue grew", k=3, min_score=0.5)
+    store.close()
+
+    assert hits[0]["content"] == DOCS[1]
+    assert hits[0]["dense_score"] == pytest.approx(np.sqrt(2 / 4), abs=1e-5)
+    assert [hit["content"] for hit in kept] == [DOCS[1]]
+
+
+def test_migrating_an_l2_store_to_cosine(store_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_METRIC", "l2")
+    store = VectorStore(model=BagOfWordsModel())
+    store.add_documents(DOCS)
+    store.save()
+    store.close()
+
+    monkeypatch.setenv("VECTOR_METRIC", "cosine")
+    store = VectorStore(model=BagOfWordsModel())
+    # The on-disk metric wins until the store is migrated
+    assert store.metric == "l2"
+    assert store.migrate_metric("cosine") == {"chunks": 3, "from": "l2", "to": "cosine"}
+    store.close()
+
+    store = VectorStore(model=BagOfWordsModel())
+    assert store.metric == "cosine"
+    np.testing.assert_allclose(np.linalg.norm(store.raw_vectors.rows(), axis=1), 1.0, rtol=1e-5)
+    assert store.search("cats sleep", k=1)[0]["dense_score"] == pytest.approx(np.sqrt(2 / 6), abs=1e-5)
+    store.close()
+
+
+def test_documents_added_during_a_migration_are_migrated_too(store_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_METRIC", "l2")
+    store = VectorStore(model=BagOfWordsModel())
+    store.add_documents(DOCS)
+    rebuild = index_factory.rebuild_index
+
+    def rebuild_while_adding(*args, **kwargs):
+        # Would block if the migration held the store lock while building
+        worker = threading.Thread(target=store.add_documents, args=(["dogs bark at the mail carrier"],))
+        worker.start()
+        worker.join(timeout=10)
+        assert not worker.is_alive()
+        return rebuild(*args, **kwargs)
+
+    monkeypatch.setattr(index_factory, "rebuild_index", rebuild_while_adding)
+    assert store.migrate_metric("cosine") == {"chunks": 4, "from": "l2", "to": "cosine"}
+
+    np.testing.assert_allclose(np.linalg.norm(store.raw_vectors.rows(), axis=1), 1.0, rtol=1e-5)
+    assert store.search("dogs bark", k=1)[0]["content"] == "dogs bark at the mail carrier"
+    store.close()
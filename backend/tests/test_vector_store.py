@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from benchmarks.common import HashingEmbedder
+from services.vector_store import VectorStore
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    monkeypatch.setenv("EMBED_BATCH_ENABLED", "false")
+    monkeypatch.setenv("EMBED_CACHE_DISK", "false")
+    return tmp_path
+
+
+def test_search_does_not_wait_for_the_store_lock(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    store.add_documents(["cats sleep most of the day", "quarterly revenue grew strongly"])
+    view = store._view()
+    held, release = threading.Event(), threading.Event()
+
+    def hold_store_lock():
+        # As a commit or publish does
+        with store._lock:
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold_store_lock)
+    holder.start()
+    held.wait(10)
+    try:
+        [hits] = store._search_dense(store._encode_queries(["cats"]), 1, None, None, view)
+    finally:
+        release.set()
+        holder.join()
+    assert hits[0]["content"] == "cats sleep most of the day"
+    store.close()
+
+
+def test_search_waits_for_an_add_into_the_index(store_path):
+    store = VectorStore(model=HashingEmbedder())
+    store.add_documents(["cats sleep most of the day"])
+    searched = threading.Event()
+
+    def search():
+        store.search("cats", k=1)
+        searched.set()
+
+    with store._index_lock.exclusive():
+        searcher = threading.Thread(target=search)
+        searcher.start()
+        assert not searched.wait(0.2)
+    searcher.join(10)
+    assert searched.is_set()
+    store.close()